@@ -1,23 +1,26 @@
 from logging.config import fileConfig
+import re
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 from alembic import context
 import os
 import sys
 
-# Add the src directory to the Python path
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+# Add the backend directory to the Python path so that `src` is importable
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from core.db import Base
-from core.settings import settings
+from src.core.db import Base
+from src.core.settings import settings
+import src.models  # noqa: F401  регистрирует все таблицы в Base.metadata
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
 
 # Interpret the config file for Python logging.
-# This line sets up loggers basically.
-if config.config_file_name is not None:
+# This line sets up loggers basically. When migrations are run from the
+# application (src.core.db.run_migrations) the app keeps its own logging.
+if config.config_file_name is not None and "connection" not in config.attributes:
     fileConfig(config.config_file_name)
 
 # add your model's MetaData object here
@@ -30,6 +33,17 @@ target_metadata = Base.metadata
 # ... etc.
 
 
+# Служебные таблицы полнотекстового поиска (FTS5) создаются миграциями
+# вручную и не описаны в моделях — autogenerate не должен их удалять
+_FTS_TABLE = re.compile(r"^\w+_fts(_\w+)?$")
+
+
+def include_name(name, type_, parent_names):
+    if type_ == "table":
+        return not _FTS_TABLE.match(name)
+    return True
+
+
 def get_url():
     return settings.DATABASE_URL
 
@@ -52,6 +66,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_name=include_name,
     )
 
     with context.begin_transaction():
@@ -63,8 +78,21 @@ def run_migrations_online() -> None:
 
     In this scenario we need to create an Engine
     and associate a connection with the context.
+    If the application passed its own connection, it is used as is.
 
     """
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            render_as_batch=connection.dialect.name == "sqlite",
+            include_name=include_name,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
     configuration = config.get_section(config.config_ini_section)
     configuration["sqlalchemy.url"] = get_url()
     connectable = engine_from_config(
@@ -75,7 +103,10 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            render_as_batch=connection.dialect.name == "sqlite",
+            include_name=include_name,
         )
 
         with context.begin_transaction():
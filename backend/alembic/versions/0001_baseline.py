@@ -0,0 +1,134 @@
+"""baseline
+
+Schema as it was created by Base.metadata.create_all before migrations
+were introduced. Tables that already exist are left untouched, so
+databases created by the old import-time create_all are adopted as is.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 18:18:00.958890
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _missing(table_name: str) -> bool:
+    return not sa.inspect(op.get_bind()).has_table(table_name)
+
+
+def upgrade() -> None:
+    if _missing('users'):
+        op.create_table('users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('password_hash', sa.String(), nullable=False),
+        sa.Column('avatar_url', sa.String(), nullable=True),
+        sa.Column('bio', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('role', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_users_email', 'users', ['email'], unique=True)
+        op.create_index('ix_users_id', 'users', ['id'], unique=False)
+
+    if _missing('weather_cache'):
+        op.create_table('weather_cache',
+        sa.Column('city', sa.String(), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=True),
+        sa.Column('fetched_at', sa.Float(), nullable=False),
+        sa.Column('expires_at', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('city')
+        )
+        op.create_index('ix_weather_cache_expires_at', 'weather_cache', ['expires_at'], unique=False)
+
+    if _missing('refresh_tokens'):
+        op.create_table('refresh_tokens',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('token', sa.String(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('is_revoked', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_refresh_tokens_id', 'refresh_tokens', ['id'], unique=False)
+        op.create_index('ix_refresh_tokens_token', 'refresh_tokens', ['token'], unique=True)
+
+    if _missing('trips'):
+        op.create_table('trips',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('destination', sa.String(), nullable=False),
+        sa.Column('start_date', sa.Date(), nullable=True),
+        sa.Column('end_date', sa.Date(), nullable=True),
+        sa.Column('budget_total', sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('image_url', sa.String(), nullable=True),
+        sa.Column('creator_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['creator_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_trips_id', 'trips', ['id'], unique=False)
+
+    if _missing('comments'):
+        op.create_table('comments',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('trip_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['trip_id'], ['trips.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_comments_id', 'comments', ['id'], unique=False)
+
+    if _missing('messages'):
+        op.create_table('messages',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('trip_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['trip_id'], ['trips.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_messages_id', 'messages', ['id'], unique=False)
+
+    if _missing('trip_members'):
+        op.create_table('trip_members',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('role', sa.String(), nullable=True),
+        sa.Column('joined_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('trip_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['trip_id'], ['trips.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'trip_id', name='unique_user_trip')
+        )
+        op.create_index('ix_trip_members_id', 'trip_members', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_table('trip_members')
+    op.drop_table('messages')
+    op.drop_table('comments')
+    op.drop_table('trips')
+    op.drop_table('refresh_tokens')
+    op.drop_table('weather_cache')
+    op.drop_table('users')
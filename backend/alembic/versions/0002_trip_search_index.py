@@ -0,0 +1,80 @@
+"""trip full-text search index
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 18:25:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Снимок DDL на момент ревизии: правки src/core/search.py не должны менять миграцию
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS trips_fts USING fts5(
+        title, destination, description,
+        content='trips', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trips_fts_ai AFTER INSERT ON trips BEGIN
+        INSERT INTO trips_fts(rowid, title, destination, description)
+        VALUES (new.id, new.title, new.destination, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trips_fts_ad AFTER DELETE ON trips BEGIN
+        INSERT INTO trips_fts(trips_fts, rowid, title, destination, description)
+        VALUES ('delete', old.id, old.title, old.destination, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trips_fts_au AFTER UPDATE OF title, destination, description ON trips BEGIN
+        INSERT INTO trips_fts(trips_fts, rowid, title, destination, description)
+        VALUES ('delete', old.id, old.title, old.destination, old.description);
+        INSERT INTO trips_fts(rowid, title, destination, description)
+        VALUES (new.id, new.title, new.destination, new.description);
+    END
+    """,
+]
+
+POSTGRES_DDL = [
+    "CREATE INDEX IF NOT EXISTS ix_trips_search ON trips USING gin ("
+    "to_tsvector('simple', coalesce(title, '') || ' ' || "
+    "coalesce(destination, '') || ' ' || coalesce(description, '')))",
+]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        exists = bind.execute(
+            sa.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'trips_fts'")
+        ).first()
+        for statement in SQLITE_DDL:
+            op.execute(statement)
+        if not exists:
+            op.execute("INSERT INTO trips_fts(trips_fts) VALUES ('rebuild')")
+    elif bind.dialect.name == 'postgresql':
+        for statement in POSTGRES_DDL:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        for suffix in ('ai', 'ad', 'au'):
+            op.execute(f"DROP TRIGGER IF EXISTS trips_fts_{suffix}")
+        op.execute("DROP TABLE IF EXISTS trips_fts")
+    elif bind.dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_trips_search")
@@ -0,0 +1,38 @@
+"""hot path indexes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 18:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_messages_trip_id_created_at', 'messages', ['trip_id', 'created_at']),
+    ('ix_comments_trip_id_created_at', 'comments', ['trip_id', 'created_at']),
+    ('ix_trip_members_trip_id_user_id', 'trip_members', ['trip_id', 'user_id']),
+    ('ix_trips_creator_id', 'trips', ['creator_id']),
+    ('ix_trips_created_at', 'trips', ['created_at']),
+    ('ix_trips_start_date', 'trips', ['start_date']),
+    ('ix_trips_budget_total', 'trips', ['budget_total']),
+    ('ix_refresh_tokens_user_id', 'refresh_tokens', ['user_id']),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
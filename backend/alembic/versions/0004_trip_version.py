@@ -0,0 +1,34 @@
+"""trip version counter for etags
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_version(bind) -> bool:
+    return 'version' in {column['name'] for column in sa.inspect(bind).get_columns('trips')}
+
+
+def upgrade() -> None:
+    # Обычный ADD COLUMN: пересоздание таблицы (batch) снесло бы FTS-триггеры
+    if not _has_version(op.get_bind()):
+        op.add_column('trips', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    # Тоже без batch: нативный DROP COLUMN (SQLite >= 3.35) сохраняет FTS-триггеры
+    if _has_version(op.get_bind()):
+        op.drop_column('trips', 'version')
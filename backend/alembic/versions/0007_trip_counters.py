@@ -0,0 +1,72 @@
+"""denormalized trip counters and last activity
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COUNTERS = ('member_count', 'message_count', 'comment_count')
+
+
+def _trip_columns(bind) -> set:
+    return {column['name'] for column in sa.inspect(bind).get_columns('trips')}
+
+
+def _backfill(bind) -> None:
+    """Заполнить счётчики по дочерним таблицам (снимок схемы на момент ревизии)"""
+    trips = sa.table(
+        'trips', sa.column('id'), sa.column('last_activity_at'),
+        *(sa.column(name) for name in COUNTERS),
+    )
+    members = sa.table('trip_members', sa.column('trip_id'), sa.column('joined_at'))
+    messages = sa.table('messages', sa.column('trip_id'), sa.column('created_at'))
+    comments = sa.table('comments', sa.column('trip_id'), sa.column('created_at'))
+
+    def count_of(child):
+        return sa.select(sa.func.count()).where(child.c.trip_id == trips.c.id).scalar_subquery()
+
+    activity = sa.union_all(
+        sa.select(members.c.trip_id, members.c.joined_at.label('at')),
+        sa.select(messages.c.trip_id, messages.c.created_at),
+        sa.select(comments.c.trip_id, comments.c.created_at),
+    ).subquery()
+
+    bind.execute(trips.update().values(
+        member_count=count_of(members),
+        message_count=count_of(messages),
+        comment_count=count_of(comments),
+        last_activity_at=sa.select(sa.func.max(activity.c.at))
+        .where(activity.c.trip_id == trips.c.id).scalar_subquery(),
+    ))
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    existing = _trip_columns(bind)
+    # Обычный ADD COLUMN: пересоздание таблицы (batch) снесло бы FTS-триггеры
+    for name in COUNTERS:
+        if name not in existing:
+            op.add_column('trips', sa.Column(name, sa.Integer(), server_default='0', nullable=False))
+    if 'last_activity_at' not in existing:
+        op.add_column('trips', sa.Column('last_activity_at', sa.DateTime(timezone=True), nullable=True))
+    _backfill(bind)
+
+
+def downgrade() -> None:
+    # Тоже без batch: нативный DROP COLUMN (SQLite >= 3.35) сохраняет FTS-триггеры
+    existing = _trip_columns(op.get_bind())
+    for name in (*COUNTERS, 'last_activity_at'):
+        if name in existing:
+            op.drop_column('trips', name)
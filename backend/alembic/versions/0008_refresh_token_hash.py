@@ -0,0 +1,66 @@
+"""refresh tokens keyed by sha256 of jti
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 00:30:00.000000
+
+"""
+import hashlib
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from jose import JWTError, jwt
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _columns(bind) -> set:
+    return {column['name'] for column in sa.inspect(bind).get_columns('refresh_tokens')}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if 'token' not in _columns(bind):
+        return  # база уже создана по новой схеме
+
+    if 'token_hash' not in _columns(bind):
+        op.add_column('refresh_tokens', sa.Column('token_hash', sa.String(length=64), nullable=True))
+
+    # jti берём из самих JWT; строки без разбираемого jti всё равно не пройдут проверку — удаляем
+    tokens = sa.table('refresh_tokens', sa.column('id'), sa.column('token'), sa.column('token_hash'))
+    for row_id, token in bind.execute(sa.select(tokens.c.id, tokens.c.token)).all():
+        try:
+            jti = jwt.get_unverified_claims(token).get('jti')
+        except JWTError:
+            jti = None
+        if jti:
+            bind.execute(
+                tokens.update().where(tokens.c.id == row_id)
+                .values(token_hash=hashlib.sha256(jti.encode()).hexdigest())
+            )
+        else:
+            bind.execute(tokens.delete().where(tokens.c.id == row_id))
+
+    with op.batch_alter_table('refresh_tokens') as batch_op:
+        batch_op.drop_index('ix_refresh_tokens_token')
+        batch_op.drop_column('token')
+        batch_op.alter_column('token_hash', existing_type=sa.String(length=64), nullable=False)
+        batch_op.create_index('ix_refresh_tokens_token_hash', ['token_hash'], unique=True)
+
+
+def downgrade() -> None:
+    # Исходные JWT из хешей не восстановить: выданные refresh-токены пропадают
+    if 'token_hash' not in _columns(op.get_bind()):
+        return
+    op.execute('DELETE FROM refresh_tokens')
+    with op.batch_alter_table('refresh_tokens') as batch_op:
+        batch_op.drop_index('ix_refresh_tokens_token_hash')
+        batch_op.drop_column('token_hash')
+        batch_op.add_column(sa.Column('token', sa.String(), nullable=False))
+        batch_op.create_index('ix_refresh_tokens_token', ['token'], unique=True)
@@ -0,0 +1,103 @@
+"""Бенчмарк общего HTTP-пула против клиента "на каждый запрос".
+
+Поднимает фейковый upstream на localhost, который считает открытые
+TCP-соединения, и гоняет одинаковую нагрузку двумя способами.
+
+Запуск из каталога backend:
+    python benchmarks/http_pool.py --requests 500 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from src.core.http import build_http_client  # noqa: E402
+
+BODY = b'{"main": {"temp": 21.4}, "weather": [{"description": "clear", "icon": "01d"}]}'
+
+
+class FakeUpstream:
+    """Минимальный HTTP/1.1 сервер с keep-alive и счётчиком соединений"""
+
+    def __init__(self):
+        self.connections = 0
+        self.requests = 0
+        self.server = None
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                if not head:
+                    break
+                self.requests += 1
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    b"Content-Type: application/json\r\n"
+                    b"Content-Length: " + str(len(BODY)).encode() + b"\r\n"
+                    b"Connection: keep-alive\r\n\r\n" + BODY
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/data/2.5/weather"
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+async def run(url: str, total: int, concurrency: int, shared: bool) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+    client = build_http_client() if shared else None
+
+    async def one():
+        async with semaphore:
+            if client is not None:
+                response = await client.get(url, params={"q": "Paris"})
+            else:
+                async with httpx.AsyncClient() as fresh:
+                    response = await fresh.get(url, params={"q": "Paris"})
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+    if client is not None:
+        await client.aclose()
+    return elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    for shared in (False, True):
+        upstream = FakeUpstream()
+        url = await upstream.start()
+        elapsed = await run(url, args.requests, args.concurrency, shared)
+        await upstream.stop()
+        label = "shared pool" if shared else "client per call"
+        print(
+            f"{label:16} {args.requests} req in {elapsed:.3f}s "
+            f"({args.requests / elapsed:.0f} req/s), "
+            f"connections opened: {upstream.connections}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+"""Бенчмарк сериализации списков: обычный путь FastAPI против orjson.
+
+Заполняет временную SQLite-базу поездками и сообщениями и гоняет
+GET /trips/ и GET /trips/{id}/messages in-process (ASGI, без сети)
+со страницами по 100 и 1000 строк. Погода заранее положена в кеш,
+кеш ответов каталога выключен — меряется только чтение и кодирование.
+
+Запуск из каталога backend:
+    python benchmarks/json_lists.py --requests 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'bench.db')}"
+os.environ["TRIPS_CACHE_ENABLED"] = "False"
+os.environ["WEATHER_PREFETCH_ENABLED"] = "False"
+os.environ["WEATHER_CACHE_PERSISTENT"] = "False"
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import httpx  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from main import app  # noqa: E402
+from src.core.db import async_engine, engine, run_migrations  # noqa: E402
+from src.core.settings import settings  # noqa: E402
+from src.service import weather  # noqa: E402
+
+ROWS = 1000
+CITIES = ["Paris", "Rome", "Oslo", "Lisbon", "Prague"]
+
+
+def seed() -> int:
+    run_migrations()
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO users (id, email, password_hash, name, role) "
+            "VALUES (1, 'bench@example.com', 'x', 'Bench', 'user')"
+        ))
+        connection.execute(text(
+            "INSERT INTO trips (title, description, destination, start_date, budget_total, creator_id) "
+            "VALUES (:title, 'Описание поездки', :city, '2031-01-01', 1234.50, 1)"
+        ), [{"title": f"Trip {i}", "city": CITIES[i % len(CITIES)]} for i in range(ROWS)])
+        connection.execute(text(
+            "INSERT INTO trip_members (trip_id, user_id, role) VALUES (1, 1, 'organizer')"
+        ))
+        connection.execute(text(
+            "INSERT INTO messages (trip_id, user_id, content, created_at) "
+            "VALUES (1, 1, :content, CURRENT_TIMESTAMP)"
+        ), [{"content": f"Сообщение номер {i}"} for i in range(ROWS)])
+
+    now = time.time()
+    for city in CITIES:
+        payload = {"temp": 20, "description": "clear sky", "icon": "01d"}
+        weather._remember(weather.normalize_city(city), weather.CachedWeather(payload, now, now + 3600))
+    return 1
+
+
+async def measure(client: httpx.AsyncClient, url: str, params: dict, requests: int) -> float:
+    await client.get(url, params=params)  # прогрев
+    started = time.perf_counter()
+    for _ in range(requests):
+        response = await client.get(url, params=params)
+        assert response.status_code == 200, response.text
+    return requests / (time.perf_counter() - started)
+
+
+async def main(requests: int):
+    trip_id = seed()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for rows in (100, 1000):
+            cases = [
+                ("trips", "/trips/", {"limit": rows}),
+                ("messages", f"/trips/{trip_id}/messages", {"user_id": 1, "limit": rows}),
+            ]
+            for name, url, params in cases:
+                results = {}
+                for mode, fast in (("standard", False), ("orjson", True)):
+                    settings.FAST_JSON_RESPONSES = fast
+                    results[mode] = await measure(client, url, params, requests)
+                print(
+                    f"{name:>8} x{rows:<5} standard={results['standard']:7.1f} req/s  "
+                    f"orjson={results['orjson']:7.1f} req/s  "
+                    f"(x{results['orjson'] / results['standard']:.2f})"
+                )
+    # Без lifespan соединения пула (и потоки aiosqlite) закрываем сами
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50)
+    asyncio.run(main(parser.parse_args().requests))
@@ -0,0 +1,116 @@
+"""Бенчмарк SQLite-профиля: смешанная нагрузка чтение/запись до и после.
+
+Несколько потоков одновременно пишут сообщения в чат и читают ленту
+последних сообщений поездки — как при активной переписке. Сравнивается
+движок по умолчанию (rollback journal, synchronous=FULL) и профиль из
+настроек (WAL, synchronous=NORMAL, mmap, cache_size, busy_timeout).
+
+Запуск из каталога backend:
+    python benchmarks/sqlite_profile.py --threads 8 --seconds 5 --write-ratio 0.2
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from src.core.db import configure_sqlite_engine, engine_options, run_migrations  # noqa: E402
+
+
+def build_engine(path: str, tuned: bool):
+    url = f"sqlite:///{path}"
+    if not tuned:
+        return create_engine(url)
+    return configure_sqlite_engine(create_engine(url, **engine_options(url)))
+
+
+def seed(engine, trips: int) -> None:
+    run_migrations(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO users (email, password_hash, name, role) "
+            "VALUES ('bench@example.com', 'x', 'Bench', 'user')"
+        ))
+        for trip_id in range(1, trips + 1):
+            connection.execute(text(
+                "INSERT INTO trips (id, title, destination, creator_id) "
+                "VALUES (:id, :title, 'Paris', 1)"
+            ), {"id": trip_id, "title": f"Trip {trip_id}"})
+
+
+def worker(engine, trips, write_ratio, deadline, counters, lock):
+    local = {"reads": 0, "writes": 0, "locked": 0}
+    rnd = random.Random()
+    while time.perf_counter() < deadline:
+        trip_id = rnd.randint(1, trips)
+        try:
+            if rnd.random() < write_ratio:
+                with engine.begin() as connection:
+                    connection.execute(text(
+                        "INSERT INTO messages (trip_id, user_id, content, created_at) "
+                        "VALUES (:trip_id, 1, 'hello', CURRENT_TIMESTAMP)"
+                    ), {"trip_id": trip_id})
+                local["writes"] += 1
+            else:
+                with engine.connect() as connection:
+                    connection.execute(text(
+                        "SELECT * FROM messages WHERE trip_id = :trip_id "
+                        "ORDER BY created_at DESC LIMIT 50"
+                    ), {"trip_id": trip_id}).all()
+                local["reads"] += 1
+        except OperationalError as e:
+            if "locked" not in str(e):
+                raise
+            local["locked"] += 1
+    with lock:
+        for key, value in local.items():
+            counters[key] += value
+
+
+def run(tuned: bool, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(os.path.join(tmp, "bench.db"), tuned)
+        seed(engine, args.trips)
+
+        counters = {"reads": 0, "writes": 0, "locked": 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + args.seconds
+        threads = [
+            threading.Thread(target=worker, args=(engine, args.trips, args.write_ratio, deadline, counters, lock))
+            for _ in range(args.threads)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    counters["ops_per_sec"] = round((counters["reads"] + counters["writes"]) / args.seconds, 1)
+    return counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--trips", type=int, default=50)
+    args = parser.parse_args()
+
+    for name, tuned in (("default", False), ("tuned", True)):
+        result = run(tuned, args)
+        print(
+            f"{name:>8}: {result['ops_per_sec']:>9} ops/s  "
+            f"reads={result['reads']} writes={result['writes']} locked={result['locked']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,17 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
 
-from src.core.db import engine, Base
+from src.core.db import run_migrations, async_engine, replica_engines
 from src.core.settings import settings
-from src.endpoints import users, auth, trips, trip_members, messages, comments
+from src.core.http import start_http_client, close_http_client
+from src.core.passwords import start_password_pool, stop_password_pool
+from src.core.metrics import collect_metrics
+from src.service.weather import get_circuit_state
+from src.service.weather_prefetch import start_weather_prefetch, stop_weather_prefetch
+from src.endpoints import users, auth, trips, trip_members, messages, comments, activity
 from src.models import User, Trip, TripMember, Message, Comment, RefreshToken
 from fastapi import APIRouter
 from fastapi.responses import PlainTextResponse, Response
@@ -18,14 +25,33 @@ from fastapi import UploadFile, File, HTTPException
 if not os.path.exists("uploads"):
     os.makedirs("uploads")
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Схема БД обновляется миграциями при старте, а не при импорте модуля
+    if settings.DB_MIGRATE_ON_STARTUP:
+        run_migrations()
+    # Общий пул исходящих HTTP-соединений живёт столько же, сколько приложение
+    await start_http_client()
+    start_password_pool()
+    start_weather_prefetch()
+    try:
+        yield
+    finally:
+        await stop_weather_prefetch()
+        await close_http_client()
+        stop_password_pool()
+        await async_engine.dispose()
+        for replica in replica_engines:
+            await replica.dispose()
+
 
 app = FastAPI(
     title="Travel App API",
     description="API for managing travel trips and group communication",
     version="1.0.0",
     swagger_ui_parameters={"persistAuthorization": True},
+    lifespan=lifespan,
 )
 
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
@@ -37,6 +63,7 @@ app.add_middleware(
     allow_credentials=settings.CORS_CREDENTIALS,
     allow_methods=settings.CORS_METHODS,
     allow_headers=settings.CORS_HEADERS,
+    expose_headers=settings.CORS_EXPOSE_HEADERS,
 )
 
 # Swagger BearerAuth
@@ -101,6 +128,7 @@ app.include_router(trips.router)
 app.include_router(trip_members.router)
 app.include_router(messages.router)
 app.include_router(comments.router)
+app.include_router(activity.router)
 
 @app.get("/")
 async def root():
@@ -108,4 +136,13 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {
+        "status": "healthy",
+        "dependencies": {"weather": get_circuit_state()["state"]},
+    }
+
+
+@app.get("/metrics", tags=["monitoring"])
+async def metrics():
+    """Счётчики кешей и состояние внешних зависимостей"""
+    return collect_metrics()
\ No newline at end of file
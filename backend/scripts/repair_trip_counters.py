@@ -0,0 +1,37 @@
+"""Пересчёт денормализованных счётчиков поездок.
+
+Счётчики участников, сообщений, комментариев и время последней активности
+ведутся при каждой записи через ORM. Этот скрипт пересчитывает их по
+дочерним таблицам — после массового импорта, ручных правок в БД или
+удалений в обход ORM.
+
+Запуск из каталога backend:
+    python scripts/repair_trip_counters.py            # все поездки
+    python scripts/repair_trip_counters.py 12 15      # только указанные
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from src.core.db import SessionLocal  # noqa: E402
+import src.models  # noqa: E402,F401  (регистрирует все модели)
+from src.service.trips import repair_trip_counters  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("trip_ids", nargs="*", type=int, help="id поездок (по умолчанию все)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        repaired = repair_trip_counters(db, args.trip_ids or None)
+    finally:
+        db.close()
+    print(f"trips repaired: {repaired}")
+
+
+if __name__ == "__main__":
+    main()
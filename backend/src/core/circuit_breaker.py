@@ -0,0 +1,80 @@
+import time
+
+
+class CircuitBreaker:
+    """Circuit breaker for an unreliable upstream.
+
+    closed    — requests go through, consecutive failures are counted;
+    open      — after failure_threshold failures requests are rejected
+                immediately for recovery_timeout seconds;
+    half_open — a single probe request is let through: success closes
+                the circuit, failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, recovery_timeout: float):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started_at: float | None = None
+        self.rejected = 0
+        self.times_opened = 0
+
+    def allow_request(self) -> bool:
+        """Whether the caller may hit the upstream right now"""
+        now = time.monotonic()
+        if self.state == self.CLOSED:
+            return True
+
+        if self.state == self.OPEN:
+            if now - self.opened_at < self.recovery_timeout:
+                self.rejected += 1
+                return False
+            self.state = self.HALF_OPEN
+            self.probe_started_at = now
+            return True
+
+        # half_open: пока проба в полёте, остальных не пускаем. Если проба
+        # потерялась (например, запрос отменили), через recovery_timeout
+        # разрешаем следующую.
+        if self.probe_started_at is not None and now - self.probe_started_at < self.recovery_timeout:
+            self.rejected += 1
+            return False
+        self.probe_started_at = now
+        return True
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self.probe_started_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self.probe_started_at = None
+
+    def stats(self) -> dict:
+        """State and counters for health/metrics endpoints"""
+        retry_in = 0.0
+        if self.state == self.OPEN:
+            retry_in = max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "failure_threshold": self.failure_threshold,
+            "recovery_timeout": self.recovery_timeout,
+            "retry_in": round(retry_in, 3),
+            "rejected": self.rejected,
+            "times_opened": self.times_opened,
+        }
@@ -1,22 +1,227 @@
-from sqlalchemy import create_engine, event
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy import create_engine, event, make_url, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.engine import Engine
-import sqlite3
+from pathlib import Path
+from .cache import TTLCache
+from .metrics import register_metrics
 from .settings import settings
 
-engine = create_engine(settings.DATABASE_URL)
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+logger = logging.getLogger(__name__)
+
+
+def sqlite_pragmas() -> list[str]:
+    """PRAGMA statements of the SQLite performance profile from settings"""
+    pragmas = ["foreign_keys=ON"]
+    if settings.SQLITE_TUNED:
+        pragmas += [
+            f"busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT)}",
+            f"journal_mode={settings.SQLITE_JOURNAL_MODE}",
+            f"synchronous={settings.SQLITE_SYNCHRONOUS}",
+            f"mmap_size={int(settings.SQLITE_MMAP_SIZE)}",
+            f"cache_size={int(settings.SQLITE_CACHE_SIZE)}",
+            f"temp_store={settings.SQLITE_TEMP_STORE}",
+        ]
+    return pragmas
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas: list[str]) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in pragmas:
+            # journal_mode возвращает строку — дочитываем, чтобы не держать курсор
+            cursor.execute(f"PRAGMA {pragma};")
+            cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def configure_sqlite_engine(target: Engine) -> Engine:
+    """Apply the SQLite profile to every new connection of the engine"""
+    if target.dialect.name == "sqlite":
+        pragmas = sqlite_pragmas()
+        event.listen(
+            target, "connect",
+            lambda dbapi_connection, _record: apply_sqlite_pragmas(dbapi_connection, pragmas),
+        )
+    return target
+
+
+def engine_options(url: str) -> dict:
+    """Pool settings for create_engine / create_async_engine"""
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # In-memory SQLite живёт в одном соединении — пул не настраиваем
+        return {}
+    options = {}
+    if url.get_driver_name() == "aiosqlite":
+        # По умолчанию aiosqlite открывает соединение на каждую сессию (NullPool)
+        options["poolclass"] = AsyncAdaptedQueuePool
+    return {
+        **options,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": url.get_backend_name() != "sqlite",
+    }
+
+
+engine = configure_sqlite_engine(
+    create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Асинхронный движок для эндпоинтов: запросы не блокируют event loop.
+# Синхронный engine остаётся для миграций и скриптов.
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL, **engine_options(settings.ASYNC_DATABASE_URL)
+)
+configure_sqlite_engine(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 Base = declarative_base()
 
 
-@event.listens_for(Engine, "connect")
-def set_sqlite_pragma(dbapi_connection, connection_record):
-    if isinstance(dbapi_connection, sqlite3.Connection):
-        cursor = dbapi_connection.cursor()
-        cursor.execute("PRAGMA foreign_keys=ON;")
-        cursor.close()
+def to_async_url(url: str) -> str:
+    """Same database through the async driver (URLs with a driver are kept)"""
+    return (
+        url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+        .replace("postgresql://", "postgresql+asyncpg://", 1)
+        .replace("postgres://", "postgresql+asyncpg://", 1)
+    )
+
+
+class ReplicaRouter:
+    """Chooses the engine for read-only sessions.
+
+    Reads go round-robin to healthy replicas; a client that committed a
+    write in the last `sticky_window` seconds reads from the primary, so it
+    sees its own changes despite replication lag. A replica that fails its
+    health check is skipped until the next check `health_interval` later.
+    Without replicas every session goes to the primary.
+    """
+
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        replicas: list[AsyncEngine] = (),
+        sticky_window: float = 5.0,
+        health_interval: float = 10.0,
+        health_timeout: float = 1.0,
+    ):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.sticky_window = sticky_window
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self._healthy = {id(replica): True for replica in self.replicas}
+        self._checked_at = {id(replica): float("-inf") for replica in self.replicas}
+        self._last_write = TTLCache(maxsize=10000, ttl=sticky_window)
+        self._next = 0
+        self._stats = {"primary_reads": 0, "replica_reads": 0, "sticky_reads": 0, "fallbacks": 0}
+
+    def mark_write(self, key: Optional[str]) -> None:
+        """Remember that this client has just committed to the primary"""
+        if key is not None and self.sticky_window > 0:
+            self._last_write.set(key, True)
+
+    def is_sticky(self, key: Optional[str]) -> bool:
+        return key is not None and self._last_write.get(key, False)
+
+    async def _is_healthy(self, replica: AsyncEngine) -> bool:
+        marker = id(replica)
+        now = time.monotonic()
+        if now - self._checked_at[marker] >= self.health_interval:
+            self._checked_at[marker] = now
+            try:
+                async with replica.connect() as connection:
+                    await asyncio.wait_for(connection.execute(text("SELECT 1")), self.health_timeout)
+                self._healthy[marker] = True
+            except Exception:
+                if self._healthy[marker]:
+                    logger.warning("Read replica %s failed health check", replica.url)
+                self._healthy[marker] = False
+        return self._healthy[marker]
+
+    async def engine_for_read(self, key: Optional[str] = None) -> AsyncEngine:
+        if not self.replicas:
+            self._stats["primary_reads"] += 1
+            return self.primary
+        if self.is_sticky(key):
+            self._stats["sticky_reads"] += 1
+            return self.primary
+
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[self._next % len(self.replicas)]
+            self._next += 1
+            if await self._is_healthy(replica):
+                self._stats["replica_reads"] += 1
+                return replica
+
+        self._stats["fallbacks"] += 1
+        return self.primary
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "replicas": len(self.replicas),
+            "healthy_replicas": sum(self._healthy.values()),
+        }
+
+
+replica_engines = [
+    create_async_engine(url, **engine_options(url))
+    for url in map(to_async_url, settings.DATABASE_REPLICA_URLS)
+]
+for _replica in replica_engines:
+    configure_sqlite_engine(_replica.sync_engine)
+
+db_router = ReplicaRouter(
+    async_engine,
+    replica_engines,
+    sticky_window=settings.DB_READ_YOUR_WRITES_WINDOW,
+    health_interval=settings.DB_REPLICA_HEALTH_INTERVAL,
+    health_timeout=settings.DB_REPLICA_HEALTH_TIMEOUT,
+)
+register_metrics("db_router", db_router.stats)
+
+
+def client_key(request: Request) -> Optional[str]:
+    """Who is reading/writing, for read-your-writes stickiness"""
+    # Ключ — хеш Bearer-токена: сами токены не хранятся в памяти, а чужой ключ
+    # не подделать параметром запроса. Анонимные клиенты не «прилипают» к primary.
+    authorization = request.headers.get("Authorization")
+    if not authorization:
+        return None
+    return hashlib.sha256(authorization.encode()).hexdigest()[:32]
+
+
+def run_migrations(bind: Engine = None, revision: str = "head"):
+    """Upgrade the database schema with Alembic (instead of create_all at import)"""
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+    with (bind or engine).begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
 
 
 def get_db():
@@ -27,4 +232,29 @@ def get_db():
         db.rollback()
         raise
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db(request: Request):
+    """Async session dependency on the primary database.
+
+    The sync crud/service functions run on it through
+    `await db.run_sync(fn, ...)`: their queries go through the async driver,
+    so the worker keeps serving other requests while a query is in flight.
+    """
+    async with AsyncSessionLocal() as db:
+        key = client_key(request)
+        # После коммита этот клиент какое-то время читает из основной БД
+        event.listen(db.sync_session, "after_commit", lambda _session: db_router.mark_write(key))
+        try:
+            yield db
+        except Exception:
+            await db.rollback()
+            raise
+
+
+async def get_read_db(request: Request):
+    """Async session for read-only endpoints: a replica when one is usable"""
+    bind = await db_router.engine_for_read(client_key(request))
+    async with AsyncSessionLocal(bind=bind) as db:
+        yield db
\ No newline at end of file
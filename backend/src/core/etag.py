@@ -0,0 +1,32 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Response
+
+# Условные GET: ETag считается из дешёвых данных о версии (счётчики, max id),
+# а не из тела ответа, поэтому на совпадение отвечаем 304 до загрузки строк.
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag from version parts"""
+    digest = hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for it)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def set_etag(response: Response, etag: str, cache_control: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
@@ -0,0 +1,61 @@
+from decimal import Decimal
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any, Callable, Iterable
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from .settings import settings
+
+try:
+    import orjson
+except ImportError:  # необязательная зависимость: без неё остаётся обычный путь FastAPI
+    orjson = None
+
+# Быстрый путь для списков: ORM-строки сразу превращаются в dict по заранее
+# собранному списку полей схемы и кодируются orjson, минуя повторную
+# валидацию response_model и jsonable_encoder. Формат вывода совпадает
+# с обычным путём (даты ISO 8601, UTC как "Z", Decimal строкой).
+
+# Заголовки, которые выставляет сам ответ, а не эндпоинт
+_OWN_HEADERS = {"content-length", "content-type"}
+
+
+def fast_json_enabled() -> bool:
+    return settings.FAST_JSON_RESPONSES and orjson is not None
+
+
+def _default(value: Any):
+    if isinstance(value, Decimal):
+        return str(value)  # как pydantic в JSON-режиме
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z)
+
+
+@lru_cache(maxsize=None)
+def row_serializer(schema: type[BaseModel]) -> Callable[[Any], dict]:
+    """ORM row -> dict with exactly the schema's fields (built once per schema)"""
+    fields = tuple(schema.model_fields)
+    getter = attrgetter(*fields)
+    if len(fields) == 1:
+        return lambda row: {fields[0]: getter(row)}
+    return lambda row: dict(zip(fields, getter(row)))
+
+
+def fast_list_response(items: Iterable[dict], response: Response) -> FastJSONResponse:
+    """JSON array response that keeps headers set on the injected `response`"""
+    headers = {
+        key: value for key, value in response.headers.items() if key not in _OWN_HEADERS
+    }
+    return FastJSONResponse(list(items), headers=headers)
+
+
+def serialize_rows(rows: Iterable[Any], schema: type[BaseModel], response: Response) -> FastJSONResponse:
+    serialize = row_serializer(schema)
+    return fast_list_response(map(serialize, rows), response)
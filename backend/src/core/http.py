@@ -0,0 +1,87 @@
+import logging
+from typing import Optional
+
+import httpx
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Один пул соединений на процесс: создаётся в lifespan приложения,
+# закрывается при остановке. Сервисы берут клиента через get_http_client().
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _parse_per_host_limits(raw: str) -> dict[str, int]:
+    """Parse "host=10,other=4" into {"host": 10, "other": 4}"""
+    limits = {}
+    for item in raw.split(","):
+        host, _, value = item.partition("=")
+        if host.strip() and value.strip():
+            limits[host.strip()] = int(value)
+    return limits
+
+
+def build_http_client() -> httpx.AsyncClient:
+    """Create a pooled client configured from settings"""
+    http2 = settings.HTTP2 and _http2_available()
+    if settings.HTTP2 and not http2:
+        logger.warning("HTTP2 включён, но пакет h2 не установлен — используем HTTP/1.1")
+
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+    )
+
+    # Отдельный транспорт со своим лимитом на каждый "тяжёлый" хост,
+    # чтобы один медленный сервис не занял весь общий пул
+    mounts = {
+        f"all://{host}": httpx.AsyncHTTPTransport(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+        for host, max_connections in _parse_per_host_limits(settings.HTTP_PER_HOST_LIMITS).items()
+    }
+
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=limits,
+        mounts=mounts,
+        timeout=settings.HTTP_TIMEOUT,
+    )
+
+
+async def start_http_client() -> httpx.AsyncClient:
+    """Open the shared client (called from the app lifespan)"""
+    global _client
+    if _client is None:
+        _client = build_http_client()
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the shared client and all pooled connections"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared outbound client; created lazily outside the app lifespan (scripts)"""
+    global _client
+    if _client is None:
+        _client = build_http_client()
+    return _client
@@ -0,0 +1,59 @@
+from typing import Any, NamedTuple, Optional
+
+from .cache import TTLCache
+from .metrics import register_metrics
+from .settings import settings
+
+# Кеш аутентифицированных пользователей: user_id -> CurrentUser.
+# get_current_user отдаёт неизменяемый снимок вместо ORM-объекта, поэтому
+# его можно разделять между запросами. Изменение пользователя в этом процессе
+# (профиль, роль, удаление) сбрасывает запись сразу, в других воркерах — через TTL.
+
+
+class CurrentUser(NamedTuple):
+    id: int
+    role: str
+    email: str
+
+
+_cache = TTLCache(maxsize=settings.IDENTITY_CACHE_MAX_ENTRIES, ttl=settings.IDENTITY_CACHE_TTL)
+_generation = 0
+_stats = {"invalidations": 0, "stale_stores_skipped": 0}
+
+
+def generation() -> int:
+    """Снимок счётчика инвалидаций; передаётся обратно в store()"""
+    return _generation
+
+
+def get(user_id: int) -> Optional[CurrentUser]:
+    return _cache.get(user_id)
+
+
+def store(seen_generation: int, identity: CurrentUser) -> None:
+    """Cache an identity unless a user changed while it was being loaded"""
+    if seen_generation != _generation:
+        _stats["stale_stores_skipped"] += 1
+        return
+    _cache.set(identity.id, identity)
+
+
+def invalidate(user_id: int) -> None:
+    """Forget a user after their row was updated or deleted"""
+    global _generation
+    _generation += 1
+    _stats["invalidations"] += 1
+    _cache.delete(user_id)
+
+
+def clear() -> None:
+    global _generation
+    _generation += 1
+    _cache.clear()
+
+
+def get_stats() -> dict[str, Any]:
+    return {**_cache.stats(), **_stats}
+
+
+register_metrics("identity_cache", get_stats)
@@ -0,0 +1,15 @@
+from typing import Callable
+
+# Модули регистрируют здесь функции, отдающие свои счётчики;
+# GET /metrics собирает их в один JSON
+_providers: dict[str, Callable[[], dict]] = {}
+
+
+def register_metrics(name: str, provider: Callable[[], dict]) -> None:
+    """Register a callable returning a JSON-serializable dict of counters"""
+    _providers[name] = provider
+
+
+def collect_metrics() -> dict:
+    """Snapshot of all registered counters"""
+    return {name: provider() for name, provider in _providers.items()}
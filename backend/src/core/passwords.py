@@ -0,0 +1,101 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from passlib.context import CryptContext
+
+from .metrics import register_metrics
+from .settings import settings
+
+# argon2 — это десятки миллисекунд CPU на вызов. В event loop пачка входов
+# замораживала бы все остальные запросы воркера, поэтому хеширование и проверка
+# идут в отдельном пуле процессов ограниченного размера. Очередь тоже ограничена:
+# лишние запросы отклоняются сразу (PasswordHasherBusy -> 503), а не копятся.
+
+# Используем argon2 — нет ограничения длины пароля. Параметры из настроек;
+# хеши с другими параметрами verify_and_update предложит пересчитать.
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__rounds=settings.ARGON2_TIME_COST,
+    argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+    argon2__parallelism=settings.ARGON2_PARALLELISM,
+)
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Too many password operations are already waiting for the pool"""
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pending = 0
+_stats = {"hashed": 0, "verified": 0, "rehashed": 0, "rejected": 0}
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_and_update(password: str, password_hash: str) -> tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, password_hash)
+
+
+def start_password_pool() -> None:
+    """Create the worker pool (processes start on first use)"""
+    global _pool
+    if _pool is None:
+        # spawn: дочерние процессы не наследуют потоки и соединения родителя
+        _pool = ProcessPoolExecutor(
+            max_workers=max(1, settings.PASSWORD_HASH_WORKERS),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+
+def stop_password_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+
+async def _run(fn, *args):
+    global _pending
+    if _pending >= settings.PASSWORD_HASH_MAX_PENDING:
+        _stats["rejected"] += 1
+        raise PasswordHasherBusy("Too many concurrent password operations, retry later")
+    start_password_pool()
+
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_pool, fn, *args)
+    finally:
+        _pending -= 1
+
+
+async def hash_password(password: str) -> str:
+    """Argon2 hash computed in the password pool"""
+    password_hash = await _run(_hash, password)
+    _stats["hashed"] += 1
+    return password_hash
+
+
+async def verify_and_update_password(password: str, password_hash: str) -> tuple[bool, Optional[str]]:
+    """Check a password in the pool; also returns a new hash if the stored one is outdated"""
+    valid, new_hash = await _run(_verify_and_update, password, password_hash)
+    _stats["verified"] += 1
+    if new_hash:
+        _stats["rehashed"] += 1
+    return valid, new_hash
+
+
+def get_stats() -> dict:
+    return {
+        **_stats,
+        "pending": _pending,
+        "max_pending": settings.PASSWORD_HASH_MAX_PENDING,
+        "workers": settings.PASSWORD_HASH_WORKERS,
+    }
+
+
+register_metrics("password_hasher", get_stats)
@@ -1,12 +1,12 @@
 from fastapi import Depends, HTTPException, status
+from .identity import CurrentUser
 from .security import get_current_user
-from ..models.users import User
 
 
 def require_role(role: str):
     """Dependency для проверки роли пользователя"""
 
-    def role_checker(current_user: User = Depends(get_current_user)):
+    def role_checker(current_user: CurrentUser = Depends(get_current_user)):
         if current_user.role != role:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Hashable
+
+logger = logging.getLogger(__name__)
+
+# Pub/sub для доставки событий подключённым клиентам (WebSocket, SSE).
+# Broker — интерфейс адаптера: InMemoryBroker раздаёт события внутри одного
+# процесса; адаптер поверх Redis/NATS/LISTEN-NOTIFY реализует тот же
+# интерфейс — publish() отправляет во внешнюю шину, а сообщения из шины
+# раздаются локальным подпискам так же, как здесь.
+
+
+class Subscription:
+    """One consumer's bounded queue.
+
+    A consumer that falls `maxsize` events behind is marked overflowed
+    instead of blocking the publisher or silently losing events; the
+    owner should then drop the connection so the client can resync.
+    """
+
+    def __init__(self, topic: Hashable, maxsize: int):
+        self.topic = topic
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, maxsize))
+        self.overflowed = asyncio.Event()
+
+    def offer(self, event) -> bool:
+        if self.overflowed.is_set():
+            return False
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            self.overflowed.set()
+            return False
+
+    async def get(self):
+        """Next event; raises OverflowError once the consumer has fallen behind"""
+        if self.overflowed.is_set():
+            raise OverflowError("Subscriber queue overflowed")
+        getter = asyncio.ensure_future(self.queue.get())
+        overflow = asyncio.ensure_future(self.overflowed.wait())
+        try:
+            await asyncio.wait({getter, overflow}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            # При отмене (например, по таймауту) не оставляем висящий get(),
+            # иначе он молча заберёт следующее событие
+            overflow.cancel()
+            if not getter.done():
+                getter.cancel()
+        if getter.done() and not getter.cancelled():
+            return getter.result()
+        raise OverflowError("Subscriber queue overflowed")
+
+
+class Broker(ABC):
+    """Adapter interface for topic-based fan-out"""
+
+    @abstractmethod
+    def subscribe(self, topic: Hashable, maxsize: int) -> Subscription:
+        ...
+
+    @abstractmethod
+    def unsubscribe(self, subscription: Subscription) -> None:
+        ...
+
+    @abstractmethod
+    def publish(self, topic: Hashable, event) -> None:
+        """Deliver an event to every subscriber of the topic; never blocks"""
+
+    @abstractmethod
+    def stats(self) -> dict:
+        ...
+
+
+class InMemoryBroker(Broker):
+    """Single-process broker; must be used from the event loop thread"""
+
+    def __init__(self):
+        self._topics: dict[Hashable, set[Subscription]] = defaultdict(set)
+        self._stats = {"published": 0, "delivered": 0, "overflows": 0}
+
+    def subscribe(self, topic: Hashable, maxsize: int) -> Subscription:
+        subscription = Subscription(topic, maxsize)
+        self._topics[topic].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._topics.get(subscription.topic)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._topics[subscription.topic]
+
+    def publish(self, topic: Hashable, event) -> None:
+        self._stats["published"] += 1
+        for subscription in list(self._topics.get(topic, ())):
+            if subscription.offer(event):
+                self._stats["delivered"] += 1
+            elif subscription.overflowed.is_set():
+                self._stats["overflows"] += 1
+                logger.info("Dropping slow subscriber of %r", topic)
+                self.unsubscribe(subscription)
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "topics": len(self._topics),
+            "subscribers": sum(len(subscribers) for subscribers in self._topics.values()),
+        }
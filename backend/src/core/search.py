@@ -0,0 +1,242 @@
+import re
+
+from sqlalchemy import Float, Integer, String, bindparam, text
+from sqlalchemy.engine import Connection
+
+# Полнотекстовый поиск по поездкам (title, destination, description)
+# и по сообщениям чата (content).
+# SQLite: внешние FTS5-таблицы trips_fts / messages_fts, синхронизируются триггерами.
+# Postgres: GIN-индексы по to_tsvector, синхронизируются самими индексами.
+# Все варианты дают подзапрос (rowid, rank, ...), где меньший rank — лучшее совпадение.
+
+_SQLITE_TRIP_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS trips_fts USING fts5(
+        title, destination, description,
+        content='trips', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trips_fts_ai AFTER INSERT ON trips BEGIN
+        INSERT INTO trips_fts(rowid, title, destination, description)
+        VALUES (new.id, new.title, new.destination, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trips_fts_ad AFTER DELETE ON trips BEGIN
+        INSERT INTO trips_fts(trips_fts, rowid, title, destination, description)
+        VALUES ('delete', old.id, old.title, old.destination, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trips_fts_au AFTER UPDATE OF title, destination, description ON trips BEGIN
+        INSERT INTO trips_fts(trips_fts, rowid, title, destination, description)
+        VALUES ('delete', old.id, old.title, old.destination, old.description);
+        INSERT INTO trips_fts(rowid, title, destination, description)
+        VALUES (new.id, new.title, new.destination, new.description);
+    END
+    """,
+]
+
+_SQLITE_MESSAGE_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+        content,
+        content='messages', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE OF content ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+]
+
+# Подсветка совпадений в сниппетах сообщений
+SNIPPET_START = "**"
+SNIPPET_END = "**"
+SNIPPET_ELLIPSIS = "…"
+SNIPPET_WORDS = 12
+
+_POSTGRES_TRIP_VECTOR = (
+    "to_tsvector('simple', coalesce(title, '') || ' ' || "
+    "coalesce(destination, '') || ' ' || coalesce(description, ''))"
+)
+
+_POSTGRES_TRIP_SEARCH_DDL = [
+    f"CREATE INDEX IF NOT EXISTS ix_trips_search ON trips USING gin ({_POSTGRES_TRIP_VECTOR})",
+]
+
+_POSTGRES_MESSAGE_VECTOR = "to_tsvector('simple', content)"
+
+_POSTGRES_MESSAGE_SEARCH_DDL = [
+    f"CREATE INDEX IF NOT EXISTS ix_messages_search ON messages USING gin ({_POSTGRES_MESSAGE_VECTOR})",
+]
+
+
+def search_tokens(term: str | None) -> list[str]:
+    """Слова поискового запроса (Unicode-aware, без операторов и кавычек)"""
+    if not term:
+        return []
+    return re.findall(r"\w+", term)
+
+
+def _ensure_sqlite_fts(connection: Connection, table: str, statements: list[str]) -> None:
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": table},
+    ).first()
+    for statement in statements:
+        connection.execute(text(statement))
+    if not exists:
+        connection.execute(text(f"INSERT INTO {table}({table}) VALUES ('rebuild')"))
+
+
+def _drop_sqlite_fts(connection: Connection, table: str) -> None:
+    for suffix in ("ai", "ad", "au"):
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {table}_{suffix}"))
+    connection.execute(text(f"DROP TABLE IF EXISTS {table}"))
+
+
+def ensure_trip_search_index(connection: Connection) -> None:
+    """Create the trip full-text index if missing and fill it for existing rows"""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        _ensure_sqlite_fts(connection, "trips_fts", _SQLITE_TRIP_SEARCH_DDL)
+    elif dialect == "postgresql":
+        for statement in _POSTGRES_TRIP_SEARCH_DDL:
+            connection.execute(text(statement))
+
+
+def drop_trip_search_index(connection: Connection) -> None:
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        _drop_sqlite_fts(connection, "trips_fts")
+    elif dialect == "postgresql":
+        connection.execute(text("DROP INDEX IF EXISTS ix_trips_search"))
+
+
+def ensure_message_search_index(connection: Connection) -> None:
+    """Create the chat message full-text index if missing and fill it"""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        _ensure_sqlite_fts(connection, "messages_fts", _SQLITE_MESSAGE_SEARCH_DDL)
+    elif dialect == "postgresql":
+        for statement in _POSTGRES_MESSAGE_SEARCH_DDL:
+            connection.execute(text(statement))
+
+
+def drop_message_search_index(connection: Connection) -> None:
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        _drop_sqlite_fts(connection, "messages_fts")
+    elif dialect == "postgresql":
+        connection.execute(text("DROP INDEX IF EXISTS ix_messages_search"))
+
+
+def _sqlite_match(tokens: list[str]) -> str:
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def _postgres_match(tokens: list[str]) -> str:
+    return " & ".join(f"{token}:*" for token in tokens)
+
+
+def trip_matches(dialect: str, term: str):
+    """Подзапрос (rowid, rank) поездок, подходящих под запрос, или None.
+
+    Каждое слово ищется по префиксу, все слова обязательны.
+    Для прочих СУБД возвращает None — вызывающий код откатывается на LIKE.
+    """
+    tokens = search_tokens(term)
+    if not tokens:
+        return None
+
+    if dialect == "sqlite":
+        query = _sqlite_match(tokens)
+        stmt = text(
+            "SELECT rowid AS rowid, bm25(trips_fts) AS rank "
+            "FROM trips_fts WHERE trips_fts MATCH :query"
+        ).bindparams(query=query)
+    elif dialect == "postgresql":
+        query = _postgres_match(tokens)
+        stmt = text(
+            f"SELECT id AS rowid, -ts_rank({_POSTGRES_TRIP_VECTOR}, to_tsquery('simple', :query)) AS rank "
+            f"FROM trips WHERE {_POSTGRES_TRIP_VECTOR} @@ to_tsquery('simple', :query)"
+        ).bindparams(query=query)
+    else:
+        return None
+
+    return stmt.columns(rowid=Integer, rank=Float).subquery("trip_matches")
+
+
+def message_matches(dialect: str, term: str, trip_id: int):
+    """Подзапрос (rowid, rank) сообщений одной поездки под запрос, или None.
+
+    Поездка ограничивается внутри самого поиска, поэтому ранжирование
+    считается только для её сообщений, а не для всего индекса.
+    Сниппеты — отдельно и только для страницы, см. message_snippets().
+    """
+    tokens = search_tokens(term)
+    if not tokens:
+        return None
+
+    if dialect == "sqlite":
+        # trip_id нет в FTS-таблице: сужаем по rowid через ix_messages_trip_id_id
+        stmt = text(
+            "SELECT rowid AS rowid, bm25(messages_fts) AS rank "
+            "FROM messages_fts WHERE messages_fts MATCH :query "
+            "AND rowid IN (SELECT id FROM messages WHERE trip_id = :trip_id)"
+        ).bindparams(query=_sqlite_match(tokens), trip_id=trip_id)
+    elif dialect == "postgresql":
+        stmt = text(
+            f"SELECT id AS rowid, -ts_rank({_POSTGRES_MESSAGE_VECTOR}, to_tsquery('simple', :query)) AS rank "
+            f"FROM messages WHERE trip_id = :trip_id AND {_POSTGRES_MESSAGE_VECTOR} @@ to_tsquery('simple', :query)"
+        ).bindparams(query=_postgres_match(tokens), trip_id=trip_id)
+    else:
+        return None
+
+    return stmt.columns(rowid=Integer, rank=Float).subquery("message_matches")
+
+
+def message_snippets(dialect: str, term: str, message_ids: list[int]):
+    """Запрос (rowid, snippet) для уже выбранных сообщений, или None.
+
+    Сниппет — фрагмент вокруг совпадения, найденные слова обёрнуты
+    в SNIPPET_START / SNIPPET_END.
+    """
+    tokens = search_tokens(term)
+    if not tokens or not message_ids:
+        return None
+
+    markers = {"start": SNIPPET_START, "end": SNIPPET_END, "ellipsis": SNIPPET_ELLIPSIS}
+    if dialect == "sqlite":
+        stmt = text(
+            "SELECT rowid AS rowid, "
+            f"snippet(messages_fts, 0, :start, :end, :ellipsis, {SNIPPET_WORDS}) AS snippet "
+            "FROM messages_fts WHERE messages_fts MATCH :query AND rowid IN :ids"
+        ).bindparams(bindparam("ids", expanding=True), query=_sqlite_match(tokens), ids=message_ids, **markers)
+    elif dialect == "postgresql":
+        stmt = text(
+            "SELECT id AS rowid, ts_headline('simple', content, to_tsquery('simple', :query), "
+            f"'StartSel=' || :start || ', StopSel=' || :end || ', FragmentDelimiter=' || :ellipsis "
+            f"|| ', MaxWords={SNIPPET_WORDS}, MinWords=3, MaxFragments=1') AS snippet "
+            "FROM messages WHERE id IN :ids"
+        ).bindparams(bindparam("ids", expanding=True), query=_postgres_match(tokens), ids=message_ids, **markers)
+    else:
+        return None
+
+    return stmt.columns(rowid=Integer, snippet=String)
@@ -2,21 +2,25 @@ from datetime import datetime, timedelta, timezone
 from typing import Optional
 import uuid
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from .settings import settings
-from .db import get_db
+from .db import get_async_db
+from . import identity
+from .passwords import pwd_context
+from .identity import CurrentUser
+from ..models.users import User
 
 # -------------------------------
 # ПАРОЛИ
 # -------------------------------
 
-# Используем argon2 — нет ограничения длины пароля
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
 bearer_scheme = HTTPBearer(auto_error=False)
 
+# Синхронные варианты — для скриптов и тестов; запросы идут через core.passwords
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Проверка пароля"""
@@ -31,7 +35,7 @@ def get_password_hash(password: str) -> str:
 # JWT
 # -------------------------------
 
-def _build_token(user_id: int, token_type: str, expires_delta: timedelta) -> tuple[str, datetime]:
+def _build_token(user_id: int, token_type: str, expires_delta: timedelta) -> tuple[str, datetime, Optional[str]]:
     """Создание JWT"""
     now = datetime.now(timezone.utc)
     expire = now + expires_delta
@@ -43,26 +47,30 @@ def _build_token(user_id: int, token_type: str, expires_delta: timedelta) -> tup
     if token_type == "refresh":
         payload["jti"] = uuid.uuid4().hex
     encoded_jwt = jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt, expire
+    return encoded_jwt, expire, payload.get("jti")
 
 
 def create_access_token(user_id: int, expires_delta: Optional[timedelta] = None) -> str:
     """Создание access токена"""
     lifetime = expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    token, _ = _build_token(user_id, "access", lifetime)
+    token, _, _ = _build_token(user_id, "access", lifetime)
     return token
 
 
-def create_refresh_token(user_id: int, expires_delta: Optional[timedelta] = None) -> tuple[str, datetime]:
-    """Создание refresh токена"""
+def create_refresh_token(user_id: int, expires_delta: Optional[timedelta] = None) -> tuple[str, str, datetime]:
+    """Создание refresh токена: (JWT, jti для хранения в БД, срок действия)"""
     lifetime = expires_delta or timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    return _build_token(user_id, "refresh", lifetime)
+    token, expire, jti = _build_token(user_id, "refresh", lifetime)
+    return token, jti, expire
 
 
-def decode_token(token: str, expected_type: Optional[str] = None) -> dict:
+def decode_token(token: str, expected_type: Optional[str] = None, verify_exp: bool = True) -> dict:
     """Декодирование токена"""
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = jwt.decode(
+            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM],
+            options={"verify_exp": verify_exp},
+        )
     except JWTError as exc:
         raise ValueError("Invalid token") from exc
 
@@ -82,15 +90,27 @@ def verify_token(token: str, expected_type: Optional[str] = None) -> Optional[di
     except ValueError:
         return None
 
+def stream_user_id(token: Optional[str], authorization: Optional[str]) -> Optional[int]:
+    """User id from an access token for WebSocket/SSE connections.
+
+    Browsers cannot set headers on WebSocket/EventSource, so the token may
+    come as a query parameter; otherwise a Bearer Authorization header is used.
+    """
+    if token is None:
+        scheme, _, credentials = (authorization or "").partition(" ")
+        token = credentials if scheme.lower() == "bearer" else None
+    payload = verify_token(token or "", expected_type="access")
+    return int(payload["sub"]) if payload else None
+
 # -------------------------------
 # АУТЕНТИФИКАЦИЯ ПОЛЬЗОВАТЕЛЯ
 # -------------------------------
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
-    db: Session = Depends(get_db)
-):
-    """Получение текущего пользователя по Bearer токену"""
+    db: AsyncSession = Depends(get_async_db)
+) -> CurrentUser:
+    """Получение текущего пользователя по Bearer токену (снимок id, role, email)"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -105,10 +125,16 @@ def get_current_user(
     except ValueError:
         raise credentials_exception
 
-    user_id: str = payload.get("sub")
-    from ..crud import users as crud_users  # локальный импорт чтобы избежать circular import
-    user = crud_users.get_user(db, user_id=int(user_id))
+    user_id = int(payload.get("sub"))
+    user = identity.get(user_id)
     if user is None:
-        raise credentials_exception
+        seen_generation = identity.generation()
+        row = (await db.execute(
+            select(User.id, User.role, User.email).where(User.id == user_id)
+        )).first()
+        if row is None:
+            raise credentials_exception
+        user = CurrentUser(*row)
+        identity.store(seen_generation, user)
 
     return user
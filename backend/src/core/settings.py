@@ -5,8 +5,91 @@ from typing import List, Optional
 class Settings:
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./travel_app.db")
+    # URL для асинхронного драйвера; по умолчанию выводится из DATABASE_URL
+    ASYNC_DATABASE_URL: str = os.getenv(
+        "ASYNC_DATABASE_URL",
+        DATABASE_URL
+        .replace("sqlite://", "sqlite+aiosqlite://", 1)
+        .replace("postgresql://", "postgresql+asyncpg://", 1)
+        .replace("postgres://", "postgresql+asyncpg://", 1),
+    )
+    # Применять миграции Alembic при старте приложения
+    # (выключите, если запускаете `alembic upgrade head` отдельно)
+    DB_MIGRATE_ON_STARTUP: bool = os.getenv("DB_MIGRATE_ON_STARTUP", "True").lower() == "true"
+    # Реплики только для чтения через запятую (пусто — всё идёт в основную БД).
+    # Пишущий клиент читает из основной БД ещё DB_READ_YOUR_WRITES_WINDOW секунд
+    DATABASE_REPLICA_URLS: List[str] = [
+        url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+    ]
+    DB_READ_YOUR_WRITES_WINDOW: float = float(os.getenv("DB_READ_YOUR_WRITES_WINDOW", "5.0"))
+    # Как часто перепроверять реплику и сколько ждать ответа на проверку
+    DB_REPLICA_HEALTH_INTERVAL: float = float(os.getenv("DB_REPLICA_HEALTH_INTERVAL", "10.0"))
+    DB_REPLICA_HEALTH_TIMEOUT: float = float(os.getenv("DB_REPLICA_HEALTH_TIMEOUT", "1.0"))
+    # Пул соединений (для файловой SQLite и Postgres; in-memory SQLite не трогаем)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    # Профиль SQLite: WAL (читатели не ждут писателя), NORMAL (fsync только на checkpoint),
+    # mmap и кеш страниц, временные таблицы в памяти, ожидание блокировки вместо
+    # "database is locked". SQLITE_TUNED=false оставляет только foreign_keys
+    SQLITE_TUNED: bool = os.getenv("SQLITE_TUNED", "True").lower() == "true"
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # байт
+    SQLITE_CACHE_SIZE: int = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # <0 — в КиБ (64 МБ)
+    SQLITE_TEMP_STORE: str = os.getenv("SQLITE_TEMP_STORE", "MEMORY")
+    SQLITE_BUSY_TIMEOUT: int = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))  # мс
     
     WEATHER_API_KEY: str = os.getenv("WEATHER_API_KEY", "c466af0f9030c5296428f96e789689f7")
+    # Сколько городов опрашиваем одновременно и сколько секунд ждём всю страницу
+    WEATHER_MAX_CONCURRENCY: int = int(os.getenv("WEATHER_MAX_CONCURRENCY", "10"))
+    WEATHER_BATCH_TIMEOUT: float = float(os.getenv("WEATHER_BATCH_TIMEOUT", "2.0"))
+    # Таймаут одного запроса к провайдеру и параметры circuit breaker
+    WEATHER_TIMEOUT: float = float(os.getenv("WEATHER_TIMEOUT", "3.0"))
+    WEATHER_CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("WEATHER_CIRCUIT_FAILURE_THRESHOLD", "5"))
+    WEATHER_CIRCUIT_RECOVERY_TIMEOUT: float = float(os.getenv("WEATHER_CIRCUIT_RECOVERY_TIMEOUT", "30.0"))
+    # Кеш погоды: свежесть, окно stale-while-revalidate, кеш "город не найден"
+    WEATHER_CACHE_TTL: int = int(os.getenv("WEATHER_CACHE_TTL", "600"))
+    WEATHER_CACHE_STALE_TTL: int = int(os.getenv("WEATHER_CACHE_STALE_TTL", "1800"))
+    WEATHER_CACHE_NEGATIVE_TTL: int = int(os.getenv("WEATHER_CACHE_NEGATIVE_TTL", "3600"))
+    WEATHER_CACHE_MAX_ENTRIES: int = int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", "1024"))
+    WEATHER_CACHE_PERSISTENT: bool = os.getenv("WEATHER_CACHE_PERSISTENT", "True").lower() == "true"
+
+    # Кеш ответов публичного каталога GET /trips/ (сбрасывается при изменении поездок)
+    TRIPS_CACHE_ENABLED: bool = os.getenv("TRIPS_CACHE_ENABLED", "True").lower() == "true"
+    TRIPS_CACHE_TTL: float = float(os.getenv("TRIPS_CACHE_TTL", "30"))
+    TRIPS_CACHE_MAX_ENTRIES: int = int(os.getenv("TRIPS_CACHE_MAX_ENTRIES", "256"))
+    # Страницы больше этого числа строк не кешируются (память кеша ограничена и по размеру)
+    TRIPS_CACHE_MAX_PAGE_ROWS: int = int(os.getenv("TRIPS_CACHE_MAX_PAGE_ROWS", "100"))
+
+    # Кеш ролей участников (trip_id, user_id) -> role для проверок доступа.
+    # Записи в этом процессе сбрасывают его сразу, в других воркерах — через TTL
+    MEMBERSHIP_CACHE_ENABLED: bool = os.getenv("MEMBERSHIP_CACHE_ENABLED", "True").lower() == "true"
+    MEMBERSHIP_CACHE_TTL: float = float(os.getenv("MEMBERSHIP_CACHE_TTL", "30"))
+    MEMBERSHIP_CACHE_MAX_ENTRIES: int = int(os.getenv("MEMBERSHIP_CACHE_MAX_ENTRIES", "10000"))
+
+    # Кеш личности (id, role, email) для get_current_user, чтобы не читать users на каждый запрос
+    IDENTITY_CACHE_TTL: float = float(os.getenv("IDENTITY_CACHE_TTL", "30"))
+    IDENTITY_CACHE_MAX_ENTRIES: int = int(os.getenv("IDENTITY_CACHE_MAX_ENTRIES", "10000"))
+
+    # Списки (поездки, сообщения, комментарии, участники) кодировать через orjson
+    # без повторной валидации response_model; нужен пакет orjson
+    FAST_JSON_RESPONSES: bool = os.getenv("FAST_JSON_RESPONSES", "False").lower() == "true"
+
+    # Потоковая выгрузка каталога: строк на одну пачку серверного курсора
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+
+    # WebSocket-чат: сколько событий может ждать отправки одному клиенту,
+    # прежде чем медленное соединение будет закрыто (клиент переподключится)
+    CHAT_WS_QUEUE_SIZE: int = int(os.getenv("CHAT_WS_QUEUE_SIZE", "100"))
+
+    # SSE-лента активности поездки: буфер для Last-Event-ID и heartbeat
+    ACTIVITY_REPLAY_SIZE: int = int(os.getenv("ACTIVITY_REPLAY_SIZE", "200"))  # событий на поездку
+    ACTIVITY_REPLAY_TTL: float = float(os.getenv("ACTIVITY_REPLAY_TTL", "3600"))
+    ACTIVITY_MAX_TRIPS: int = int(os.getenv("ACTIVITY_MAX_TRIPS", "1000"))
+    ACTIVITY_QUEUE_SIZE: int = int(os.getenv("ACTIVITY_QUEUE_SIZE", "100"))
+    ACTIVITY_HEARTBEAT_INTERVAL: float = float(os.getenv("ACTIVITY_HEARTBEAT_INTERVAL", "15"))
 
     # JWT
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production")
@@ -14,6 +97,33 @@ class Settings:
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "600"))
     REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
 
+    # Пароли: argon2 считается в отдельном пуле процессов, а не в event loop.
+    # Сверх PASSWORD_HASH_MAX_PENDING ожидающих операций запросы сразу получают 503.
+    # При смене стоимости старые хеши пересчитываются при следующем входе.
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+    ARGON2_TIME_COST: int = int(os.getenv("ARGON2_TIME_COST", "3"))
+    ARGON2_MEMORY_COST: int = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # КиБ
+    ARGON2_PARALLELISM: int = int(os.getenv("ARGON2_PARALLELISM", "4"))
+
+    # Фоновое обновление погоды для ближайших поездок и недавно просмотренных городов
+    WEATHER_PREFETCH_ENABLED: bool = os.getenv("WEATHER_PREFETCH_ENABLED", "True").lower() == "true"
+    WEATHER_PREFETCH_INTERVAL: float = float(os.getenv("WEATHER_PREFETCH_INTERVAL", "300"))
+    WEATHER_PREFETCH_RATE: float = float(os.getenv("WEATHER_PREFETCH_RATE", "2.0"))  # запросов в секунду
+    WEATHER_PREFETCH_HORIZON_DAYS: int = int(os.getenv("WEATHER_PREFETCH_HORIZON_DAYS", "14"))
+    WEATHER_PREFETCH_RECENT_WINDOW: int = int(os.getenv("WEATHER_PREFETCH_RECENT_WINDOW", "3600"))
+    WEATHER_PREFETCH_MAX_CITIES: int = int(os.getenv("WEATHER_PREFETCH_MAX_CITIES", "500"))
+
+    # Общий HTTP-клиент для внешних сервисов
+    HTTP_TIMEOUT: float = float(os.getenv("HTTP_TIMEOUT", "10.0"))
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30.0"))
+    # HTTP/2 требует пакет h2 (pip install "httpx[http2]"), без него остаётся HTTP/1.1
+    HTTP2: bool = os.getenv("HTTP2", "False").lower() == "true"
+    # Лимит соединений на хост: "api.openweathermap.org=10,storage=4"
+    HTTP_PER_HOST_LIMITS: str = os.getenv("HTTP_PER_HOST_LIMITS", "api.openweathermap.org=10")
+
     MINIO_ENDPOINT: str = "travel_minio:9000"
     MINIO_ACCESS_KEY: str = "minioadmin"
     MINIO_SECRET_KEY: str = "minioadmin"
@@ -39,7 +149,8 @@ class Settings:
     )
     CORS_CREDENTIALS: bool = True
     CORS_METHODS: List[str] = ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"]
-    CORS_HEADERS: List[str] = ["Authorization", "Content-Type", "Accept", "Origin"]
+    CORS_HEADERS: List[str] = ["Authorization", "Content-Type", "Accept", "Origin", "If-None-Match"]
+    CORS_EXPOSE_HEADERS: List[str] = ["X-Next-Cursor", "ETag", "Content-Disposition"]
     
     # Application
     DEBUG: bool = os.getenv("DEBUG", "True").lower() == "true"
@@ -1,4 +1,5 @@
 from sqlalchemy.orm import Session
+from ..core.search import message_matches, message_snippets, search_tokens
 from ..models.messages import Message
 from ..schemas.messages import MessageCreate, MessageUpdate
 
@@ -13,6 +14,62 @@ def get_trip_messages(db: Session, trip_id: int, skip: int = 0, limit: int = 100
     return db.query(Message).filter(Message.trip_id == trip_id).order_by(Message.created_at.desc()).offset(skip).limit(limit).all()
 
 
+def get_message_history(
+    db: Session,
+    trip_id: int,
+    before_id: int | None = None,
+    after_id: int | None = None,
+    limit: int = 50,
+):
+    """Keyset page of trip messages, newest first. Returns (messages, has_more).
+
+    Without cursors — the newest `limit` messages; `before_id` scrolls back
+    to older ones, `after_id` fetches newer ones (oldest of them first
+    in the page). has_more says whether there are further messages
+    in the same direction.
+    """
+    query = db.query(Message).filter(Message.trip_id == trip_id)
+    if before_id is not None:
+        query = query.filter(Message.id < before_id)
+    if after_id is not None:
+        query = query.filter(Message.id > after_id)
+
+    # Берём на одну строку больше, чтобы узнать has_more без COUNT
+    forward = after_id is not None and before_id is None
+    order = Message.id.asc() if forward else Message.id.desc()
+    rows = query.order_by(order).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if forward:
+        rows.reverse()
+    return rows, has_more
+
+
+def search_messages(db: Session, trip_id: int, query: str, skip: int = 0, limit: int = 20):
+    """Full-text search in one trip's chat, best matches first: [(message, snippet)]"""
+    dialect = db.get_bind().dialect.name
+    matches = message_matches(dialect, query, trip_id)
+    if matches is None:
+        if not search_tokens(query):
+            return []
+        # СУБД без полнотекстового индекса: сниппет — всё сообщение
+        pattern = f"%{query.strip()}%"
+        rows = db.query(Message).filter(
+            Message.trip_id == trip_id, Message.content.ilike(pattern)
+        ).order_by(Message.id.desc()).offset(skip).limit(limit).all()
+        return [(message, message.content) for message in rows]
+
+    page = db.query(Message).join(
+        matches, matches.c.rowid == Message.id
+    ).order_by(matches.c.rank, Message.id.desc()).offset(skip).limit(limit).all()
+
+    # Сниппеты строим только для найденной страницы
+    snippets_stmt = message_snippets(dialect, query, [message.id for message in page])
+    snippets = dict(db.execute(snippets_stmt).all()) if snippets_stmt is not None else {}
+    return [(message, snippets.get(message.id, message.content)) for message in page]
+
+
 def get_user_messages(db: Session, user_id: int, skip: int = 0, limit: int = 100):
     """Get messages sent by a specific user"""
     return db.query(Message).filter(Message.user_id == user_id).order_by(Message.created_at.desc()).offset(skip).limit(limit).all()
@@ -1,18 +1,24 @@
+import hashlib
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, update
 from datetime import datetime, timezone
 from ..models.refresh_tokens import RefreshToken
 
 
+def hash_token_id(jti: str) -> str:
+    """Storage key of a refresh token: sha256 hex of its jti"""
+    return hashlib.sha256(jti.encode()).hexdigest()
+
+
 def create_refresh_token(
     db: Session, 
-    token: str, 
+    jti: str, 
     user_id: int, 
     expires_at: datetime
 ) -> RefreshToken:
     """Create a new refresh token"""
     db_token = RefreshToken(
-        token=token,
+        token_hash=hash_token_id(jti),
         user_id=user_id,
         expires_at=expires_at
     )
@@ -22,10 +28,10 @@ def create_refresh_token(
     return db_token
 
 
-def get_refresh_token(db: Session, token: str) -> RefreshToken:
-    """Get refresh token by token string"""
+def get_refresh_token(db: Session, jti: str) -> RefreshToken:
+    """Get refresh token by its jti"""
     return db.query(RefreshToken).filter(
-        RefreshToken.token == token
+        RefreshToken.token_hash == hash_token_id(jti)
     ).first()
 
 
@@ -36,9 +42,9 @@ def get_refresh_token_by_user(db: Session, user_id: int) -> list[RefreshToken]:
     ).all()
 
 
-def revoke_refresh_token(db: Session, token: str) -> RefreshToken:
+def revoke_refresh_token(db: Session, jti: str) -> RefreshToken:
     """Revoke a refresh token"""
-    db_token = get_refresh_token(db, token)
+    db_token = get_refresh_token(db, jti)
     if db_token:
         db_token.is_revoked = True
         db.commit()
@@ -46,6 +52,36 @@ def revoke_refresh_token(db: Session, token: str) -> RefreshToken:
     return db_token
 
 
+def rotate_refresh_token(
+    db: Session,
+    old_jti: str,
+    new_jti: str,
+    user_id: int,
+    expires_at: datetime
+) -> bool:
+    """Revoke the old token and store the new one in a single transaction"""
+    # Условный UPDATE: из двух параллельных обновлений одним токеном
+    # rowcount == 1 увидит только одно, второе получит отказ
+    revoked = db.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.token_hash == hash_token_id(old_jti),
+            RefreshToken.user_id == user_id,
+            RefreshToken.is_revoked == False,
+            RefreshToken.expires_at > datetime.now(timezone.utc),
+        )
+        .values(is_revoked=True)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if revoked != 1:
+        db.rollback()
+        return False
+
+    db.add(RefreshToken(token_hash=hash_token_id(new_jti), user_id=user_id, expires_at=expires_at))
+    db.commit()
+    return True
+
+
 def revoke_all_user_tokens(db: Session, user_id: int):
     """Revoke all refresh tokens for a user"""
     tokens = get_refresh_token_by_user(db, user_id)
@@ -67,9 +103,9 @@ def delete_expired_tokens(db: Session):
     db.commit()
 
 
-def is_token_valid(db: Session, token: str) -> bool:
+def is_token_valid(db: Session, jti: str) -> bool:
     """Check if refresh token is valid (exists, not revoked, not expired)"""
-    db_token = get_refresh_token(db, token)
+    db_token = get_refresh_token(db, jti)
     if not db_token:
         return False
     
@@ -1,7 +1,24 @@
+from typing import Optional
+
 from sqlalchemy.orm import Session
+from ..core.cache import TTLCache
+from ..core.metrics import register_metrics
+from ..core.settings import settings
 from ..models.trip_members import TripMember
 from ..schemas.trip_members import TripMemberCreate, TripMemberUpdate
 
+# Роли участников для проверок доступа: (trip_id, user_id) -> role.
+# Первый уровень — словарь в db.info (живёт одну сессию, т.е. один запрос),
+# второй — общий TTL-кеш процесса. Отсутствие членства тоже кешируется.
+# Записи через create/update/delete_trip_member сбрасывают оба уровня.
+
+_NOT_MEMBER = ""
+_MEMO_KEY = "trip_member_roles"
+
+_role_cache = TTLCache(maxsize=settings.MEMBERSHIP_CACHE_MAX_ENTRIES, ttl=settings.MEMBERSHIP_CACHE_TTL)
+_generation = 0
+_stats = {"memo_hits": 0, "queries": 0, "invalidations": 0, "stale_stores_skipped": 0}
+
 
 def get_trip_member(db: Session, trip_id: int, user_id: int):
     """Get trip member by trip and user ID"""
@@ -26,6 +43,7 @@ def create_trip_member(db: Session, trip_member: TripMemberCreate):
     )
     db.add(db_trip_member)
     db.commit()
+    forget_member_role(db, trip_member.trip_id, trip_member.user_id)
     db.refresh(db_trip_member)
     return db_trip_member
 
@@ -38,6 +56,7 @@ def update_trip_member(db: Session, trip_id: int, user_id: int, trip_member_upda
         for field, value in update_data.items():
             setattr(db_trip_member, field, value)
         db.commit()
+        forget_member_role(db, trip_id, user_id)
         db.refresh(db_trip_member)
     return db_trip_member
 
@@ -48,15 +67,81 @@ def delete_trip_member(db: Session, trip_id: int, user_id: int):
     if db_trip_member:
         db.delete(db_trip_member)
         db.commit()
+        forget_member_role(db, trip_id, user_id)
     return db_trip_member
 
 
+def get_member_role(db: Session, trip_id: int, user_id: int) -> Optional[str]:
+    """Role of the user in the trip, or None for non-members (cached)"""
+    key = (trip_id, user_id)
+    memo = db.info.setdefault(_MEMO_KEY, {})
+    if key in memo:
+        _stats["memo_hits"] += 1
+        return memo[key] or None
+
+    role = _role_cache.get(key) if settings.MEMBERSHIP_CACHE_ENABLED else None
+    if role is None:
+        seen_generation = _generation
+        _stats["queries"] += 1
+        row = db.query(TripMember.role).filter(
+            TripMember.trip_id == trip_id,
+            TripMember.user_id == user_id
+        ).first()
+        role = row.role if row else _NOT_MEMBER
+        if settings.MEMBERSHIP_CACHE_ENABLED:
+            if seen_generation == _generation:
+                _role_cache.set(key, role)
+            else:
+                # Пока читали, членство могли изменить — не кешируем старое значение
+                _stats["stale_stores_skipped"] += 1
+
+    memo[key] = role
+    return role or None
+
+
+def forget_member_role(db: Optional[Session], trip_id: int, user_id: int):
+    """Drop a cached role after the membership row changed"""
+    global _generation
+    _generation += 1
+    _stats["invalidations"] += 1
+    _role_cache.delete((trip_id, user_id))
+    if db is not None:
+        db.info.get(_MEMO_KEY, {}).pop((trip_id, user_id), None)
+
+
+def forget_trip_roles(db: Optional[Session], trip_id: int):
+    """Drop cached roles of every member (the trip was deleted with its members)"""
+    global _generation
+    _generation += 1
+    _stats["invalidations"] += 1
+    for key, _ in _role_cache.items():
+        if key[0] == trip_id:
+            _role_cache.delete(key)
+    if db is not None:
+        memo = db.info.get(_MEMO_KEY, {})
+        for key in [key for key in memo if key[0] == trip_id]:
+            del memo[key]
+
+
+def clear_membership_cache():
+    """Forget every cached role (e.g. when the database itself is replaced)"""
+    global _generation
+    _generation += 1
+    _role_cache.clear()
+
+
+def get_membership_cache_stats():
+    return {**_role_cache.stats(), **_stats, "enabled": settings.MEMBERSHIP_CACHE_ENABLED}
+
+
+register_metrics("membership_cache", get_membership_cache_stats)
+
+
 def is_trip_member(db: Session, trip_id: int, user_id: int):
     """Check if user is a member of the trip"""
-    return get_trip_member(db, trip_id, user_id) is not None
+    return get_member_role(db, trip_id, user_id) is not None
 
 
 def is_trip_organizer(db: Session, trip_id: int, user_id: int):
     """Check if user is organizer of the trip"""
-    trip_member = get_trip_member(db, trip_id, user_id)
-    return trip_member and trip_member.role == "organizer"
+    return get_member_role(db, trip_id, user_id) == "organizer"
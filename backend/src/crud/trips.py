@@ -1,43 +1,115 @@
+import base64
+import json
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import or_, select, update, union_all, String, type_coerce
 from ..models.trips import Trip
+from ..models.trip_members import TripMember
+from ..models.messages import Message
+from ..models.comments import Comment
 from ..schemas.trips import TripCreate, TripUpdate
+from ..core.search import search_tokens, trip_matches
 from sqlalchemy.orm import Session
 from ..models.trips import Trip
-from datetime import date
-from sqlalchemy import or_, func, and_
+from datetime import date, datetime
+from decimal import Decimal
+from sqlalchemy import or_, func, and_, Date, DateTime
+
+# Колонки, по которым можно сортировать каталог (и строить курсор)
+SORTABLE_COLUMNS = ("created_at", "start_date", "end_date", "budget_total", "title", "destination", "id")
+
+
+def _compares_stored_text(column, dialect: str) -> bool:
+    # SQLite хранит даты текстом в том формате, в каком их записали (func.now() — без
+    # микросекунд, ORM — с ними), поэтому сравниваем с сохранённой строкой
+    return dialect == "sqlite" and isinstance(column.type, (Date, DateTime))
+
+
+def _cursor_key(column, dialect: str):
+    """Выражение ключа сортировки, которое попадает в курсор и сравнивается с ним"""
+    if _compares_stored_text(column, dialect):
+        return type_coerce(column, String)
+    return column
+
+
+def _dump_key(key):
+    """Ключ сортировки в JSON-совместимом виде (тип восстановит _load_key)"""
+    if isinstance(key, (date, datetime)):
+        return key.isoformat()
+    if isinstance(key, Decimal):
+        return str(key)
+    return key
+
+
+def _load_key(column, dialect: str, key):
+    """Ключ из курсора -> значение того же типа, что и колонка сортировки"""
+    if key is None or _compares_stored_text(column, dialect):
+        return key
+    python_type = column.type.python_type
+    if python_type is Decimal:
+        return Decimal(key)
+    if python_type is datetime:
+        return datetime.fromisoformat(key)
+    if python_type is date:
+        return date.fromisoformat(key)
+    if python_type is float and isinstance(key, (int, float)):
+        return float(key)
+    if not isinstance(key, python_type):
+        raise TypeError(key)
+    return key
 
-def get_all_trips(
-    db: Session, 
-    skip: int = 0, 
-    limit: int = 100, 
-    search: str = None, 
-    min_budget: float = None, 
-    max_budget: float = None,
-    start_date: date = None, 
-    end_date: date = None, 
-    sort_by: str = "created_at",
-    sort_order: str = "desc"
-):
-    query = db.query(Trip)
 
-    # 1. Поиск по названию или локации
+def _encode_cursor(sort_by: str, sort_order: str, key, trip_id: int) -> str:
+    raw = json.dumps([sort_by, sort_order, _dump_key(key), trip_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort_by: str, sort_order: str, column, dialect: str):
+    """Вернуть (ключ сортировки нужного типа, id) из курсора или ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, cursor_order, key, trip_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if (cursor_sort, cursor_order) != (sort_by, sort_order) or not isinstance(trip_id, int):
+        raise ValueError("Cursor does not match sort parameters")
+    try:
+        key = _load_key(column, dialect, key)
+    except (ArithmeticError, ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    return key, trip_id
+
+
+def _catalogue_sort(search, sort_by: str, sort_order: str):
+    """Нормализованные (sort_by, sort_order, колонка сортировки)"""
+    if sort_by == "relevance" and search_tokens(search):
+        # Лучшие совпадения первыми: rank у нас "меньше — лучше"
+        return "relevance", "asc", Trip.created_at  # заменится на rank, если есть индекс
+    if sort_by not in SORTABLE_COLUMNS:
+        sort_by = "created_at"
+    sort_order = "asc" if sort_order == "asc" else "desc"
+    return sort_by, sort_order, getattr(Trip, sort_by)
+
+
+def _filter_catalogue(query, dialect: str, search, min_budget, max_budget, start_date, end_date):
+    """Фильтры каталога для Query или select(); возвращает (query, rank или None)"""
+    rank = None
+
+    # 1. Полнотекстовый поиск по названию, локации и описанию
     if search:
-        # Делаем два варианта: один с маленькой, другой с Большой буквы
-        s_low = f"%{search.lower().strip()}%"
-        s_cap = f"%{search.capitalize().strip()}%"
-        
-        query = query.filter(
-            or_(
-                Trip.title.like(s_low),
-                Trip.title.like(s_cap),
-                Trip.destination.like(s_low),
-                Trip.destination.like(s_cap)
+        matches = trip_matches(dialect, search)
+        if matches is not None:
+            query = query.join(matches, matches.c.rowid == Trip.id)
+            rank = matches.c.rank
+        elif search_tokens(search):
+            # СУБД без полнотекстового индекса
+            pattern = f"%{search.strip()}%"
+            query = query.filter(
+                or_(
+                    Trip.title.ilike(pattern),
+                    Trip.destination.ilike(pattern),
+                    Trip.description.ilike(pattern),
+                )
             )
-        )
-        
-        # И ЕЩЕ ОДНУ ДЛЯ ПРОВЕРКИ
-    print(f"DEBUG: SQL запрос готов: {query}")
 
     # 2. Фильтрация по бюджету
     if min_budget is not None:
@@ -45,26 +117,152 @@ def get_all_trips(
     if max_budget is not None:
         query = query.filter(Trip.budget_total <= max_budget)
 
-    # 3. ДОБАВЛЯЕМ: Фильтрация по датам (теперь она заработает!)
+    # 3. Фильтрация по датам
     if start_date:
         query = query.filter(Trip.start_date >= start_date)
     if end_date:
         query = query.filter(Trip.end_date <= end_date)
 
-    # 4. Сортировка
-    column = getattr(Trip, sort_by, Trip.created_at)
+    return query, rank
+
+
+def get_all_trips(
+    db: Session, 
+    skip: int = 0, 
+    limit: int = 100, 
+    search: str = None, 
+    min_budget: float = None, 
+    max_budget: float = None,
+    start_date: date = None, 
+    end_date: date = None, 
+    sort_by: str = "created_at",
+    sort_order: str = "desc",
+    cursor: str = None,
+):
+    """Filtered trip catalogue page.
+
+    Returns (trips, next_cursor). With `cursor` the page continues right
+    after the row the cursor was issued for (keyset pagination on the sort
+    key plus id), so deep pages cost the same as the first one; `skip`
+    keeps working for old clients. next_cursor is None on the last page.
+    """
+    sort_by, sort_order, column = _catalogue_sort(search, sort_by, sort_order)
+    dialect = db.get_bind().dialect.name
+
+    query, rank = _filter_catalogue(
+        db.query(Trip), dialect,
+        search, min_budget, max_budget, start_date, end_date,
+    )
+    if sort_by == "relevance" and rank is not None:
+        column = rank
+
+    # Ключ хранит тип колонки, поэтому сравнение в курсоре идёт с типизированным
+    # параметром (Postgres не сравнит numeric/date с varchar)
+    sort_key = _cursor_key(column, dialect)
+    query = query.add_columns(sort_key.label("sort_key"))
+
+    # 4. Сортировка: id — тай-брейкер, NULL всегда в конце (одинаково в SQLite и Postgres)
     if sort_order == "asc":
-        query = query.order_by(column.asc())
+        query = query.order_by(column.asc().nulls_last(), Trip.id.asc())
+        after = lambda left, right: left > right
+    else:
+        query = query.order_by(column.desc().nulls_last(), Trip.id.desc())
+        after = lambda left, right: left < right
+
+    # 5. Пагинация: курсор (keyset) или старый offset
+    if cursor:
+        key, last_id = _decode_cursor(cursor, sort_by, sort_order, column, dialect)
+        if key is None:
+            query = query.filter(column.is_(None), after(Trip.id, last_id))
+        else:
+            query = query.filter(
+                or_(
+                    after(sort_key, key),
+                    and_(sort_key == key, after(Trip.id, last_id)),
+                    column.is_(None),
+                )
+            )
     else:
-        query = query.order_by(column.desc())
+        query = query.offset(skip)
+
+    rows = query.limit(limit).all()
+    trips = [trip for trip, _ in rows]
+
+    next_cursor = None
+    if rows and len(rows) == limit:
+        last_trip, last_key = rows[-1]
+        next_cursor = _encode_cursor(sort_by, sort_order, last_key, last_trip.id)
+    return trips, next_cursor
+
+def catalogue_export_statement(
+    dialect: str,
+    columns,
+    search: str = None,
+    min_budget: float = None,
+    max_budget: float = None,
+    start_date: date = None,
+    end_date: date = None,
+    sort_by: str = "created_at",
+    sort_order: str = "desc",
+):
+    """select() of the given Trip columns with the catalogue filters and order, for streaming"""
+    sort_by, sort_order, column = _catalogue_sort(search, sort_by, sort_order)
+    stmt, rank = _filter_catalogue(
+        select(*columns), dialect, search, min_budget, max_budget, start_date, end_date
+    )
+    if sort_by == "relevance" and rank is not None:
+        column = rank
+    if sort_order == "asc":
+        return stmt.order_by(column.asc().nulls_last(), Trip.id.asc())
+    return stmt.order_by(column.desc().nulls_last(), Trip.id.desc())
 
-    return query.offset(skip).limit(limit).all()
 
 def get_trip(db: Session, trip_id: int):
     """Get trip by ID"""
     return db.query(Trip).filter(Trip.id == trip_id).first()
 
 
+def get_trip_version(db: Session, trip_id: int):
+    """Version counter of a trip (None if there is no such trip)"""
+    return db.query(Trip.version).filter(Trip.id == trip_id).scalar()
+
+
+def get_catalogue_version(db: Session):
+    """(count, max id, sum of versions) — changes whenever any trip changes"""
+    count, max_id, versions = db.query(
+        func.count(Trip.id), func.max(Trip.id), func.coalesce(func.sum(Trip.version), 0)
+    ).one()
+    return count, max_id, versions
+
+
+def refresh_trip_counters(db, trip_ids=None):
+    """Recount member/message/comment counters and last activity from the child tables"""
+    # Принимает Session или Connection (миграция 0007); возвращает число строк
+    def count_of(model):
+        return select(func.count()).where(model.trip_id == Trip.id).correlate(Trip).scalar_subquery()
+
+    activity = union_all(
+        select(TripMember.trip_id, TripMember.joined_at.label("at")),
+        select(Message.trip_id, Message.created_at),
+        select(Comment.trip_id, Comment.created_at),
+    ).subquery()
+    latest = select(func.max(activity.c.at)).where(
+        activity.c.trip_id == Trip.id
+    ).correlate(Trip).scalar_subquery()
+
+    stmt = update(Trip).values(
+        member_count=count_of(TripMember),
+        message_count=count_of(Message),
+        comment_count=count_of(Comment),
+        last_activity_at=latest,
+        # Счётчики входят в ответы API — старые ETag должны перестать совпадать
+        version=Trip.version + 1,
+    )
+    if trip_ids is not None:
+        stmt = stmt.where(Trip.id.in_(list(trip_ids)))
+    return db.execute(stmt.execution_options(synchronize_session=False)).rowcount
+
+
 def get_trips(db: Session, skip: int = 0, limit: int = 100):
     """Get list of trips with pagination"""
     return db.query(Trip).offset(skip).limit(limit).all()
@@ -112,15 +310,49 @@ def delete_trip(db: Session, trip_id: int):
         db.commit()
     return db_trip
 
+def _only_member_trips(query, user_id: int):
+    """Keep trips the user belongs to (unique (user_id, trip_id) — без дублей)"""
+    return query.join(
+        TripMember,
+        and_(TripMember.trip_id == Trip.id, TripMember.user_id == user_id),
+    )
+
+
 def get_user_trips(db: Session, user_id: int, skip: int = 0, limit: int = 100):
     """Get all trips where user is a member"""
-    return db.query(Trip).filter(Trip.creator_id == user_id).offset(skip).limit(limit).all()
-
-def search_trips(db: Session, query: str, skip: int = 0, limit: int = 100):
-    """Search trips by title or destination"""
-    return db.query(Trip).filter(
-        or_(
-            Trip.title.ilike(f"%{query}%"),
-            Trip.destination.ilike(f"%{query}%")
-        )
+    return _only_member_trips(db.query(Trip), user_id).order_by(
+        Trip.created_at.desc(), Trip.id.desc()
     ).offset(skip).limit(limit).all()
+
+def get_upcoming_destinations(db: Session, today: date, until: date, limit: int = 500):
+    """Distinct destinations of trips that are in progress or start before `until`"""
+    rows = db.query(Trip.destination).filter(
+        Trip.start_date <= until,
+        or_(Trip.end_date >= today, and_(Trip.end_date.is_(None), Trip.start_date >= today)),
+    ).distinct().limit(limit).all()
+    return [row.destination for row in rows]
+
+def search_trips(
+    db: Session, query: str, skip: int = 0, limit: int = 100, member_id: int | None = None
+):
+    """Search trips by title, destination or description, best matches first (optionally only member_id's trips)"""
+    matches = trip_matches(db.get_bind().dialect.name, query)
+    if matches is None:
+        if not search_tokens(query):
+            return []
+        pattern = f"%{query.strip()}%"
+        trips = db.query(Trip).filter(
+            or_(
+                Trip.title.ilike(pattern),
+                Trip.destination.ilike(pattern),
+                Trip.description.ilike(pattern),
+            )
+        )
+        if member_id is not None:
+            trips = _only_member_trips(trips, member_id)
+        return trips.order_by(Trip.id).offset(skip).limit(limit).all()
+
+    trips = db.query(Trip).join(matches, matches.c.rowid == Trip.id)
+    if member_id is not None:
+        trips = _only_member_trips(trips, member_id)
+    return trips.order_by(matches.c.rank, Trip.id).offset(skip).limit(limit).all()
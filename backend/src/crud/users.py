@@ -2,7 +2,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import or_
 from ..models.users import User
 from ..schemas.users import UserCreate, UserUpdate
-from ..core.security import get_password_hash
+from ..core import identity
 
 
 def get_user(db: Session, user_id: int):
@@ -20,13 +20,11 @@ def get_users(db: Session, skip: int = 0, limit: int = 100):
     return db.query(User).offset(skip).limit(limit).all()
 
 
-def create_user(db: Session, user: UserCreate):
-    """Create new user"""
-    hashed_password = get_password_hash(user.password)
-
+def create_user(db: Session, user: UserCreate, password_hash: str):
+    """Create new user (password_hash is computed by the caller, see core.passwords)"""
     db_user = User(
         email=user.email,
-        password_hash=hashed_password,
+        password_hash=password_hash,
         name=None,
         bio=None,
         avatar_url=None
@@ -47,16 +45,27 @@ def update_user(db: Session, user_id: int, user_update: UserUpdate):
         for field, value in update_data.items():
             setattr(db_user, field, value)
         db.commit()
+        identity.invalidate(user_id)
         db.refresh(db_user)
     return db_user
 
 
+def update_password_hash(db: Session, user_id: int, password_hash: str):
+    """Store a recomputed password hash (rehash on login)"""
+    updated = db.query(User).filter(User.id == user_id).update(
+        {User.password_hash: password_hash}, synchronize_session=False
+    )
+    db.commit()
+    return updated
+
+
 def delete_user(db: Session, user_id: int):
     """Delete user"""
     db_user = get_user(db, user_id)
     if db_user:
         db.delete(db_user)
         db.commit()
+        identity.invalidate(user_id)
     return db_user
 
 
@@ -0,0 +1,40 @@
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from ..models.weather_cache import WeatherCacheEntry
+
+
+def get_entry(db: Session, city: str):
+    """Get cached weather entry by normalized city"""
+    return db.get(WeatherCacheEntry, city)
+
+
+def upsert_entry(
+    db: Session,
+    city: str,
+    payload: str | None,
+    fetched_at: float,
+    expires_at: float,
+):
+    """Insert or replace cached weather for a city"""
+    db_entry = WeatherCacheEntry(
+        city=city,
+        payload=payload,
+        fetched_at=fetched_at,
+        expires_at=expires_at,
+    )
+    try:
+        db_entry = db.merge(db_entry)
+        db.commit()
+    except IntegrityError:
+        # Другой воркер успел записать тот же город — его ответ не хуже нашего
+        db.rollback()
+    return db_entry
+
+
+def delete_expired_entries(db: Session, before: float):
+    """Delete entries whose freshness ended before the given timestamp"""
+    deleted = db.query(WeatherCacheEntry).filter(
+        WeatherCacheEntry.expires_at < before
+    ).delete()
+    db.commit()
+    return deleted
@@ -0,0 +1,76 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from ..core.db import AsyncSessionLocal
+from ..core.security import stream_user_id
+from ..core.settings import settings
+from ..service import activity
+from ..service import trips as trip_service
+
+router = APIRouter(prefix="/trips", tags=["activity"])
+
+
+async def _event_stream(request: Request, trip_id: int, last_event_id: Optional[str]):
+    # Подписываемся до чтения буфера, чтобы не потерять события между ними
+    subscription = activity.activity_broker.subscribe(
+        activity.activity_topic(trip_id), settings.ACTIVITY_QUEUE_SIZE
+    )
+    try:
+        yield b"retry: 3000\n\n"
+
+        missed = activity.events_since(trip_id, last_event_id)
+        if missed is None:
+            yield activity.resync_event()
+            missed = []
+        last_seq = activity.parse_event_id(last_event_id) or 0
+        for event in missed:
+            yield event.encode()
+            last_seq = event.seq
+
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    subscription.get(), settings.ACTIVITY_HEARTBEAT_INTERVAL
+                )
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    return
+                yield b": heartbeat\n\n"
+                continue
+            except OverflowError:
+                # Клиент отстал: закрываем поток, он переподключится с Last-Event-ID
+                return
+            if event.seq > last_seq:
+                last_seq = event.seq
+                yield event.encode()
+    finally:
+        activity.activity_broker.unsubscribe(subscription)
+
+
+@router.get("/{trip_id}/events")
+async def trip_activity_stream(
+    trip_id: int,
+    request: Request,
+    token: Optional[str] = None,
+    authorization: Optional[str] = Header(None),
+    last_event_id: Optional[str] = Header(None),
+):
+    """📡 SSE-лента поездки: участники, комментарии, изменения поездки"""
+    user_id = stream_user_id(token, authorization)
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
+
+    async with AsyncSessionLocal() as db:
+        try:
+            await db.run_sync(trip_service.get_trip_details, trip_id, user_id)
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+
+    return StreamingResponse(
+        _event_stream(request, trip_id, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from ..core.db import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.db import get_async_db
+from ..core.identity import CurrentUser
+from ..core.passwords import PasswordHasherBusy, hash_password, verify_and_update_password
 from ..core.security import get_current_user
 from ..schemas.users import UserLogin, UserCreate
 from ..schemas.auth import Token, LoginResponse, RefreshTokenRequest
 from ..service import auth as auth_service
+from ..service import users as user_service
 from ..models.users import User
 from src.schemas.users import UserProfileUpdate
 
@@ -14,30 +17,44 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 
 
 @router.post("/register", response_model=LoginResponse, status_code=status.HTTP_201_CREATED)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """ Регистрация нового пользователя"""
     try:
-        result = auth_service.register_user(db, user_data)
+        # Занятый email отсекаем до argon2: дубликаты не тратят место в очереди пула
+        await db.run_sync(user_service.ensure_email_available, user_data.email)
+        await db.close()
+        password_hash = await hash_password(user_data.password)
+        result = await db.run_sync(auth_service.register_user, user_data, password_hash)
         return result
+    except PasswordHasherBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.post("/login", response_model=LoginResponse)
-async def login(login_data: UserLogin, db: Session = Depends(get_db)):
+async def login(login_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """ Вход в систему (получить токены)"""
     try:
-        result = auth_service.authenticate_user(db, login_data)
+        user_id, password_hash = await db.run_sync(auth_service.get_login_credentials, login_data.email)
+        # Не держим соединение с БД, пока пароль проверяется в пуле процессов
+        await db.close()
+        valid, new_hash = await verify_and_update_password(login_data.password, password_hash)
+        if not valid:
+            raise ValueError("Invalid email or password")
+        result = await db.run_sync(auth_service.complete_login, user_id, new_hash)
         return result
+    except PasswordHasherBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except ValueError as e:
         raise HTTPException(status_code=401, detail=str(e))
 
 
 @router.post("/refresh", response_model=Token)
-async def refresh_token(token_data: RefreshTokenRequest, db: Session = Depends(get_db)):
+async def refresh_token(token_data: RefreshTokenRequest, db: AsyncSession = Depends(get_async_db)):
     """Обновить access токен используя refresh токен"""
     try:
-        token_data_obj = auth_service.refresh_access_token(db, token_data.refresh_token)
+        token_data_obj = await db.run_sync(auth_service.refresh_access_token, token_data.refresh_token)
         return token_data_obj
     except ValueError as e:
         raise HTTPException(status_code=401, detail=str(e))
@@ -46,11 +63,11 @@ async def refresh_token(token_data: RefreshTokenRequest, db: Session = Depends(g
 @router.post("/logout", status_code=status.HTTP_200_OK)
 async def logout(
     token_data: RefreshTokenRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """ Выйти из системы (отозвать refresh токен)"""
     try:
-        result = auth_service.logout_user(db, token_data.refresh_token)
+        result = await db.run_sync(auth_service.logout_user, token_data.refresh_token)
         return result
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -58,12 +75,12 @@ async def logout(
 
 @router.post("/revoke-all", status_code=status.HTTP_200_OK)
 async def revoke_all_tokens(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """ Отозвать все refresh токены текущего пользователя"""
     try:
-        result = auth_service.revoke_all_user_tokens(db, current_user.id)
+        result = await db.run_sync(auth_service.revoke_all_user_tokens, current_user.id)
         return result
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -71,24 +88,32 @@ async def revoke_all_tokens(
 
 @router.get("/me")
 async def get_current_user_info(
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """ Получить информацию о текущем пользователе"""
     from ..schemas.users import UserRead
-    return UserRead.model_validate(current_user)
+    user = await db.get(User, current_user.id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return UserRead.model_validate(user)
 
 
 @router.put("/profile")
-def update_profile(
+async def update_profile(
     profile_data: UserProfileUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    current_user.name = profile_data.name
-    current_user.bio = profile_data.bio
-    current_user.avatar_url = profile_data.avatar_url
+    user = await db.get(User, current_user.id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
 
-    db.commit()
-    db.refresh(current_user)
+    user.name = profile_data.name
+    user.bio = profile_data.bio
+    user.avatar_url = profile_data.avatar_url
 
-    return current_user
\ No newline at end of file
+    await db.commit()
+    await db.refresh(user)
+
+    return user
\ No newline at end of file
@@ -1,22 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from ..core.db import get_db
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Response
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.db import get_async_db, get_read_db
+from ..core.etag import make_etag, etag_matches, not_modified, set_etag
+from ..core.fast_json import fast_json_enabled, serialize_rows
 from ..schemas.comments import CommentCreate, CommentRead, CommentUpdate
 from ..service import comments as comment_service
 
 router = APIRouter(prefix="/trips", tags=["comments"])
 
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
 
 @router.post("/{trip_id}/comments", response_model=CommentRead, status_code=status.HTTP_201_CREATED)
 async def add_comment(
     trip_id: int, 
     comment_data: CommentCreate,
     user_id: int,  # В реальном приложении получать из токена
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """➕ Добавить комментарий"""
     try:
-        comment = comment_service.create_comment(db, comment_data, user_id)
+        comment = await db.run_sync(comment_service.create_comment, comment_data, user_id)
         return comment
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -26,13 +31,23 @@ async def add_comment(
 async def get_trip_comments(
     trip_id: int, 
     user_id: int,  # В реальном приложении получать из токена
+    response: Response,
     skip: int = 0, 
     limit: int = 100,
-    db: Session = Depends(get_db)
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """📋 Список комментариев"""
     try:
-        comments = comment_service.get_trip_comments(db, trip_id, user_id, skip, limit)
+        version = await db.run_sync(comment_service.get_trip_comments_version, trip_id, user_id)
+        etag = make_etag("comments", trip_id, version, skip, limit)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag, PRIVATE_CACHE_CONTROL)
+        set_etag(response, etag, PRIVATE_CACHE_CONTROL)
+
+        comments = await db.run_sync(comment_service.get_trip_comments, trip_id, user_id, skip, limit)
+        if fast_json_enabled():
+            return serialize_rows(comments, CommentRead, response)
         return comments
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -42,11 +57,11 @@ async def get_trip_comments(
 async def delete_comment(
     comment_id: int, 
     user_id: int,  # В реальном приложении получать из токена
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """❌ Удалить комментарий"""
     try:
-        comment_service.delete_comment(db, comment_id, user_id)
+        await db.run_sync(comment_service.delete_comment, comment_id, user_id)
         return None
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
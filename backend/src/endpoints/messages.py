@@ -1,22 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from ..core.db import get_db
-from ..schemas.messages import MessageCreate, MessageRead, MessageUpdate
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Response, Query, WebSocket, WebSocketDisconnect
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.db import AsyncSessionLocal, get_async_db, get_read_db
+from ..core.etag import make_etag, etag_matches, not_modified, set_etag
+from ..core.fast_json import fast_json_enabled, row_serializer, serialize_rows
+from ..core.identity import CurrentUser
+from ..schemas.messages import MessageCreate, MessageHistory, MessageRead, MessageSearchHit, MessageUpdate
+from ..core.security import get_current_user, stream_user_id
+from ..core.settings import settings
 from ..service import messages as message_service
+from ..service.chat import chat_broker, chat_topic
 
 router = APIRouter(prefix="/trips", tags=["messages"])
 
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
 
 @router.post("/{trip_id}/messages", response_model=MessageRead, status_code=status.HTTP_201_CREATED)
 async def send_message(
     trip_id: int, 
     message_data: MessageCreate,
     user_id: int,  # В реальном приложении получать из токена
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """💬 Отправить сообщение"""
     try:
-        message = message_service.send_message(db, message_data, user_id)
+        message = await db.run_sync(message_service.send_message, message_data, user_id)
         return message
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -26,13 +37,111 @@ async def send_message(
 async def get_trip_messages(
     trip_id: int, 
     user_id: int,  # В реальном приложении получать из токена
+    response: Response,
     skip: int = 0, 
     limit: int = 100,
-    db: Session = Depends(get_db)
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """📜 Получить все сообщения"""
     try:
-        messages = message_service.get_trip_messages(db, trip_id, user_id, skip, limit)
+        version = await db.run_sync(message_service.get_trip_messages_version, trip_id, user_id)
+        etag = make_etag("messages", trip_id, version, skip, limit)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag, PRIVATE_CACHE_CONTROL)
+        set_etag(response, etag, PRIVATE_CACHE_CONTROL)
+
+        messages = await db.run_sync(message_service.get_trip_messages, trip_id, user_id, skip, limit)
+        if fast_json_enabled():
+            return serialize_rows(messages, MessageRead, response)
         return messages
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get("/{trip_id}/messages/history", response_model=MessageHistory)
+async def get_message_history(
+    trip_id: int,
+    before_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """📚 История чата: before_id — листать назад, after_id — догрузить новые"""
+    try:
+        messages, has_more = await db.run_sync(
+            message_service.get_message_history, trip_id, current_user.id, before_id, after_id, limit
+        )
+        return {"messages": messages, "has_more": has_more}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get("/{trip_id}/messages/search", response_model=list[MessageSearchHit])
+async def search_messages(
+    trip_id: int,
+    q: str,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """🔍 Поиск по чату поездки: лучшие совпадения первыми, со сниппетами"""
+    try:
+        hits = await db.run_sync(message_service.search_messages, trip_id, q, current_user.id, skip, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    return [
+        {**row_serializer(MessageRead)(message), "snippet": snippet}
+        for message, snippet in hits
+    ]
+
+
+async def _pump_events(websocket: WebSocket, subscription) -> None:
+    """Отдавать события клиенту, пока он подключён и успевает их читать"""
+
+    async def forward():
+        while True:
+            await websocket.send_text(await subscription.get())
+
+    async def wait_disconnect():
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass  # входящие сообщения не принимаем — отправка идёт через POST
+
+    tasks = {asyncio.create_task(forward()), asyncio.create_task(wait_disconnect())}
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+    for task in done:
+        if isinstance(task.exception(), OverflowError):
+            # Клиент отстал: пусть переподключится и догрузит историю по after_id
+            await websocket.close(code=1013, reason="Too slow, resync")
+
+
+@router.websocket("/{trip_id}/ws")
+async def trip_chat_websocket(websocket: WebSocket, trip_id: int, token: Optional[str] = None):
+    """⚡ Живой чат: новые, изменённые и удалённые сообщения поездки"""
+    user_id = stream_user_id(token, websocket.headers.get("authorization"))
+    if user_id is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    async with AsyncSessionLocal() as db:
+        try:
+            await db.run_sync(message_service.check_chat_access, trip_id, user_id)
+        except ValueError:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+
+    await websocket.accept()
+    subscription = chat_broker.subscribe(chat_topic(trip_id), settings.CHAT_WS_QUEUE_SIZE)
+    try:
+        await _pump_events(websocket, subscription)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        chat_broker.unsubscribe(subscription)
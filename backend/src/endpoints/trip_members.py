@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from ..core.db import get_db
+from fastapi import APIRouter, Depends, HTTPException, status, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.db import get_async_db
+from ..core.fast_json import fast_json_enabled, serialize_rows
 from ..schemas.trip_members import TripMemberRead, TripJoinRequest
 from ..service import trip_members as trip_member_service
 
@@ -12,11 +13,11 @@ async def join_trip(
     trip_id: int, 
     join_data: TripJoinRequest,
     user_id: int,  # В реальном приложении получать из токена
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """🔗 Присоединиться к поездке"""
     try:
-        trip_member = trip_member_service.join_trip_request(db, join_data, user_id)
+        trip_member = await db.run_sync(trip_member_service.join_trip_request, join_data, user_id)
         return trip_member
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -26,11 +27,14 @@ async def join_trip(
 async def get_trip_members(
     trip_id: int, 
     user_id: int,  # В реальном приложении получать из токена
-    db: Session = Depends(get_db)
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """👥 Получить участников"""
     try:
-        members = trip_member_service.get_trip_members(db, trip_id, user_id)
+        members = await db.run_sync(trip_member_service.get_trip_members, trip_id, user_id)
+        if fast_json_enabled():
+            return serialize_rows(members, TripMemberRead, response)
         return members
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -42,12 +46,12 @@ async def update_member_role(
     member_id: int, 
     new_role: str,
     organizer_id: int,  # В реальном приложении получать из токена
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """🔁 Изменить роль"""
     try:
-        trip_member = trip_member_service.update_member_role(
-            db, trip_id, member_id, new_role, organizer_id
+        trip_member = await db.run_sync(
+            trip_member_service.update_member_role, trip_id, member_id, new_role, organizer_id
         )
         return trip_member
     except ValueError as e:
@@ -59,16 +63,16 @@ async def remove_trip_member(
     trip_id: int, 
     member_id: int,
     user_id: int,  # В реальном приложении получать из токена
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """➖ Выйти / удалить участника"""
     try:
         if member_id == user_id:
             # Пользователь покидает поездку
-            trip_member_service.leave_trip(db, trip_id, user_id)
+            await db.run_sync(trip_member_service.leave_trip, trip_id, user_id)
         else:
             # Организатор удаляет участника
-            trip_member_service.remove_member(db, trip_id, member_id, user_id)
+            await db.run_sync(trip_member_service.remove_member, trip_id, member_id, user_id)
         return None
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -1,32 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Response, Header, Request, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
 import shutil
 import os
 from datetime import date
 from ..schemas.trips import TripReadWithWeather
-from ..service.weather import get_weather_by_city
+from ..service.weather import cache_epoch, get_weather_by_city, get_weather_for_cities
 from ..service.s3 import s3_service
 
-from ..core.db import get_db
+from ..core.db import client_key, get_async_db, get_read_db
+from ..core.etag import make_etag, etag_matches, not_modified, set_etag
+from ..core.fast_json import fast_json_enabled, fast_list_response, row_serializer
+from ..core.identity import CurrentUser
 from ..core.security import get_current_user
-from ..models.users import User
 from ..models.trips import Trip
-from ..schemas.trips import TripCreate, TripRead, TripUpdate
+from ..schemas.trips import TripCreate, TripRead, TripStatistics, TripUpdate
 from ..service import trips as trip_service
+from ..service import catalogue_cache
+from ..service.trip_export import EXPORT_FORMATS, stream_trips
 
 router = APIRouter(prefix="/trips", tags=["trips"])
 
 
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5 МБ
 ALLOWED_TYPES = ["image/jpeg", "image/png", "image/jpg"]
+# Клиент каждый раз перепроверяет ответ по ETag (дёшево благодаря 304)
+CATALOGUE_CACHE_CONTROL = "public, no-cache"
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+MAX_PAGE_SIZE = 200
 
 @router.post("/{trip_id}/upload-image")
 async def upload_trip_image(
     trip_id: int, 
     file: UploadFile = File(...), 
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     # 1. Проверка формата (оставляем как было)
     if file.content_type not in ALLOWED_TYPES:
@@ -42,7 +51,7 @@ async def upload_trip_image(
         raise HTTPException(status_code=413, detail="Файл слишком большой. Максимум 5МБ")
 
     # 3. Проверка прав доступа (оставляем как было)
-    trip = db.query(Trip).filter(Trip.id == trip_id).first()
+    trip = await db.get(Trip, trip_id)
     if not trip:
         raise HTTPException(status_code=404, detail="Поездка не найдена")
     
@@ -64,8 +73,8 @@ async def upload_trip_image(
         # 5. Обновление БД
         # Теперь тут будет ссылка вида http://localhost:9000/trips/trip_1.png
         trip.image_url = image_url
-        db.commit() 
-        db.refresh(trip)
+        await db.commit()
+        await db.refresh(trip)
 
         return {"image_url": image_url, "status": "Uploaded to S3"}
 
@@ -77,16 +86,17 @@ async def upload_trip_image(
 @router.post("/", response_model=TripRead)
 async def create_trip(
     trip_data: TripCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    trip = trip_service.create_trip(db, trip_data, current_user.id)
+    trip = await db.run_sync(trip_service.create_trip, trip_data, current_user.id)
     return trip
 
 @router.get("/", response_model=List[TripReadWithWeather]) 
 async def get_all_trips(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     search: Optional[str] = None,
     min_budget: Optional[float] = None,
     max_budget: Optional[float] = None,
@@ -94,52 +104,124 @@ async def get_all_trips(
     end_date: Optional[date] = None,
     sort_by: str = "created_at",
     sort_order: str = "desc",
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    
-    trips = trip_service.get_all_trips(
-        db, 
-        skip=skip, 
-        limit=limit, 
-        search=search, 
-        min_budget=min_budget, 
+    """Каталог поездок. Следующую страницу можно получить по курсору
+    из заголовка X-Next-Cursor (без него — по старому skip)."""
+    # Одинаковые запросы каталога отдаём из кеша, не трогая БД
+    cache_key = catalogue_cache.cache_key(
+        skip, limit, search, min_budget, max_budget,
+        start_date, end_date, sort_by, sort_order, cursor
+    )
+    cached = catalogue_cache.get(cache_key)
+    if cached is not None:
+        if etag_matches(if_none_match, cached.etag):
+            return not_modified(cached.etag, CATALOGUE_CACHE_CONTROL)
+        if cached.next_cursor:
+            response.headers["X-Next-Cursor"] = cached.next_cursor
+        set_etag(response, cached.etag, CATALOGUE_CACHE_CONTROL)
+        if fast_json_enabled():
+            return fast_list_response(cached.results, response)
+        return cached.results
+
+    generation = catalogue_cache.generation()
+
+    # Версия каталога + окно свежести погоды: строки не грузим, если ничего не менялось
+    version = await db.run_sync(trip_service.get_catalogue_version)
+    etag = make_etag("trips", *version, cache_epoch())
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, CATALOGUE_CACHE_CONTROL)
+
+    try:
+        trips, next_cursor = await db.run_sync(
+            trip_service.get_all_trips,
+            skip=skip,
+            limit=limit,
+            search=search,
+            min_budget=min_budget,
+            max_budget=max_budget,
+            start_date=start_date,
+            end_date=end_date,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    set_etag(response, etag, CATALOGUE_CACHE_CONTROL)
+
+    # Каждый город запрашиваем один раз и параллельно, а не по поездке за раз
+    weather_by_city = await get_weather_for_cities(trip.destination for trip in trips)
+
+    serialize = row_serializer(TripRead)
+    results = [
+        {**serialize(trip), "weather": weather_by_city.get(trip.destination)}
+        for trip in trips
+    ]
+
+    catalogue_cache.store(cache_key, generation, catalogue_cache.CachedCatalogue(results, next_cursor, etag))
+    if fast_json_enabled():
+        return fast_list_response(results, response)
+    return results
+
+@router.get("/export")
+async def export_trips(
+    request: Request,
+    format: str = "ndjson",
+    search: Optional[str] = None,
+    min_budget: Optional[float] = None,
+    max_budget: Optional[float] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    sort_by: str = "created_at",
+    sort_order: str = "desc",
+):
+    """Весь каталог одним потоком (NDJSON или CSV) с фильтрами как у GET /trips/"""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неизвестный формат. Доступны: {', '.join(EXPORT_FORMATS)}"
+        )
+
+    stream = stream_trips(
+        format,
+        request.is_disconnected,
+        client_key=client_key(request),
+        search=search,
+        min_budget=min_budget,
         max_budget=max_budget,
         start_date=start_date,
         end_date=end_date,
         sort_by=sort_by,
-        sort_order=sort_order
+        sort_order=sort_order,
+    )
+    return StreamingResponse(
+        stream,
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="trips.{format}"'},
     )
-    
-    results = []
-    for trip in trips:
-        weather_data = await get_weather_by_city(trip.destination)
-        
-        trip_dict = {
-            "id": trip.id,
-            "title": trip.title,
-            "description": trip.description,
-            "destination": trip.destination,
-            "start_date": trip.start_date,
-            "end_date": trip.end_date,
-            "budget_total": trip.budget_total,
-            "image_url": trip.image_url,
-            "created_at": trip.created_at,
-            "creator_id": trip.creator_id,
-            "weather": weather_data \
-        }
-        results.append(trip_dict)
-        
-    return results
 
 @router.get("/{trip_id}", response_model=TripReadWithWeather)
 async def get_trip_details(
     trip_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     try:
-        trip = trip_service.get_trip_details(db, trip_id, current_user.id)
-        
+        trip = await db.run_sync(trip_service.get_trip_details, trip_id, current_user.id)
+
+        etag = make_etag("trip", trip.id, trip.version, cache_epoch())
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag, PRIVATE_CACHE_CONTROL)
+        set_etag(response, etag, PRIVATE_CACHE_CONTROL)
+
         weather_data = await get_weather_by_city(trip.destination)
         
         return {
@@ -153,6 +235,10 @@ async def get_trip_details(
             "image_url": trip.image_url,
             "created_at": trip.created_at,
             "creator_id": trip.creator_id,
+            "member_count": trip.member_count,
+            "message_count": trip.message_count,
+            "comment_count": trip.comment_count,
+            "last_activity_at": trip.last_activity_at,
             "weather": weather_data
         }
         
@@ -161,15 +247,28 @@ async def get_trip_details(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка сервера: {str(e)}")
 
+@router.get("/{trip_id}/statistics", response_model=TripStatistics)
+async def get_trip_statistics(
+    trip_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Участники, сообщения, комментарии и последняя активность одним чтением строки поездки"""
+    try:
+        stats = await db.run_sync(trip_service.get_trip_statistics, trip_id, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return stats
+
 @router.put("/{trip_id}", response_model=TripRead)
 async def update_trip(
     trip_id: int,
     trip_data: TripUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     try:
-        trip = trip_service.update_trip(db, trip_id, trip_data, current_user.id)
+        trip = await db.run_sync(trip_service.update_trip, trip_id, trip_data, current_user.id)
         return trip
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -177,12 +276,12 @@ async def update_trip(
 @router.delete("/{trip_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_trip(
     trip_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     try:
-        trip_service.delete_trip(
-            db=db,
+        await db.run_sync(
+            trip_service.delete_trip,
             trip_id=trip_id,
             current_user=current_user
         )
@@ -1,53 +1,68 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from ..core.db import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.db import get_async_db
 from ..schemas.users import UserCreate, UserRead, UserUpdate
 from ..service import users as user_service
 from src.core.rbac import require_role
 from src.models.users import User
+from src.core import identity
+from src.core.identity import CurrentUser
+from src.core.passwords import PasswordHasherBusy, hash_password
 from src.core.security import get_current_user
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 @router.get("/me", response_model=UserRead)
-def read_current_user(
-    current_user: User = Depends(get_current_user),
+async def read_current_user(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
-    return current_user
+    # get_current_user отдаёт только снимок (id, role, email) — профиль читаем отдельно
+    try:
+        return await db.run_sync(user_service.get_user_profile, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
 @router.patch("/{user_id}/role")
-def change_user_role(
+async def change_user_role(
     user_id: int,
     new_role: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(require_role("admin"))
 ):
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     user.role = new_role
-    db.commit()
+    await db.commit()
+    identity.invalidate(user_id)
 
     return {"message": f"Role updated to {new_role}"}
 
 
 @router.post("/", response_model=UserRead, status_code=status.HTTP_201_CREATED)
-async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """👤 Регистрация пользователя"""
     try:
-        user = user_service.create_user(db, user_data)
+        # Занятый email отсекаем до argon2: дубликаты не тратят место в очереди пула
+        await db.run_sync(user_service.ensure_email_available, user_data.email)
+        await db.close()
+        password_hash = await hash_password(user_data.password)
+        user = await db.run_sync(user_service.create_user, user_data, password_hash)
         return user
+    except PasswordHasherBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/{user_id}", response_model=UserRead)
-async def get_user_profile(user_id: int, db: Session = Depends(get_db)):
+async def get_user_profile(user_id: int, db: AsyncSession = Depends(get_async_db)):
     """🔍 Получить профиль"""
     try:
-        user = user_service.get_user_profile(db, user_id)
+        user = await db.run_sync(user_service.get_user_profile, user_id)
         return user
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -55,21 +70,21 @@ async def get_user_profile(user_id: int, db: Session = Depends(get_db)):
 
 @router.put("/{user_id}", response_model=UserRead)
 async def update_user_profile(
-    user_id: int, user_data: UserUpdate, db: Session = Depends(get_db)
+    user_id: int, user_data: UserUpdate, db: AsyncSession = Depends(get_async_db)
 ):
     """✏️ Обновить профиль"""
     try:
-        user = user_service.update_user_profile(db, user_id, user_data)
+        user = await db.run_sync(user_service.update_user_profile, user_id, user_data)
         return user
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_user_account(user_id: int, db: Session = Depends(get_db)):
+async def delete_user_account(user_id: int, db: AsyncSession = Depends(get_async_db)):
     """❌ Удалить аккаунт"""
     try:
-        user_service.delete_user(db, user_id)
+        await db.run_sync(user_service.delete_user, user_id)
         return None
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
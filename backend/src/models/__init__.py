@@ -4,5 +4,6 @@ from .trip_members import TripMember
 from .messages import Message
 from .comments import Comment
 from .refresh_tokens import RefreshToken
+from .weather_cache import WeatherCacheEntry
 
-__all__ = ["User", "Trip", "TripMember", "Message", "Comment", "RefreshToken"]
+__all__ = ["User", "Trip", "TripMember", "Message", "Comment", "RefreshToken", "WeatherCacheEntry"]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..core.db import Base
@@ -22,3 +22,6 @@ class Comment(Base):
     # Relationships
     user = relationship("User", back_populates="comments")
     trip = relationship("Trip", back_populates="comments")
+
+    # Комментарии поездки по времени
+    __table_args__ = (Index("ix_comments_trip_id_created_at", "trip_id", "created_at"),)
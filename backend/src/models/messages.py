@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey, Index, event
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..core.db import Base
+from ..core.search import ensure_message_search_index
 
 
 class Message(Base):
@@ -22,3 +23,17 @@ class Message(Base):
     # Relationships
     user = relationship("User", back_populates="messages")
     trip = relationship("Trip", back_populates="messages")
+
+    # Лента чата: сообщения поездки по времени; история листается по (trip_id, id)
+    __table_args__ = (
+        Index("ix_messages_trip_id_created_at", "trip_id", "created_at"),
+        Index("ix_messages_trip_id_id", "trip_id", "id"),
+    )
+
+
+# Полнотекстовый индекс чата создаётся вместе с таблицей (create_all в тестах и т.п.)
+event.listen(
+    Message.__table__,
+    "after_create",
+    lambda target, connection, **kw: ensure_message_search_index(connection),
+)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..core.db import Base
@@ -23,5 +23,8 @@ class TripMember(Base):
     user = relationship("User", back_populates="trip_memberships")
     trip = relationship("Trip", back_populates="members")
     
-    # Ensure unique user-trip combination
-    __table_args__ = (UniqueConstraint('user_id', 'trip_id', name='unique_user_trip'),)
+    # Ensure unique user-trip combination; trip-first index serves member lists and checks
+    __table_args__ = (
+        UniqueConstraint('user_id', 'trip_id', name='unique_user_trip'),
+        Index("ix_trip_members_trip_id_user_id", "trip_id", "user_id"),
+    )
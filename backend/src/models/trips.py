@@ -1,7 +1,9 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Date, Numeric, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Date, Numeric, ForeignKey, event, update
+from sqlalchemy.orm import Session
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..core.db import Base
+from ..core.search import ensure_trip_search_index
 
 
 class Trip(Base):
@@ -11,14 +13,23 @@ class Trip(Base):
     title = Column(String, nullable=False)
     description = Column(Text, nullable=True)
     destination = Column(String, nullable=False)
-    start_date = Column(Date, nullable=True)
+    start_date = Column(Date, nullable=True, index=True)
     end_date = Column(Date, nullable=True)
-    budget_total = Column(Numeric(10, 2), nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    budget_total = Column(Numeric(10, 2), nullable=True, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     image_url = Column(String, nullable=True)
+    # Растёт при любом изменении поездки, её участников, сообщений и комментариев (для ETag)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # Денормализованные счётчики: ведутся в bump_trip_versions в той же транзакции,
+    # что и запись участника/сообщения/комментария; чинятся refresh_trip_counters
+    member_count = Column(Integer, nullable=False, default=0, server_default="0")
+    message_count = Column(Integer, nullable=False, default=0, server_default="0")
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_activity_at = Column(DateTime(timezone=True), nullable=True)
     
     # Foreign keys
-    creator_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    creator_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     
     # Relationships
     creator = relationship("User", back_populates="trips_created")
@@ -39,3 +50,63 @@ class Trip(Base):
         back_populates="trip",
         cascade="all, delete-orphan"
     )
+
+
+# Полнотекстовый индекс создаётся вместе с таблицей (create_all в тестах и т.п.)
+event.listen(
+    Trip.__table__,
+    "after_create",
+    lambda target, connection, **kw: ensure_trip_search_index(connection),
+)
+
+
+
+# Таблица дочерней записи -> счётчик поездки
+TRIP_COUNTERS = {
+    "trip_members": "member_count",
+    "messages": "message_count",
+    "comments": "comment_count",
+}
+
+
+@event.listens_for(Session, "before_flush")
+def bump_trip_versions(session, flush_context, instances):
+    """Increment trips.version and adjust counters for every trip touched by this flush"""
+    changes = {}
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Trip):
+            if obj in session.dirty and session.is_modified(obj):
+                obj.version = Trip.version + 1
+            continue
+
+        trip_id = getattr(obj, "trip_id", None)
+        if trip_id is None:
+            continue
+        # Сообщения, комментарии, участники
+        deltas, active = changes.get(trip_id, ({}, False))
+        counter = TRIP_COUNTERS.get(getattr(obj, "__tablename__", None))
+        if counter and obj in session.new:
+            deltas[counter] = deltas.get(counter, 0) + 1
+            active = True
+        elif counter and obj in session.deleted:
+            deltas[counter] = deltas.get(counter, 0) - 1
+        changes[trip_id] = (deltas, active)
+
+    # Одинаковые изменения — одним UPDATE ... WHERE id IN (...)
+    groups = {}
+    for trip_id, (deltas, active) in changes.items():
+        shape = (tuple(sorted((k, v) for k, v in deltas.items() if v)), active)
+        groups.setdefault(shape, []).append(trip_id)
+
+    for (deltas, active), trip_ids in groups.items():
+        values = {"version": Trip.version + 1}
+        for counter, delta in deltas:
+            values[counter] = getattr(Trip, counter) + delta
+        if active:
+            values["last_activity_at"] = func.now()
+        session.execute(
+            update(Trip)
+            .where(Trip.id.in_(trip_ids))
+            .values(values)
+            .execution_options(synchronize_session=False)
+        )
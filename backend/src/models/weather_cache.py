@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, Text, Float
+from ..core.db import Base
+
+
+class WeatherCacheEntry(Base):
+    __tablename__ = "weather_cache"
+
+    # Нормализованное название города (см. service.weather.normalize_city)
+    city = Column(String, primary_key=True)
+    # JSON с погодой; NULL означает, что провайдер не знает такого города
+    payload = Column(Text, nullable=True)
+    # Unix-время получения ответа и окончания свежести записи
+    fetched_at = Column(Float, nullable=False)
+    expires_at = Column(Float, nullable=False, index=True)
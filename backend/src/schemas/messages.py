@@ -25,6 +25,17 @@ class MessageRead(MessageBase):
         from_attributes = True
 
 
+class MessageHistory(BaseModel):
+    """Page of chat history (newest first) and whether more messages exist"""
+    messages: list[MessageRead]
+    has_more: bool
+
+
+class MessageSearchHit(MessageRead):
+    """Found message with a highlighted fragment around the match"""
+    snippet: str
+
+
 class MessageDetail(MessageRead):
     """Extended message information with user details"""
     user: Optional[dict] = None
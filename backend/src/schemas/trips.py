@@ -31,11 +31,24 @@ class TripRead(TripBase):
     id: int
     created_at: datetime
     creator_id: int
+    member_count: int = 0
+    message_count: int = 0
+    comment_count: int = 0
+    last_activity_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
 
+class TripStatistics(BaseModel):
+    """Denormalized trip counters (read from the trips row)"""
+    trip_id: int
+    member_count: int
+    message_count: int
+    comment_count: int
+    last_activity_at: Optional[datetime] = None
+
+
 class TripDetail(TripRead):
     """Extended trip information with relationships"""
     creator: Optional[dict] = None
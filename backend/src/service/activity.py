@@ -0,0 +1,93 @@
+import itertools
+import json
+import secrets
+from collections import deque
+from typing import Hashable, NamedTuple, Optional
+
+from ..core.cache import TTLCache
+from ..core.metrics import register_metrics
+from ..core.pubsub import Broker, InMemoryBroker
+from ..core.settings import settings
+
+# Лента активности поездки для SSE: участники, комментарии, правки поездки.
+# У каждой поездки — ограниченный буфер последних событий, по которому
+# переподключившийся клиент догоняет пропущенное через Last-Event-ID.
+# id события — "<эпоха процесса>-<номер>": после рестарта старые id
+# не совпадут по эпохе, и клиент получит resync вместо тихой дыры.
+
+_EPOCH = secrets.token_hex(4)
+_sequence = itertools.count(1)
+
+
+class ActivityEvent(NamedTuple):
+    seq: int
+    type: str
+    data: str  # JSON
+
+    @property
+    def id(self) -> str:
+        return f"{_EPOCH}-{self.seq}"
+
+    def encode(self) -> bytes:
+        return f"id: {self.id}\nevent: {self.type}\ndata: {self.data}\n\n".encode()
+
+
+activity_broker: Broker = InMemoryBroker()
+_replay = TTLCache(maxsize=settings.ACTIVITY_MAX_TRIPS, ttl=settings.ACTIVITY_REPLAY_TTL)
+
+
+def activity_topic(trip_id: int) -> Hashable:
+    return ("activity", trip_id)
+
+
+class _ReplayBuffer:
+    def __init__(self, size: int, evicted_seq: int = 0):
+        self.events: deque[ActivityEvent] = deque(maxlen=max(1, size))
+        self.evicted_seq = evicted_seq  # последний вытесненный из буфера номер
+
+    def append(self, event: ActivityEvent) -> None:
+        if len(self.events) == self.events.maxlen:
+            self.evicted_seq = self.events[0].seq
+        self.events.append(event)
+
+
+def publish_activity(trip_id: int, event_type: str, data: dict) -> ActivityEvent:
+    """Record an event in the trip's replay buffer and push it to subscribers"""
+    event = ActivityEvent(next(_sequence), event_type, json.dumps(data, ensure_ascii=False, default=str))
+    buffer = _replay.get(trip_id)
+    if buffer is None:
+        # Прежний буфер поездки мог быть вытеснен по TTL/LRU вместе с событиями:
+        # всё до этого события считаем потерянным, старые Last-Event-ID получат resync
+        buffer = _ReplayBuffer(settings.ACTIVITY_REPLAY_SIZE, evicted_seq=event.seq - 1)
+    buffer.append(event)
+    _replay.set(trip_id, buffer)  # продлевает TTL активной поездки
+    activity_broker.publish(activity_topic(trip_id), event)
+    return event
+
+
+def parse_event_id(event_id: Optional[str]) -> Optional[int]:
+    """Sequence number from Last-Event-ID, or None if it is not ours"""
+    epoch, _, seq = (event_id or "").partition("-")
+    if epoch != _EPOCH or not seq.isdigit():
+        return None
+    return int(seq)
+
+
+def events_since(trip_id: int, last_event_id: Optional[str]) -> Optional[list[ActivityEvent]]:
+    """Events after Last-Event-ID, or None if some of them are no longer buffered"""
+    if not last_event_id:
+        return []
+    last_seq = parse_event_id(last_event_id)
+    buffer = _replay.get(trip_id)
+    # Чужая эпоха, буфер вытеснен/протух или уже потерял события после last_seq
+    if last_seq is None or buffer is None or last_seq < buffer.evicted_seq:
+        return None
+    return [event for event in buffer.events if event.seq > last_seq]
+
+
+def resync_event() -> bytes:
+    """Tell the client to reload state: replay cannot cover the gap"""
+    return b"event: resync\ndata: {}\n\n"
+
+
+register_metrics("activity", lambda: {**activity_broker.stats(), "buffered_trips": len(_replay)})
@@ -1,11 +1,10 @@
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta, timezone
+from datetime import timedelta
 from ..crud import users as crud_users
 from ..crud import refresh_tokens as crud_refresh_tokens
 from ..schemas.users import UserCreate, UserLogin, UserRead
 from ..schemas.auth import Token, LoginResponse
 from ..core.security import (
-    verify_password,
     create_access_token,
     create_refresh_token as generate_refresh_token,
     decode_token,
@@ -13,15 +12,15 @@ from ..core.security import (
 from ..core.settings import settings
 
 
-def register_user(db: Session, user_data: UserCreate) -> LoginResponse:
-    """Register a new user and return tokens"""
+def register_user(db: Session, user_data: UserCreate, password_hash: str) -> LoginResponse:
+    """Register a new user and return tokens (password_hash is computed by the endpoint)"""
     # Check if user already exists
     existing_user = crud_users.get_user_by_email(db, user_data.email)
     if existing_user:
         raise ValueError("User with this email already exists")
 
     # Create user
-    user = crud_users.create_user(db, user_data)
+    user = crud_users.create_user(db, user_data, password_hash)
 
     # Generate tokens
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -30,12 +29,12 @@ def register_user(db: Session, user_data: UserCreate) -> LoginResponse:
         expires_delta=access_token_expires
     )
 
-    refresh_token_str, refresh_token_expires = generate_refresh_token(user.id)
+    refresh_token_str, refresh_jti, refresh_token_expires = generate_refresh_token(user.id)
     
     # Save refresh token to database
     crud_refresh_tokens.create_refresh_token(
         db=db,
-        token=refresh_token_str,
+        jti=refresh_jti,
         user_id=user.id,
         expires_at=refresh_token_expires
     )
@@ -48,22 +47,22 @@ def register_user(db: Session, user_data: UserCreate) -> LoginResponse:
     )
 
 
-def authenticate_user(db: Session, login_data: UserLogin) -> LoginResponse:
-    """Authenticate user and return tokens using argon2 (no 72-byte limit)"""
-    from ..crud import users as crud_users
-    from ..crud import refresh_tokens as crud_refresh_tokens
-    from ..schemas.users import UserRead
-    from ..core.security import verify_password, create_access_token, create_refresh_token as generate_refresh_token
-    from ..core.settings import settings
-    from datetime import timedelta
-
-    # Получаем пользователя по email
-    user = crud_users.get_user_by_email(db, login_data.email)
+def get_login_credentials(db: Session, email: str) -> tuple[int, str]:
+    """(user id, stored password hash) for a login attempt"""
+    user = crud_users.get_user_by_email(db, email)
     if not user:
         raise ValueError("Invalid email or password")
+    return user.id, user.password_hash
+
+
+def complete_login(db: Session, user_id: int, new_password_hash: str | None = None) -> LoginResponse:
+    """Issue tokens after the password was verified (argon2 runs in the endpoint)"""
+    if new_password_hash:
+        # Хеш с устаревшими параметрами argon2 — сохраняем пересчитанный
+        crud_users.update_password_hash(db, user_id, new_password_hash)
 
-    # Проверяем пароль через argon2
-    if not verify_password(login_data.password, user.password_hash):
+    user = crud_users.get_user(db, user_id)
+    if not user:
         raise ValueError("Invalid email or password")
 
     # Генерация access токена
@@ -71,12 +70,12 @@ def authenticate_user(db: Session, login_data: UserLogin) -> LoginResponse:
     access_token = create_access_token(user.id, expires_delta=access_token_expires)
 
     # Генерация refresh токена
-    refresh_token_str, refresh_token_expires = generate_refresh_token(user.id)
+    refresh_token_str, refresh_jti, refresh_token_expires = generate_refresh_token(user.id)
 
     # Сохраняем refresh токен в базе
     crud_refresh_tokens.create_refresh_token(
         db=db,
-        token=refresh_token_str,
+        jti=refresh_jti,
         user_id=user.id,
         expires_at=refresh_token_expires
     )
@@ -96,40 +95,22 @@ def refresh_access_token(db: Session, refresh_token: str) -> Token:
     except ValueError:
         raise ValueError("Invalid or expired refresh token")
 
-    # Получаем токен из базы
-    db_token = crud_refresh_tokens.get_refresh_token(db, refresh_token)
-
-    if not db_token or db_token.is_revoked:
-        raise ValueError("Invalid or expired refresh token")
-
-    if db_token.expires_at < datetime.utcnow():
-        crud_refresh_tokens.revoke_refresh_token(db, refresh_token)
+    jti = payload.get("jti")
+    if not jti:
         raise ValueError("Invalid or expired refresh token")
-
     user_id = int(payload.get("sub"))
 
-    user = crud_users.get_user(db, user_id)
-    if not user:
-        raise ValueError("User not found")
-
-    # Отзываем старый refresh
-    crud_refresh_tokens.revoke_refresh_token(db, refresh_token)
-
-    # Создаём новый refresh
-    new_refresh_token, refresh_expires = generate_refresh_token(user.id)
-
-    crud_refresh_tokens.create_refresh_token(
-        db=db,
-        token=new_refresh_token,
-        user_id=user.id,
-        expires_at=refresh_expires
-    )
+    # Отзыв старого и сохранение нового refresh — одна транзакция;
+    # повторное или параллельное использование того же токена отклоняется
+    new_refresh_token, new_jti, refresh_expires = generate_refresh_token(user_id)
+    if not crud_refresh_tokens.rotate_refresh_token(db, jti, new_jti, user_id, refresh_expires):
+        raise ValueError("Invalid or expired refresh token")
 
     # Создаём новый access
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
 
     new_access_token = create_access_token(
-        user.id,
+        user_id,
         expires_delta=access_token_expires
     )
 
@@ -143,7 +124,13 @@ def refresh_access_token(db: Session, refresh_token: str) -> Token:
 
 def revoke_refresh_token(db: Session, refresh_token: str):
     """Revoke a refresh token"""
-    db_token = crud_refresh_tokens.revoke_refresh_token(db, refresh_token)
+    # Выйти можно и с истёкшим токеном — подпись проверяется, срок нет
+    try:
+        payload = decode_token(refresh_token, expected_type="refresh", verify_exp=False)
+    except ValueError:
+        raise ValueError("Refresh token not found")
+
+    db_token = crud_refresh_tokens.revoke_refresh_token(db, payload.get("jti") or "")
     if not db_token:
         raise ValueError("Refresh token not found")
     return {"message": "Token revoked successfully"}
@@ -0,0 +1,121 @@
+from typing import Any, NamedTuple, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ..core.cache import TTLCache
+from ..core.metrics import register_metrics
+from ..core.settings import settings
+from ..crud.trips import SORTABLE_COLUMNS
+from ..models.trips import Trip
+
+# Кеш готовых ответов GET /trips/ по нормализованным параметрам запроса.
+# Сбрасывается целиком при любом изменении поездки, в том числе её участников,
+# сообщений и комментариев (от них зависят счётчики в строках каталога):
+# страница с фильтрами может зависеть от любой строки, а записей в каталог
+# намного меньше, чем чтений.
+# Кеш локален для процесса — в других воркерах запись живёт не дольше TTL.
+
+
+class CachedCatalogue(NamedTuple):
+    results: list[dict]
+    next_cursor: Optional[str]
+    etag: str
+
+
+_cache = TTLCache(maxsize=settings.TRIPS_CACHE_MAX_ENTRIES, ttl=settings.TRIPS_CACHE_TTL)
+_generation = 0
+_stats = {"invalidations": 0, "stale_stores_skipped": 0, "oversized_skipped": 0}
+
+
+def cache_key(
+    skip: int,
+    limit: int,
+    search: Optional[str],
+    min_budget: Optional[float],
+    max_budget: Optional[float],
+    start_date,
+    end_date,
+    sort_by: str,
+    sort_order: str,
+    cursor: Optional[str],
+) -> tuple:
+    """Запросы, которые crud выполнит одинаково, получают одинаковый ключ"""
+    search = (search or "").strip().lower() or None
+    if sort_by != "relevance" and sort_by not in SORTABLE_COLUMNS:
+        sort_by = "created_at"
+    sort_order = "asc" if sort_order == "asc" else "desc"
+    return (
+        None if cursor else skip,
+        limit,
+        search,
+        min_budget,
+        max_budget,
+        start_date,
+        end_date,
+        sort_by,
+        sort_order,
+        cursor,
+    )
+
+
+def generation() -> int:
+    """Снимок счётчика инвалидаций; передаётся обратно в store()"""
+    return _generation
+
+
+def get(key: tuple) -> Optional[CachedCatalogue]:
+    if not settings.TRIPS_CACHE_ENABLED:
+        return None
+    return _cache.get(key)
+
+
+def store(key: tuple, seen_generation: int, value: CachedCatalogue) -> None:
+    """Cache a page unless a trip changed while it was being built"""
+    if not settings.TRIPS_CACHE_ENABLED:
+        return
+    if seen_generation != _generation:
+        # Страница могла прочитать данные до изменения — не кешируем её
+        _stats["stale_stores_skipped"] += 1
+        return
+    if len(value.results) > settings.TRIPS_CACHE_MAX_PAGE_ROWS:
+        # Крупные страницы быстро съели бы память и вытеснили ходовые
+        _stats["oversized_skipped"] += 1
+        return
+    _cache.set(key, value)
+
+
+def invalidate() -> None:
+    """Drop every cached page (called after a trip is created, changed or deleted)"""
+    global _generation
+    _generation += 1
+    _stats["invalidations"] += 1
+    _cache.clear()
+
+
+@event.listens_for(Session, "before_flush")
+def _note_catalogue_writes(session, flush_context, instances):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Trip) or getattr(obj, "trip_id", None) is not None:
+            session.info["catalogue_changed"] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    # Сбрасываем после коммита: страница, собранная до него, не переживёт сброс,
+    # а собранная во время — не сохранится из-за смены поколения
+    if session.info.pop("catalogue_changed", False):
+        invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_writes(session):
+    session.info.pop("catalogue_changed", None)
+
+
+def get_stats() -> dict[str, Any]:
+    return {**_cache.stats(), **_stats, "enabled": settings.TRIPS_CACHE_ENABLED}
+
+
+register_metrics("trip_catalogue_cache", get_stats)
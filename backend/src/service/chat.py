@@ -0,0 +1,27 @@
+import json
+from typing import Hashable
+
+from ..core.metrics import register_metrics
+from ..core.pubsub import Broker, InMemoryBroker
+from ..schemas.messages import MessageRead
+
+# Живой чат: события о сообщениях раздаются подписчикам поездки через брокер.
+# Событие кодируется в JSON один раз и уходит всем подписчикам как есть.
+
+chat_broker: Broker = InMemoryBroker()
+
+
+def chat_topic(trip_id: int) -> Hashable:
+    return ("chat", trip_id)
+
+
+def publish_message_event(event_type: str, message) -> None:
+    """Push a message event to the trip's live subscribers"""
+    payload = {
+        "type": event_type,
+        "message": MessageRead.model_validate(message).model_dump(mode="json"),
+    }
+    chat_broker.publish(chat_topic(message.trip_id), json.dumps(payload, ensure_ascii=False))
+
+
+register_metrics("chat", lambda: chat_broker.stats())
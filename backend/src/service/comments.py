@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
-from ..crud import comments as crud_comments, trip_members as crud_trip_members
-from ..schemas.comments import CommentCreate, CommentUpdate
+from ..crud import comments as crud_comments, trip_members as crud_trip_members, trips as crud_trips
+from ..schemas.comments import CommentCreate, CommentRead, CommentUpdate
+from .activity import publish_activity
 
 
 def create_comment(db: Session, comment_data: CommentCreate, user_id: int):
@@ -9,7 +10,20 @@ def create_comment(db: Session, comment_data: CommentCreate, user_id: int):
     if not crud_trip_members.is_trip_member(db, comment_data.trip_id, user_id):
         raise ValueError("You are not a member of this trip")
 
-    return crud_comments.create_comment(db, comment_data, user_id)
+    comment = crud_comments.create_comment(db, comment_data, user_id)
+    publish_activity(
+        comment.trip_id, "comment.created",
+        CommentRead.model_validate(comment).model_dump(mode="json"),
+    )
+    return comment
+
+
+def get_trip_comments_version(db: Session, trip_id: int, user_id: int):
+    """Version of the trip comments for ETags (same access check as the listing)"""
+    if not crud_trip_members.is_trip_member(db, trip_id, user_id):
+        raise ValueError("You are not a member of this trip")
+
+    return crud_trips.get_trip_version(db, trip_id)
 
 
 def get_trip_comments(
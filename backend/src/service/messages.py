@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
-from ..crud import messages as crud_messages, trip_members as crud_trip_members
+from ..crud import messages as crud_messages, trip_members as crud_trip_members, trips as crud_trips
 from ..schemas.messages import MessageCreate, MessageUpdate
+from .chat import publish_message_event
 
 
 def send_message(db: Session, message_data: MessageCreate, user_id: int):
@@ -9,7 +10,23 @@ def send_message(db: Session, message_data: MessageCreate, user_id: int):
     if not crud_trip_members.is_trip_member(db, message_data.trip_id, user_id):
         raise ValueError("You are not a member of this trip")
 
-    return crud_messages.create_message(db, message_data, user_id)
+    message = crud_messages.create_message(db, message_data, user_id)
+    publish_message_event("message.created", message)
+    return message
+
+
+def check_chat_access(db: Session, trip_id: int, user_id: int):
+    """Raise ValueError unless the user may follow the trip chat"""
+    if not crud_trip_members.is_trip_member(db, trip_id, user_id):
+        raise ValueError("You are not a member of this trip")
+
+
+def get_trip_messages_version(db: Session, trip_id: int, user_id: int):
+    """Version of the trip messages for ETags (same access check as the listing)"""
+    if not crud_trip_members.is_trip_member(db, trip_id, user_id):
+        raise ValueError("You are not a member of this trip")
+
+    return crud_trips.get_trip_version(db, trip_id)
 
 
 def get_trip_messages(
@@ -31,7 +48,10 @@ def update_message(
     if not crud_messages.can_user_edit_message(db, message_id, user_id):
         raise ValueError("You can only edit your own messages")
 
-    return crud_messages.update_message(db, message_id, message_data)
+    message = crud_messages.update_message(db, message_id, message_data)
+    if message:
+        publish_message_event("message.updated", message)
+    return message
 
 
 def delete_message(db: Session, message_id: int, user_id: int):
@@ -40,28 +60,26 @@ def delete_message(db: Session, message_id: int, user_id: int):
     if not crud_messages.can_user_edit_message(db, message_id, user_id):
         raise ValueError("You can only delete your own messages")
 
-    return crud_messages.delete_message(db, message_id)
+    message = crud_messages.delete_message(db, message_id)
+    if message:
+        publish_message_event("message.deleted", message)
+    return message
 
 
 def get_message_history(
     db: Session,
     trip_id: int,
     user_id: int,
-    before_message_id: int | None = None,
+    before_id: int | None = None,
+    after_id: int | None = None,
     limit: int = 50,
 ):
-    """Get message history with pagination"""
+    """Get a page of message history with keyset cursors: (messages, has_more)"""
     # Check if user is a member of the trip
     if not crud_trip_members.is_trip_member(db, trip_id, user_id):
         raise ValueError("You are not a member of this trip")
 
-    messages = crud_messages.get_trip_messages(db, trip_id, skip=0, limit=limit)
-
-    # If before_message_id is provided, filter messages before that ID
-    if before_message_id:
-        messages = [msg for msg in messages if msg.id < before_message_id]
-
-    return messages[:limit]
+    return crud_messages.get_message_history(db, trip_id, before_id, after_id, limit)
 
 
 def search_messages(
@@ -70,17 +88,11 @@ def search_messages(
     query: str,
     user_id: int,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = 20,
 ):
-    """Search messages in trip chat"""
+    """Search messages in trip chat: [(message, snippet)], best matches first"""
     # Check if user is a member of the trip
     if not crud_trip_members.is_trip_member(db, trip_id, user_id):
         raise ValueError("You are not a member of this trip")
 
-    # Get all messages and filter by query
-    messages = crud_messages.get_trip_messages(db, trip_id, skip=0, limit=1000)
-    filtered_messages = [
-        msg for msg in messages if query.lower() in msg.content.lower()
-    ]
-
-    return filtered_messages[skip : skip + limit]
+    return crud_messages.search_messages(db, trip_id, query, skip, limit)
@@ -0,0 +1,84 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import AsyncIterator, Awaitable, Callable
+
+from ..core.db import AsyncSessionLocal, db_router
+from ..core.fast_json import orjson
+from ..core.metrics import register_metrics
+from ..core.settings import settings
+from ..crud import trips as crud_trips
+from ..models.trips import Trip
+from ..schemas.trips import TripRead
+
+# Выгрузка каталога потоком: строки читаются серверным курсором пачками
+# по EXPORT_BATCH_SIZE и сразу уходят клиенту, так что память не зависит
+# от размера выборки. Между пачками проверяем, не отключился ли клиент.
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+EXPORT_FIELDS = tuple(TripRead.model_fields)
+
+_stats = {"exports": 0, "rows": 0, "aborted": 0}
+
+
+def _default(value):
+    # Даты — ISO 8601 (как у orjson), Decimal — строкой (как в API)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def _json_line(row) -> bytes:
+    record = dict(zip(EXPORT_FIELDS, row))
+    if orjson is not None:
+        return orjson.dumps(record, default=_default, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(record, default=_default, ensure_ascii=False) + "\n").encode()
+
+
+def _csv_chunk(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+
+async def stream_trips(
+    fmt: str,
+    is_disconnected: Callable[[], Awaitable[bool]],
+    client_key: str | None = None,
+    **filters,
+) -> AsyncIterator[bytes]:
+    """Yield the filtered catalogue as NDJSON lines or CSV chunks.
+
+    Opens its own read session so the stream does not depend on the
+    request's dependency lifetime.
+    """
+    bind = await db_router.engine_for_read(client_key)
+    stmt = crud_trips.catalogue_export_statement(
+        bind.dialect.name, [getattr(Trip, field) for field in EXPORT_FIELDS], **filters
+    ).execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+
+    _stats["exports"] += 1
+    if fmt == "csv":
+        yield _csv_chunk([EXPORT_FIELDS])
+
+    async with AsyncSessionLocal(bind=bind) as db:
+        result = await db.stream(stmt)
+        try:
+            async for rows in result.partitions():
+                if await is_disconnected():
+                    _stats["aborted"] += 1
+                    return
+                _stats["rows"] += len(rows)
+                if fmt == "csv":
+                    yield _csv_chunk(rows)
+                else:
+                    yield b"".join(map(_json_line, rows))
+        finally:
+            await result.close()
+
+
+register_metrics("trip_export", lambda: dict(_stats))
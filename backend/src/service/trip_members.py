@@ -9,7 +9,9 @@ from ..schemas.trip_members import (
     TripMemberUpdate,
     TripInvite,
     TripJoinRequest,
+    TripMemberRead,
 )
+from .activity import publish_activity
 
 
 def invite_user_to_trip(db: Session, invite_data: TripInvite, inviter_id: int):
@@ -58,7 +60,12 @@ def join_trip_request(db: Session, join_data: TripJoinRequest, user_id: int):
         user_id=user_id, trip_id=join_data.trip_id, role="member"
     )
 
-    return crud_trip_members.create_trip_member(db, trip_member_data)
+    member = crud_trip_members.create_trip_member(db, trip_member_data)
+    publish_activity(
+        join_data.trip_id, "member.joined",
+        TripMemberRead.model_validate(member).model_dump(mode="json"),
+    )
+    return member
 
 
 def update_member_role(
@@ -102,7 +109,9 @@ def remove_member(
     if member.role == "organizer":
         raise ValueError("Cannot remove trip organizer")
 
-    return crud_trip_members.delete_trip_member(db, trip_id, member_id)
+    removed = crud_trip_members.delete_trip_member(db, trip_id, member_id)
+    publish_activity(trip_id, "member.removed", {"trip_id": trip_id, "user_id": member_id})
+    return removed
 
 
 def leave_trip(db: Session, trip_id: int, user_id: int):
@@ -115,7 +124,9 @@ def leave_trip(db: Session, trip_id: int, user_id: int):
     if trip_member.role == "organizer":
         raise ValueError("Trip organizer cannot leave the trip")
 
-    return crud_trip_members.delete_trip_member(db, trip_id, user_id)
+    removed = crud_trip_members.delete_trip_member(db, trip_id, user_id)
+    publish_activity(trip_id, "member.left", {"trip_id": trip_id, "user_id": user_id})
+    return removed
 
 
 def get_trip_members(db: Session, trip_id: int, user_id: int):
@@ -1,8 +1,10 @@
 from sqlalchemy.orm import Session
 from ..crud import trips as crud_trips, trip_members as crud_trip_members
-from ..schemas.trips import TripCreate, TripUpdate
+from ..schemas.trips import TripCreate, TripRead, TripUpdate
 from ..schemas.trip_members import TripMemberCreate
 from src.models.trips import Trip
+from . import catalogue_cache
+from .activity import publish_activity
 
 
 def create_trip(db: Session, trip_data: TripCreate, creator_id: int):
@@ -15,7 +17,6 @@ def create_trip(db: Session, trip_data: TripCreate, creator_id: int):
         user_id=creator_id, trip_id=trip.id, role="organizer"
     )
     crud_trip_members.create_trip_member(db, trip_member_data)
-
     return trip
 
 
@@ -32,6 +33,11 @@ def get_trip_details(db: Session, trip_id: int, user_id: int):
     return trip
 
 
+def get_catalogue_version(db: Session):
+    """Cheap version of the whole catalogue for ETags"""
+    return crud_trips.get_catalogue_version(db)
+
+
 def update_trip(db: Session, trip_id: int, trip_data: TripUpdate, user_id: int):
     """Update trip with permission check"""
     trip = crud_trips.get_trip(db, trip_id)
@@ -42,7 +48,9 @@ def update_trip(db: Session, trip_id: int, trip_data: TripUpdate, user_id: int):
     if not crud_trip_members.is_trip_organizer(db, trip_id, user_id):
         raise ValueError("Permission denied")
 
-    return crud_trips.update_trip(db, trip_id, trip_data)
+    trip = crud_trips.update_trip(db, trip_id, trip_data)
+    publish_activity(trip_id, "trip.updated", TripRead.model_validate(trip).model_dump(mode="json"))
+    return trip
 
 
 def delete_trip(db, trip_id: int, current_user):
@@ -55,12 +63,14 @@ def delete_trip(db, trip_id: int, current_user):
     if current_user.role == "admin":
         db.delete(trip)
         db.commit()
+        crud_trip_members.forget_trip_roles(db, trip_id)
         return
 
     # USER может удалить только свою
     if current_user.role == "user" and trip.creator_id == current_user.id:
         db.delete(trip)
         db.commit()
+        crud_trip_members.forget_trip_roles(db, trip_id)
         return
 
     raise PermissionError("Not enough permissions to delete this trip")
@@ -81,34 +91,38 @@ def search_trips(
     limit: int = 100,
 ):
     """Search trips with access control"""
-    trips = crud_trips.search_trips(db, query, skip, limit)
+    # Без user_id ничего не показываем (публичных поездок в этой схеме нет)
+    if not user_id:
+        return []
 
-    # Filter based on user access - only show trips where user is a member
-    if user_id:
-        accessible_trips = []
-        for trip in trips:
-            if crud_trip_members.is_trip_member(db, trip.id, user_id):
-                accessible_trips.append(trip)
-        return accessible_trips
-
-    # If no user_id provided, return empty list (no public trips in new schema)
-    return []
+    # Доступ проверяется в том же SQL-запросе, а не по одной поездке после пагинации
+    return crud_trips.search_trips(db, query, skip, limit, member_id=user_id)
 
 
 def get_trip_statistics(db: Session, trip_id: int, user_id: int):
     """Get trip statistics for authorized users"""
     trip = get_trip_details(db, trip_id, user_id)
 
-    # Get member count
-    members = crud_trip_members.get_trip_members(db, trip_id)
-    member_count = len(members)
-
+    # Счётчики хранятся в самой строке поездки — без подсчёта участников
     return {
-        "trip": trip,
-        "member_count": member_count,
+        "trip_id": trip.id,
+        "member_count": trip.member_count,
+        "message_count": trip.message_count,
+        "comment_count": trip.comment_count,
+        "last_activity_at": trip.last_activity_at,
     }
 
-def get_all_trips(db, skip, limit, search, min_budget, max_budget, start_date, end_date, sort_by, sort_order):
+
+def repair_trip_counters(db: Session, trip_ids=None):
+    """Recount trip counters (after bulk imports or manual edits)"""
+    repaired = crud_trips.refresh_trip_counters(db, trip_ids)
+    db.commit()
+    # Массовый UPDATE мимо ORM: before_flush его не видит, сбрасываем кеш сами
+    catalogue_cache.invalidate()
+    return repaired
+
+def get_all_trips(db, skip, limit, search, min_budget, max_budget, start_date, end_date, sort_by, sort_order, cursor=None):
+    """Trip catalogue page: returns (trips, next_cursor)"""
     return crud_trips.get_all_trips(
         db, 
         skip=skip, 
@@ -119,5 +133,6 @@ def get_all_trips(db, skip, limit, search, min_budget, max_budget, start_date, e
         start_date=start_date,
         end_date=end_date,
         sort_by=sort_by,
-        sort_order=sort_order
+        sort_order=sort_order,
+        cursor=cursor
     )
\ No newline at end of file
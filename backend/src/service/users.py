@@ -6,14 +6,20 @@ from datetime import timedelta
 from ..core.settings import settings
 
 
-def create_user(db: Session, user_data: UserCreate):
+def ensure_email_available(db: Session, email: str):
+    """Raise if the email is taken (checked before the costly password hash)"""
+    if crud_users.get_user_by_email(db, email):
+        raise ValueError("User with this email already exists")
+
+
+def create_user(db: Session, user_data: UserCreate, password_hash: str):
     """Create new user with validation"""
     # Check if user already exists
     existing_user = crud_users.get_user_by_email(db, user_data.email)
     if existing_user:
         raise ValueError("User with this email already exists")
 
-    return crud_users.create_user(db, user_data)
+    return crud_users.create_user(db, user_data, password_hash)
 
 
 def authenticate_user(db: Session, login_data: UserLogin):
@@ -1,33 +1,297 @@
-import httpx
+import asyncio
+import json
+import logging
+import time
+from typing import Iterable, NamedTuple
+
 # Заменяем импорт: берем именно объект settings из файла config или settings
-from ..core.settings import settings 
+from ..core.settings import settings
+from ..core.cache import TTLCache
+from ..core.circuit_breaker import CircuitBreaker
+from ..core.db import AsyncSessionLocal
+from ..core.http import get_http_client
+from ..core.metrics import register_metrics
+from ..crud import weather_cache as crud_weather_cache
 
-async def get_weather_by_city(city: str):
-    # Если город не передан или пустой, не мучаем API
+logger = logging.getLogger(__name__)
+
+WEATHER_URL = "https://api.openweathermap.org/data/2.5/weather"
+
+
+class CachedWeather(NamedTuple):
+    payload: dict | None  # None — провайдер не знает такого города
+    fetched_at: float
+    expires_at: float
+
+
+# Первый уровень — LRU в памяти процесса, второй — таблица weather_cache в БД,
+# общая для всех воркеров и переживающая перезапуск
+_memory_cache = TTLCache(
+    maxsize=settings.WEATHER_CACHE_MAX_ENTRIES,
+    ttl=settings.WEATHER_CACHE_TTL + settings.WEATHER_CACHE_STALE_TTL,
+)
+_in_flight: dict[str, asyncio.Task] = {}
+# Города, которые недавно запрашивали пользователи, — их держит тёплыми
+# фоновый prefetch (service/weather_prefetch.py)
+_recent_cities = TTLCache(
+    maxsize=settings.WEATHER_PREFETCH_MAX_CITIES,
+    ttl=settings.WEATHER_PREFETCH_RECENT_WINDOW,
+)
+# Пока провайдер лежит, не ждём таймаут на каждом запросе,
+# а сразу отдаём кеш или None
+_circuit = CircuitBreaker(
+    "openweather",
+    failure_threshold=settings.WEATHER_CIRCUIT_FAILURE_THRESHOLD,
+    recovery_timeout=settings.WEATHER_CIRCUIT_RECOVERY_TIMEOUT,
+)
+_stats = {
+    "hits": 0,
+    "stale_hits": 0,
+    "negative_hits": 0,
+    "persistent_hits": 0,
+    "misses": 0,
+    "upstream_errors": 0,
+    "short_circuited": 0,
+}
+
+
+def normalize_city(city: str | None) -> str:
+    """Ключ кеша: без лишних пробелов и без учёта регистра"""
     if not city:
-        return None
+        return ""
+    return " ".join(city.split()).casefold()
+
+
+async def _fetch_from_provider(city: str) -> tuple[bool, dict | None]:
+    """Запрос к OpenWeather. Возвращает (город найден, погода).
 
-    url = "https://api.openweathermap.org/data/2.5/weather"
-    
-    # Теперь settings.WEATHER_API_KEY должен подхватиться
+    Сетевые ошибки и ответы 5xx пробрасываются как исключения, чтобы
+    не закешировать временный сбой как "город не найден".
+    """
     params = {
         "q": city,
-        "appid": settings.WEATHER_API_KEY, 
+        "appid": settings.WEATHER_API_KEY,
         "units": "metric",
         "lang": "ru"
     }
-    
-    async with httpx.AsyncClient() as client:
+
+    client = get_http_client()
+    response = await client.get(WEATHER_URL, params=params, timeout=settings.WEATHER_TIMEOUT)
+
+    if response.status_code == 404:
+        return False, None
+    response.raise_for_status()
+
+    data = response.json()
+    return True, {
+        "temp": round(data["main"]["temp"]),
+        "description": data["weather"][0]["description"],
+        "icon": data["weather"][0]["icon"]
+    }
+
+
+async def _load_persistent(key: str) -> CachedWeather | None:
+    async with AsyncSessionLocal() as db:
+        entry = await db.run_sync(crud_weather_cache.get_entry, key)
+    if entry is None:
+        return None
+    payload = json.loads(entry.payload) if entry.payload is not None else None
+    return CachedWeather(payload, entry.fetched_at, entry.expires_at)
+
+
+async def _store_persistent(key: str, cached: CachedWeather) -> None:
+    payload = json.dumps(cached.payload) if cached.payload is not None else None
+    async with AsyncSessionLocal() as db:
+        await db.run_sync(
+            crud_weather_cache.upsert_entry,
+            key, payload, cached.fetched_at, cached.expires_at
+        )
+
+
+def _remember(key: str, cached: CachedWeather) -> None:
+    """Положить запись в LRU на время её свежести плюс окно устаревания"""
+    lifetime = cached.expires_at - time.time()
+    if cached.payload is not None:
+        lifetime += settings.WEATHER_CACHE_STALE_TTL
+    if lifetime > 0:
+        _memory_cache.set(key, cached, ttl=lifetime)
+
+
+async def _lookup(key: str) -> CachedWeather | None:
+    cached = _memory_cache.get(key)
+    if cached is None and settings.WEATHER_CACHE_PERSISTENT:
+        try:
+            cached = await _load_persistent(key)
+        except Exception:
+            logger.exception("Weather cache lookup failed for %r", key)
+            cached = None
+        if cached is not None:
+            _stats["persistent_hits"] += 1
+            _remember(key, cached)
+    return cached
+
+
+async def _refresh(key: str, city: str) -> CachedWeather | None:
+    """Сходить к провайдеру и обновить оба уровня кеша"""
+    if not _circuit.allow_request():
+        _stats["short_circuited"] += 1
+        return None
+
+    try:
+        found, payload = await _fetch_from_provider(city)
+    except Exception as e:
+        _circuit.record_failure()
+        _stats["upstream_errors"] += 1
+        logger.warning("Weather API request for %r failed: %r", city, e)
+        return None
+    _circuit.record_success()
+
+    now = time.time()
+    ttl = settings.WEATHER_CACHE_TTL if found else settings.WEATHER_CACHE_NEGATIVE_TTL
+    cached = CachedWeather(payload, now, now + ttl)
+    _remember(key, cached)
+    if settings.WEATHER_CACHE_PERSISTENT:
         try:
-            response = await client.get(url, params=params, timeout=5.0)
-            if response.status_code == 200:
-                data = response.json()
-                return {
-                    "temp": round(data["main"]["temp"]),
-                    "description": data["weather"][0]["description"],
-                    "icon": data["weather"][0]["icon"]
-                }
-            return None
-        except Exception as e:
-            print(f"Ошибка Weather API: {e}")
-            return None
\ No newline at end of file
+            await _store_persistent(key, cached)
+        except Exception:
+            logger.exception("Weather cache store failed for %r", key)
+    return cached
+
+
+def _refresh_once(key: str, city: str) -> asyncio.Task:
+    """Один запрос к провайдеру на город, сколько бы запросов его ни ждали"""
+    task = _in_flight.get(key)
+    if task is None:
+        task = asyncio.create_task(_refresh(key, city))
+        _in_flight[key] = task
+        task.add_done_callback(lambda _: _in_flight.pop(key, None))
+    return task
+
+
+async def get_weather_by_city(city: str):
+    # Если город не передан или пустой, не мучаем API
+    key = normalize_city(city)
+    if not key:
+        return None
+    _recent_cities.set(key, city)
+
+    cached = await _lookup(key)
+    now = time.time()
+    if cached is not None:
+        if now < cached.expires_at:
+            _stats["negative_hits" if cached.payload is None else "hits"] += 1
+            return cached.payload
+        if (
+            cached.payload is not None
+            and now < cached.expires_at + settings.WEATHER_CACHE_STALE_TTL
+        ):
+            # Отдаём устаревшее сразу, а обновляем в фоне
+            _stats["stale_hits"] += 1
+            _refresh_once(key, city)
+            return cached.payload
+
+    _stats["misses"] += 1
+    fresh = await asyncio.shield(_refresh_once(key, city))
+    if fresh is not None:
+        return fresh.payload
+    # Провайдер недоступен: лучше старые данные, чем никаких
+    return cached.payload if cached is not None else None
+
+
+def get_recent_cities() -> list[str]:
+    """Города, которые запрашивали за последние WEATHER_PREFETCH_RECENT_WINDOW секунд"""
+    return [city for _, city in _recent_cities.items()]
+
+
+async def prefetch_weather(city: str, fresh_for: float) -> bool:
+    """Обновить кеш города, если запись перестанет быть свежей раньше,
+    чем через fresh_for секунд. Возвращает True, если ходили к провайдеру.
+    """
+    key = normalize_city(city)
+    if not key:
+        return False
+
+    cached = await _lookup(key)
+    if cached is not None and cached.expires_at - time.time() > fresh_for:
+        return False
+
+    await _refresh_once(key, city)
+    return True
+
+
+def cache_epoch() -> int:
+    """Номер текущего окна свежести кеша: ответы с погодой не старше одного TTL"""
+    return int(time.time() // max(settings.WEATHER_CACHE_TTL, 1))
+
+
+def get_cache_stats() -> dict:
+    """Счётчики кеша погоды для метрик"""
+    memory = _memory_cache.stats()
+    return {
+        **_stats,
+        "memory_size": memory["size"],
+        "memory_maxsize": memory["maxsize"],
+        "evictions": memory["evictions"],
+    }
+
+
+def get_circuit_state() -> dict:
+    """Состояние circuit breaker провайдера погоды"""
+    return _circuit.stats()
+
+
+register_metrics("weather", lambda: {
+    "circuit": get_circuit_state(),
+    "cache": get_cache_stats(),
+})
+
+
+def clear_cache() -> None:
+    """Сбросить кеш в памяти (таблица weather_cache не трогается)"""
+    _memory_cache.clear()
+
+
+async def get_weather_for_cities(
+    cities: Iterable[str],
+    max_concurrency: int | None = None,
+    timeout: float | None = None,
+) -> dict[str, dict | None]:
+    """Погода для набора городов: каждый город запрашивается один раз,
+    запросы идут параллельно (не больше max_concurrency одновременно),
+    а вся пачка ограничена общим бюджетом timeout секунд.
+
+    Города, не успевшие уложиться в бюджет, получают None.
+    """
+    # Дедупликация по тому же ключу, что и у кеша: "Paris" и "paris " — один запрос
+    by_key: dict[str, str] = {}
+    destinations: dict[str, str] = {}
+    for city in cities:
+        key = normalize_city(city)
+        if not key:
+            continue
+        by_key.setdefault(key, city)
+        destinations[city] = key
+    if not by_key:
+        return {}
+
+    limit = max_concurrency or settings.WEATHER_MAX_CONCURRENCY
+    budget = settings.WEATHER_BATCH_TIMEOUT if timeout is None else timeout
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def fetch(city: str):
+        async with semaphore:
+            return await get_weather_by_city(city)
+
+    tasks = {key: asyncio.create_task(fetch(city)) for key, city in by_key.items()}
+    done, pending = await asyncio.wait(tasks.values(), timeout=budget)
+    for task in pending:
+        task.cancel()
+
+    by_key_results = {}
+    for key, task in tasks.items():
+        if task in done and not task.cancelled() and task.exception() is None:
+            by_key_results[key] = task.result()
+        else:
+            by_key_results[key] = None
+    # Результат — по исходным строкам, как их передал вызывающий код
+    return {city: by_key_results[key] for city, key in destinations.items()}
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from datetime import date, timedelta
+from typing import Optional
+
+from ..core.db import AsyncSessionLocal
+from ..core.metrics import register_metrics
+from ..core.settings import settings
+from ..crud import trips as crud_trips
+from . import weather
+
+logger = logging.getLogger(__name__)
+
+_task: Optional[asyncio.Task] = None
+_stats = {
+    "cycles": 0,
+    "refreshed": 0,
+    "skipped_fresh": 0,
+    "last_cycle_cities": 0,
+    "errors": 0,
+}
+
+
+async def _load_upcoming_destinations() -> list[str]:
+    today = date.today()
+    until = today + timedelta(days=settings.WEATHER_PREFETCH_HORIZON_DAYS)
+    async with AsyncSessionLocal() as db:
+        return await db.run_sync(
+            crud_trips.get_upcoming_destinations,
+            today, until, limit=settings.WEATHER_PREFETCH_MAX_CITIES
+        )
+
+
+async def collect_destinations() -> list[str]:
+    """Города ближайших поездок плюс недавно просмотренные, без повторов"""
+    upcoming = await _load_upcoming_destinations()
+    seen = set()
+    cities = []
+    for city in [*upcoming, *weather.get_recent_cities()]:
+        key = weather.normalize_city(city)
+        if key and key not in seen:
+            seen.add(key)
+            cities.append(city)
+    return cities[: settings.WEATHER_PREFETCH_MAX_CITIES]
+
+
+async def run_prefetch_cycle() -> int:
+    """Обновить погоду для активных городов с ограничением частоты запросов.
+
+    Обновляются только записи, которые протухнут до следующего цикла,
+    поэтому в установившемся режиме запросы пользователей попадают в кеш.
+    """
+    cities = await collect_destinations()
+    rate = max(settings.WEATHER_PREFETCH_RATE, 0.01)
+    # Запись должна дожить до конца следующего цикла, включая время на сам обход
+    fresh_for = settings.WEATHER_PREFETCH_INTERVAL + len(cities) / rate
+
+    refreshed = 0
+    for city in cities:
+        if await weather.prefetch_weather(city, fresh_for):
+            refreshed += 1
+            await asyncio.sleep(1 / rate)
+        else:
+            _stats["skipped_fresh"] += 1
+
+    _stats["cycles"] += 1
+    _stats["refreshed"] += refreshed
+    _stats["last_cycle_cities"] = len(cities)
+    return refreshed
+
+
+async def _prefetch_loop() -> None:
+    while True:
+        try:
+            await run_prefetch_cycle()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            _stats["errors"] += 1
+            logger.exception("Weather prefetch cycle failed")
+        await asyncio.sleep(settings.WEATHER_PREFETCH_INTERVAL)
+
+
+def start_weather_prefetch() -> Optional[asyncio.Task]:
+    """Запустить фоновый воркер (вызывается из lifespan приложения)"""
+    global _task
+    if settings.WEATHER_PREFETCH_ENABLED and _task is None:
+        _task = asyncio.create_task(_prefetch_loop(), name="weather-prefetch")
+    return _task
+
+
+async def stop_weather_prefetch() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+
+
+register_metrics("weather_prefetch", lambda: {
+    **_stats,
+    "running": _task is not None and not _task.done(),
+})
@@ -1,9 +1,34 @@
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from main import app
+from src.core.db import Base, configure_sqlite_engine
+from src.crud.trip_members import clear_membership_cache
 
 @pytest.fixture
 def client():
     """Создает тестового клиента для запросов"""
     with TestClient(app) as c:
-        yield c
\ No newline at end of file
+        yield c
+
+
+@pytest.fixture
+def db():
+    """Отдельная in-memory база для тестов crud/service слоя"""
+    # Тот же профиль, что у движков приложения (в т.ч. foreign_keys=ON)
+    engine = configure_sqlite_engine(create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    ))
+    Base.metadata.create_all(bind=engine)
+    # Новая база переиспользует id — роли из прошлых тестов недействительны
+    clear_membership_cache()
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
@@ -0,0 +1,87 @@
+import asyncio
+import json
+
+from src.endpoints.activity import _event_stream
+from src.service import activity
+
+
+class _FakeRequest:
+    def __init__(self):
+        self.disconnected = False
+
+    async def is_disconnected(self):
+        return self.disconnected
+
+
+def test_replay_buffer_resumes_from_last_event_id(monkeypatch):
+    monkeypatch.setattr(activity.settings, "ACTIVITY_REPLAY_SIZE", 3)
+    trip_id = 900001
+    events = [activity.publish_activity(trip_id, "comment.created", {"n": i}) for i in range(5)]
+    activity.publish_activity(trip_id + 1, "trip.updated", {})
+
+    assert activity.events_since(trip_id, None) == []
+    assert [e.seq for e in activity.events_since(trip_id, events[2].id)] == [events[3].seq, events[4].seq]
+    assert activity.events_since(trip_id, events[4].id) == []
+    # События после events[0] уже вытеснены, чужая эпоха — тоже resync
+    assert activity.events_since(trip_id, events[0].id) is None
+    assert activity.events_since(trip_id, "deadbeef-1") is None
+
+
+def test_resume_after_buffer_eviction_requests_resync():
+    trip_id = 900011
+    events = [activity.publish_activity(trip_id, "comment.created", {"n": i}) for i in range(4)]
+    activity._replay.delete(trip_id)  # буфер вытеснен по TTL/LRU
+    latest = activity.publish_activity(trip_id, "comment.created", {"n": 4})
+
+    # События 2–4 потеряны вместе с буфером — клиент должен перечитать состояние
+    assert activity.events_since(trip_id, events[0].id) is None
+    # Клиент, видевший последнее событие до вытеснения, ничего не потерял
+    assert [e.seq for e in activity.events_since(trip_id, events[3].id)] == [latest.seq]
+    assert activity.events_since(trip_id, latest.id) == []
+
+
+def test_event_stream_replays_then_pushes_live_events_with_heartbeats(monkeypatch):
+    monkeypatch.setattr(activity.settings, "ACTIVITY_HEARTBEAT_INTERVAL", 0.05)
+    trip_id = 900010
+    first = activity.publish_activity(trip_id, "member.joined", {"user_id": 1})
+    missed = activity.publish_activity(trip_id, "comment.created", {"content": "пропущено"})
+
+    async def scenario():
+        request = _FakeRequest()
+        stream = _event_stream(request, trip_id, first.id)
+        chunks = [await stream.__anext__() for _ in range(2)]  # retry + пропущенное
+        activity.publish_activity(trip_id, "trip.updated", {"title": "Новое"})
+        chunks.append(await stream.__anext__())
+        chunks.append(await stream.__anext__())  # тишина — heartbeat
+        request.disconnected = True
+        chunks += [chunk async for chunk in stream]
+        return chunks
+
+    chunks = asyncio.run(scenario())
+    assert chunks[0].startswith(b"retry:")
+    assert chunks[1] == missed.encode()
+    assert b"event: trip.updated" in chunks[2]
+    assert json.loads(chunks[2].decode().split("data: ", 1)[1]) == {"title": "Новое"}
+    assert chunks[3] == b": heartbeat\n\n"
+    assert len(chunks) == 4
+    assert activity.activity_broker.stats()["subscribers"] == 0
+
+
+def test_service_changes_are_published_to_the_trip_feed(client):
+    import uuid
+
+    token = client.post("/auth/register", json={
+        "email": f"feed-{uuid.uuid4().hex[:8]}@example.com", "password": "secret123",
+    }).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    user_id = client.get("/users/me", headers=headers).json()["id"]
+    trip = client.post("/trips/", headers=headers, json={"title": "Feed", "destination": "X"}).json()
+    marker = activity.publish_activity(trip["id"], "test.marker", {})
+
+    client.post(f"/trips/{trip['id']}/comments", params={"user_id": user_id},
+                json={"content": "hi", "trip_id": trip["id"]})
+    client.put(f"/trips/{trip['id']}", headers=headers, json={"title": "Feed 2"})
+
+    types = [event.type for event in activity.events_since(trip["id"], marker.id)]
+    assert types == ["comment.created", "trip.updated"]
+    assert client.get(f"/trips/{trip['id']}/events").status_code == 401
@@ -0,0 +1,137 @@
+import asyncio
+import uuid
+
+import pytest
+
+
+def test_password_pool_hashes_verifies_and_rehashes():
+    from passlib.context import CryptContext
+    from src.core import passwords
+
+    async def scenario():
+        password_hash = await passwords.hash_password("secret123")
+        good = await passwords.verify_and_update_password("secret123", password_hash)
+        bad = await passwords.verify_and_update_password("wrong", password_hash)
+        weak = CryptContext(schemes=["argon2"], argon2__rounds=1, argon2__memory_cost=1024).hash("secret123")
+        outdated = await passwords.verify_and_update_password("secret123", weak)
+        return good, bad, outdated
+
+    try:
+        good, bad, (valid, new_hash) = asyncio.run(scenario())
+    finally:
+        passwords.stop_password_pool()
+
+    assert good == (True, None)
+    assert bad == (False, None)
+    assert valid and passwords.pwd_context.verify("secret123", new_hash)
+    assert not passwords.pwd_context.needs_update(new_hash)
+
+
+def test_password_pool_rejects_past_queue_limit(monkeypatch):
+    from src.core import passwords
+
+    monkeypatch.setattr(passwords.settings, "PASSWORD_HASH_MAX_PENDING", 0)
+    with pytest.raises(passwords.PasswordHasherBusy):
+        asyncio.run(passwords.hash_password("secret123"))
+
+
+def test_login_rehashes_outdated_password(client):
+    from passlib.context import CryptContext
+    from src.core.db import SessionLocal
+    from src.core.passwords import pwd_context
+    from src.models import User
+
+    email = f"rehash-{uuid.uuid4().hex[:8]}@example.com"
+    assert client.post("/auth/register", json={"email": email, "password": "secret123"}).status_code == 201
+
+    weak = CryptContext(schemes=["argon2"], argon2__rounds=1, argon2__memory_cost=1024).hash("secret123")
+    with SessionLocal() as db:
+        db.query(User).filter(User.email == email).update({User.password_hash: weak})
+        db.commit()
+
+    assert client.post("/auth/login", json={"email": email, "password": "wrong"}).status_code == 401
+    assert client.post("/auth/login", json={"email": email, "password": "secret123"}).status_code == 200
+
+    with SessionLocal() as db:
+        stored = db.query(User.password_hash).filter(User.email == email).scalar()
+    assert stored != weak and not pwd_context.needs_update(stored)
+
+
+def test_refresh_rotation_is_single_use(client):
+    email = f"rotate-{uuid.uuid4().hex[:8]}@example.com"
+    tokens = client.post("/auth/register", json={"email": email, "password": "secret123"}).json()
+
+    rotated = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert rotated.status_code == 200
+    # Повторное использование уже обменянного токена отклоняется
+    replay = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert replay.status_code == 401
+
+    new_refresh = rotated.json()["refresh_token"]
+    assert client.post("/auth/logout", json={"refresh_token": new_refresh}).status_code == 200
+    assert client.post("/auth/refresh", json={"refresh_token": new_refresh}).status_code == 401
+
+
+def test_concurrent_rotation_lets_only_one_win(tmp_path):
+    import threading
+    from datetime import datetime, timedelta, timezone
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.orm import sessionmaker
+    from src.core.db import Base, configure_sqlite_engine
+    from src.crud import refresh_tokens as crud_refresh_tokens
+    from src.models import RefreshToken, User
+
+    engine = configure_sqlite_engine(create_engine(f"sqlite:///{tmp_path / 'race.db'}"))
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    expires = datetime.now(timezone.utc) + timedelta(days=1)
+    with Session() as db:
+        user = User(email="rotate-race@example.com", password_hash="x")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+        crud_refresh_tokens.create_refresh_token(db, "old", user_id, expires)
+
+    first_updated = threading.Event()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def hold_first_update(conn, cursor, statement, *args):
+        # Первая ротация держит транзакцию открытой, пока вторая шлёт свой UPDATE
+        if statement.startswith("UPDATE refresh_tokens") and not first_updated.is_set():
+            first_updated.set()
+            threading.Event().wait(0.3)
+
+    results = {}
+
+    def rotate(name):
+        with Session() as db:
+            results[name] = crud_refresh_tokens.rotate_refresh_token(db, "old", name, user_id, expires)
+
+    first = threading.Thread(target=rotate, args=("first",))
+    first.start()
+    first_updated.wait(5)
+    second = threading.Thread(target=rotate, args=("second",))
+    second.start()
+    first.join(10)
+    second.join(10)
+
+    assert sorted(results.values()) == [False, True]
+    winner = next(name for name, won in results.items() if won)
+    with Session() as db:
+        stored = {row.token_hash: row.is_revoked for row in db.query(RefreshToken)}
+    assert stored == {
+        crud_refresh_tokens.hash_token_id("old"): True,
+        crud_refresh_tokens.hash_token_id(winner): False,
+    }
+    engine.dispose()
+
+def test_duplicate_registration_skips_password_hashing(client, monkeypatch):
+    from src.core import passwords
+
+    email = f"dup-{uuid.uuid4().hex[:8]}@example.com"
+    assert client.post("/auth/register", json={"email": email, "password": "secret123"}).status_code == 201
+
+    hashed = passwords.get_stats()["hashed"]
+    for path in ("/auth/register", "/users/"):
+        assert client.post(path, json={"email": email, "password": "secret123"}).status_code == 400
+    assert passwords.get_stats()["hashed"] == hashed
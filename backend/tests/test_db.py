@@ -0,0 +1,86 @@
+import asyncio
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.core.db import ReplicaRouter
+
+
+def _database(path, marker):
+    """SQLite-файл с одной строкой, по которой видно, откуда читали"""
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE source (name TEXT)"))
+        connection.execute(text("INSERT INTO source VALUES (:name)"), {"name": marker})
+    engine.dispose()
+    return create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+
+async def _read_from(router, key=None):
+    engine = await router.engine_for_read(key)
+    async with engine.connect() as connection:
+        return (await connection.execute(text("SELECT name FROM source"))).scalar()
+
+
+def test_reads_go_to_replica_and_writer_sticks_to_primary(tmp_path):
+    async def scenario():
+        primary = _database(tmp_path / "primary.db", "primary")
+        replica = _database(tmp_path / "replica.db", "replica")
+        router = ReplicaRouter(primary, [replica], sticky_window=60)
+
+        before = await _read_from(router, "alice")
+        router.mark_write("alice")
+        after_write = await _read_from(router, "alice")
+        other_client = await _read_from(router, "bob")
+
+        await primary.dispose()
+        await replica.dispose()
+        return before, after_write, other_client, router.stats()
+
+    before, after_write, other_client, stats = asyncio.run(scenario())
+    assert (before, after_write, other_client) == ("replica", "primary", "replica")
+    assert stats["sticky_reads"] == 1 and stats["replica_reads"] == 2
+
+
+def test_unhealthy_replica_falls_back_to_primary(tmp_path):
+    async def scenario():
+        primary = _database(tmp_path / "primary.db", "primary")
+        # Каталога не существует — реплика не проходит health check
+        broken = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'replica.db'}")
+        router = ReplicaRouter(primary, [broken], health_interval=60)
+
+        first = await _read_from(router)
+        second = await _read_from(router)
+
+        await primary.dispose()
+        await broken.dispose()
+        return first, second, router.stats()
+
+    first, second, stats = asyncio.run(scenario())
+    assert first == second == "primary"
+    assert stats["fallbacks"] == 2 and stats["healthy_replicas"] == 0
+
+
+def test_without_replicas_everything_reads_from_primary(tmp_path):
+    async def scenario():
+        primary = _database(tmp_path / "primary.db", "primary")
+        router = ReplicaRouter(primary)
+        name = await _read_from(router, "alice")
+        await primary.dispose()
+        return name
+
+    assert asyncio.run(scenario()) == "primary"
+
+
+def test_client_key_hashes_bearer_token_and_ignores_query():
+    from starlette.requests import Request
+    from src.core.db import client_key
+
+    def request(headers=(), query=b""):
+        return Request({"type": "http", "headers": list(headers), "query_string": query})
+
+    token_request = request([(b"authorization", b"Bearer secret-token")])
+    key = client_key(token_request)
+    assert key and "secret-token" not in key
+    assert key == client_key(request([(b"authorization", b"Bearer secret-token")]))
+    assert client_key(request(query=b"user_id=1")) is None
@@ -0,0 +1,186 @@
+def test_message_history_pages_with_keyset_cursors(db):
+    from src.crud.messages import get_message_history
+    from src.models import Message, Trip, User
+
+    user = User(email="history@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    trip, other = Trip(title="Chat", destination="Rome", creator_id=user.id), Trip(title="Other", destination="Oslo", creator_id=user.id)
+    db.add_all([trip, other])
+    db.flush()
+    for i in range(25):
+        db.add(Message(content=f"m{i}", user_id=user.id, trip_id=trip.id))
+        db.add(Message(content=f"noise{i}", user_id=user.id, trip_id=other.id))
+    db.commit()
+
+    seen, before_id, has_more = [], None, True
+    while has_more:
+        page, has_more = get_message_history(db, trip.id, before_id=before_id, limit=10)
+        assert len(page) == (10 if has_more else 5)
+        seen += [message.content for message in page]
+        before_id = page[-1].id
+    assert seen == [f"m{i}" for i in reversed(range(25))]
+
+    newest, _ = get_message_history(db, trip.id, limit=3)
+    newer, more = get_message_history(db, trip.id, after_id=newest[-1].id, limit=5)
+    assert [m.content for m in newer] == ["m24", "m23"] and more is False
+    older_ids = [m.id for m in get_message_history(db, trip.id, before_id=newest[0].id, after_id=newest[-1].id)[0]]
+    assert older_ids == [newest[1].id]
+
+
+def test_message_search_is_ranked_scoped_and_highlighted(db):
+    from src.crud.messages import search_messages
+    from src.models import Message, Trip, User
+
+    user = User(email="search@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    trip, other = Trip(title="Chat", destination="Rome", creator_id=user.id), Trip(title="Other", destination="Oslo", creator_id=user.id)
+    db.add_all([trip, other])
+    db.flush()
+    old = Message(content="Бронируем отель у вокзала?", user_id=user.id, trip_id=trip.id)
+    db.add(old)
+    for i in range(1500):
+        db.add(Message(content=f"болтовня {i}", user_id=user.id, trip_id=trip.id))
+    db.add(Message(content="Отель, отель и ещё раз отель", user_id=user.id, trip_id=trip.id))
+    db.add(Message(content="Отель в Осло", user_id=user.id, trip_id=other.id))
+    db.commit()
+
+    hits = search_messages(db, trip.id, "отел")
+    assert [message.content for message, _ in hits] == [
+        "Отель, отель и ещё раз отель", "Бронируем отель у вокзала?",
+    ]
+    assert "**отель**" in hits[1][1]
+
+    # Сообщение старше 1000-го тоже находится, правки и удаления попадают в индекс
+    old.content = "Бронируем хостел"
+    db.commit()
+    assert [message.id for message, _ in search_messages(db, trip.id, "хостел")] == [old.id]
+    db.delete(old)
+    db.commit()
+    assert search_messages(db, trip.id, "хостел") == []
+    assert search_messages(db, trip.id, "  ") == []
+    assert len(search_messages(db, trip.id, "болтовня", skip=10, limit=5)) == 5
+
+
+def test_message_search_scopes_match_and_snippets_to_the_page(db):
+    from sqlalchemy import event
+    from src.crud.messages import search_messages
+    from src.models import Message, Trip, User
+
+    user = User(email="search-page@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    trip, other = Trip(title="Mine", destination="A", creator_id=user.id), Trip(title="Theirs", destination="B", creator_id=user.id)
+    db.add_all([trip, other])
+    db.flush()
+    db.add_all(Message(content=f"паром {i}", user_id=user.id, trip_id=trip.id) for i in range(30))
+    db.add_all(Message(content=f"паром {i}", user_id=user.id, trip_id=other.id) for i in range(30))
+    db.commit()
+
+    statements = []
+    event.listen(
+        db.get_bind(), "before_cursor_execute",
+        lambda conn, cursor, statement, parameters, *args: statements.append((statement, parameters)),
+    )
+    hits = search_messages(db, trip.id, "паром", skip=5, limit=3)
+
+    assert len(hits) == 3 and all(message.trip_id == trip.id for message, _ in hits)
+    assert all("**паром**" in snippet for _, snippet in hits)
+    match_sql = next(sql for sql, _ in statements if "bm25" in sql)
+    assert "trip_id = ?" in match_sql and "snippet(" not in match_sql
+    snippet_params = next(params for sql, params in statements if "snippet(" in sql)
+    assert sorted(p for p in snippet_params if isinstance(p, int)) == sorted(m.id for m, _ in hits)
+
+
+def test_websocket_pushes_new_messages_to_trip_members(client):
+    import uuid
+    import pytest
+    from starlette.websockets import WebSocketDisconnect
+
+    marker = uuid.uuid4().hex[:8]
+    token = client.post("/auth/register", json={
+        "email": f"ws-{marker}@example.com", "password": "secret123",
+    }).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    user_id = client.get("/users/me", headers=headers).json()["id"]
+    trip = client.post("/trips/", headers=headers, json={"title": "WS", "destination": "X"}).json()
+
+    with client.websocket_connect(f"/trips/{trip['id']}/ws?token={token}") as websocket:
+        sent = client.post(f"/trips/{trip['id']}/messages", params={"user_id": user_id},
+                           json={"content": "живой привет", "trip_id": trip["id"]}).json()
+        event = websocket.receive_json()
+        assert event["type"] == "message.created"
+        assert event["message"] == sent
+
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect(f"/trips/{trip['id']}/ws?token=garbage") as websocket:
+            websocket.receive_text()
+
+
+def test_message_history_requires_a_member_token(client):
+    import uuid
+
+    def register(prefix):
+        token = client.post("/auth/register", json={
+            "email": f"{prefix}-{uuid.uuid4().hex[:8]}@example.com", "password": "secret123",
+        }).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        return headers, client.get("/users/me", headers=headers).json()["id"]
+
+    owner_headers, owner_id = register("history-owner")
+    stranger_headers, _ = register("history-stranger")
+    trip = client.post("/trips/", headers=owner_headers, json={"title": "History", "destination": "X"}).json()
+    client.post(f"/trips/{trip['id']}/messages", params={"user_id": owner_id},
+                json={"content": "секрет", "trip_id": trip["id"]})
+
+    url = f"/trips/{trip['id']}/messages/history"
+    # user_id участника в query больше ничего не даёт — личность берётся из токена
+    assert client.get(url, params={"user_id": owner_id}).status_code == 401
+    assert client.get(url, headers=stranger_headers, params={"user_id": owner_id}).status_code == 404
+    history = client.get(url, headers=owner_headers).json()
+    assert [m["content"] for m in history["messages"]] == ["секрет"]
+
+
+def test_message_search_requires_a_member_token(client):
+    import uuid
+
+    def register(prefix):
+        token = client.post("/auth/register", json={
+            "email": f"{prefix}-{uuid.uuid4().hex[:8]}@example.com", "password": "secret123",
+        }).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        return headers, client.get("/users/me", headers=headers).json()["id"]
+
+    owner_headers, owner_id = register("search-owner")
+    stranger_headers, _ = register("search-stranger")
+    trip = client.post("/trips/", headers=owner_headers, json={"title": "Search", "destination": "X"}).json()
+    client.post(f"/trips/{trip['id']}/messages", params={"user_id": owner_id},
+                json={"content": "пароль от вайфая", "trip_id": trip["id"]})
+
+    url = f"/trips/{trip['id']}/messages/search"
+    assert client.get(url, params={"q": "пароль", "user_id": owner_id}).status_code == 401
+    assert client.get(url, headers=stranger_headers, params={"q": "пароль", "user_id": owner_id}).status_code == 404
+    hits = client.get(url, headers=owner_headers, params={"q": "пароль"}).json()
+    assert [hit["content"] for hit in hits] == ["пароль от вайфая"]
+
+
+def test_broker_drops_slow_subscribers_without_blocking():
+    import asyncio
+    import pytest
+    from src.core.pubsub import InMemoryBroker
+
+    async def scenario():
+        broker = InMemoryBroker()
+        fast = broker.subscribe("trip", maxsize=10)
+        slow = broker.subscribe("trip", maxsize=2)
+        for i in range(5):
+            broker.publish("trip", i)
+        received = [await fast.get() for _ in range(5)]
+        with pytest.raises(OverflowError):
+            await slow.get()
+        return received, broker.stats()
+
+    received, stats = asyncio.run(scenario())
+    assert received == [0, 1, 2, 3, 4]
+    assert stats["overflows"] == 1 and stats["subscribers"] == 1
@@ -0,0 +1,115 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from src.core.db import Base, run_migrations
+
+
+@pytest.fixture
+def migrated_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrated.db'}")
+    run_migrations(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def _plan(engine, sql):
+    with engine.connect() as connection:
+        rows = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+    return " | ".join(row[-1] for row in rows)
+
+
+@pytest.mark.parametrize("sql, index", [
+    ("SELECT * FROM messages WHERE trip_id = 1 ORDER BY created_at DESC LIMIT 100",
+     "ix_messages_trip_id_created_at"),
+    ("SELECT * FROM comments WHERE trip_id = 1 ORDER BY created_at DESC LIMIT 100",
+     "ix_comments_trip_id_created_at"),
+    ("SELECT * FROM trip_members WHERE trip_id = 1", "ix_trip_members_trip_id_user_id"),
+    ("SELECT * FROM trips WHERE creator_id = 1", "ix_trips_creator_id"),
+    ("SELECT * FROM trips ORDER BY created_at DESC LIMIT 100", "ix_trips_created_at"),
+    ("SELECT * FROM trips WHERE start_date >= '2030-01-01'", "ix_trips_start_date"),
+    ("SELECT * FROM trips WHERE budget_total <= 1000", "ix_trips_budget_total"),
+    ("SELECT * FROM refresh_tokens WHERE user_id = 1", "ix_refresh_tokens_user_id"),
+    ("SELECT * FROM refresh_tokens WHERE token_hash = 'x'", "ix_refresh_tokens_token_hash"),
+    ("SELECT * FROM messages WHERE trip_id = 1 AND id < 500 ORDER BY id DESC LIMIT 51",
+     "ix_messages_trip_id_id"),
+])
+def test_hot_queries_use_indexes(migrated_engine, sql, index):
+    assert index in _plan(migrated_engine, sql)
+
+
+def test_migrations_adopt_database_created_by_create_all(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    Base.metadata.create_all(bind=engine)
+
+    run_migrations(bind=engine)
+
+    with engine.connect() as connection:
+        version = connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    assert version is not None
+    assert "trips_fts" in inspect(engine).get_table_names()
+    engine.dispose()
+
+
+def test_async_session_runs_sync_crud(tmp_path):
+    import asyncio
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from src.crud import trips as crud_trips
+
+    run_migrations(bind=create_engine(f"sqlite:///{tmp_path / 'async.db'}"))
+
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'async.db'}")
+        async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+            trips, cursor = await db.run_sync(crud_trips.get_all_trips, limit=10)
+        await engine.dispose()
+        return trips, cursor
+
+    assert asyncio.run(scenario()) == ([], None)
+
+
+def test_sqlite_profile_applied_to_new_connections(tmp_path):
+    from src.core.db import configure_sqlite_engine, engine_options
+
+    url = f"sqlite:///{tmp_path / 'tuned.db'}"
+    engine = configure_sqlite_engine(create_engine(url, **engine_options(url)))
+    with engine.connect() as connection:
+        pragma = lambda name: connection.execute(text(f"PRAGMA {name}")).scalar()
+        assert pragma("journal_mode") == "wal"
+        assert pragma("synchronous") == 1  # NORMAL
+        assert pragma("temp_store") == 2  # MEMORY
+        assert pragma("busy_timeout") == 5000
+        assert pragma("cache_size") == -65536
+        assert pragma("foreign_keys") == 1
+    engine.dispose()
+
+    assert engine_options("sqlite://") == {}
+
+
+def test_trip_column_downgrades_keep_search_triggers(migrated_engine):
+    from alembic import command
+    from alembic.config import Config
+    from src.core.db import BACKEND_DIR
+
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+    with migrated_engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.downgrade(config, "0003")
+
+    columns = {column["name"] for column in inspect(migrated_engine).get_columns("trips")}
+    with migrated_engine.connect() as connection:
+        triggers = set(connection.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        ).scalars())
+    assert not columns & {"version", "member_count", "last_activity_at"}
+    assert {"trips_fts_ai", "trips_fts_ad", "trips_fts_au"} <= triggers
+
+
+def test_revisions_do_not_import_app_code():
+    from pathlib import Path
+
+    # Ревизия — снимок схемы: живой код приложения может измениться после неё
+    versions = Path(__file__).resolve().parents[1] / "alembic" / "versions"
+    for revision in versions.glob("*.py"):
+        source = revision.read_text(encoding="utf-8")
+        assert "from src" not in source and "import src" not in source, revision.name
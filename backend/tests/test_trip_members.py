@@ -0,0 +1,116 @@
+from sqlalchemy import event
+
+
+def _seed_trip(db):
+    from src.models import Trip, User
+
+    organizer = User(email="roles-organizer@example.com", password_hash="x")
+    guest = User(email="roles-guest@example.com", password_hash="x")
+    db.add_all([organizer, guest])
+    db.flush()
+    trip = Trip(title="Roles", destination="Riga", creator_id=organizer.id)
+    db.add(trip)
+    db.commit()
+    return trip, organizer, guest
+
+
+def _count_member_selects(db):
+    statements = []
+
+    def before_execute(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT") and "trip_members" in statement:
+            statements.append(statement)
+
+    event.listen(db.get_bind(), "before_cursor_execute", before_execute)
+    return statements
+
+
+def test_role_checks_are_cached_and_invalidated_on_writes(db):
+    from src.crud import trip_members as crud_trip_members
+    from src.schemas.trip_members import TripJoinRequest, TripMemberCreate, TripMemberUpdate
+    from src.service import trip_members as service
+
+    trip, organizer, guest = _seed_trip(db)
+    crud_trip_members.create_trip_member(
+        db, TripMemberCreate(user_id=organizer.id, trip_id=trip.id, role="organizer")
+    )
+    selects = _count_member_selects(db)
+
+    assert crud_trip_members.is_trip_organizer(db, trip.id, organizer.id)
+    assert crud_trip_members.is_trip_member(db, trip.id, organizer.id)
+    assert not crud_trip_members.is_trip_member(db, trip.id, guest.id)
+    assert not crud_trip_members.is_trip_member(db, trip.id, guest.id)
+    assert len(selects) == 2
+
+    # Новая сессия (следующий запрос) берёт роли из общего кеша
+    db.info.clear()
+    assert crud_trip_members.is_trip_organizer(db, trip.id, organizer.id)
+    assert len(selects) == 2
+
+    # Запись сбрасывает кешированный отказ
+    service.join_trip_request(db, TripJoinRequest(trip_id=trip.id), guest.id)
+    assert crud_trip_members.get_member_role(db, trip.id, guest.id) == "member"
+
+    crud_trip_members.update_trip_member(db, trip.id, guest.id, TripMemberUpdate(role="viewer"))
+    assert crud_trip_members.get_member_role(db, trip.id, guest.id) == "viewer"
+
+    crud_trip_members.delete_trip_member(db, trip.id, guest.id)
+    assert not crud_trip_members.is_trip_member(db, trip.id, guest.id)
+
+
+def test_role_read_racing_a_write_is_not_cached(db):
+    from src.crud import trip_members as crud_trip_members
+    from src.models import TripMember
+
+    trip, organizer, _ = _seed_trip(db)
+    original_query = db.query
+
+    def query_then_write(*entities):
+        # Членство меняется между SELECT и сохранением результата в кеш
+        result = original_query(*entities)
+        crud_trip_members.forget_member_role(None, trip.id, organizer.id)
+        return result
+
+    db.query = query_then_write
+    assert crud_trip_members.get_member_role(db, trip.id, organizer.id) is None
+    db.query = original_query
+
+    db.add(TripMember(trip_id=trip.id, user_id=organizer.id, role="organizer"))
+    db.commit()
+    db.info.clear()
+    assert crud_trip_members.get_member_role(db, trip.id, organizer.id) == "organizer"
+
+
+def test_member_search_filters_in_sql_with_full_pages(db):
+    from src.models import Trip, TripMember, User
+    from src.service import trips as trip_service
+
+    owner = User(email="search-owner@example.com", password_hash="x")
+    member = User(email="search-member@example.com", password_hash="x")
+    db.add_all([owner, member])
+    db.flush()
+    trips = [Trip(title=f"Alps {i}", destination="Alps", creator_id=owner.id) for i in range(8)]
+    db.add_all(trips)
+    db.flush()
+    # Участник только в нечётных поездках — раньше страница приходила неполной
+    db.add_all(
+        TripMember(trip_id=trip.id, user_id=member.id, role="member")
+        for trip in trips[1::2]
+    )
+    db.commit()
+    member_id, expected = member.id, {trip.id for trip in trips[1::2]}
+
+    statements = []
+    event.listen(
+        db.get_bind(), "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    first = trip_service.search_trips(db, "alps", member_id, skip=0, limit=2)
+    second = trip_service.search_trips(db, "alps", member_id, skip=2, limit=2)
+    mine = trip_service.get_user_trips(db, member_id, limit=10)
+
+    assert len(statements) == 3
+    assert len(first) == len(second) == 2
+    assert {t.id for t in first + second} == expected
+    assert {t.id for t in mine} == expected
+    assert trip_service.search_trips(db, "alps", None) == []
@@ -12,4 +12,368 @@ def test_upload_image_no_auth(client):
 def test_get_non_existent_trip(client):
     # Проверка граничного случая: несуществующая поездка (Код 404)
     response = client.get("/trips/999999")
-    assert response.status_code in [404, 401] # Либо не найдено, либо нужен логин
\ No newline at end of file
+    assert response.status_code in [404, 401] # Либо не найдено, либо нужен логин
+
+def _seed_trips(db):
+    from datetime import date
+    from src.models import User, Trip
+
+    user = User(email="keyset@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    budgets = [100, 200, None, 200, 50, None, 300, 200, 100, 75]
+    for i, budget in enumerate(budgets):
+        db.add(Trip(
+            title=f"Trip {i}",
+            destination="Rome",
+            budget_total=budget,
+            start_date=date(2030, 1, 1 + i % 3),
+            creator_id=user.id,
+        ))
+    db.commit()
+
+
+def test_cursor_pages_match_offset_pages(db):
+    from src.crud import trips as crud_trips
+
+    _seed_trips(db)
+    for sort_by in ("budget_total", "start_date", "created_at", "title"):
+        for sort_order in ("asc", "desc"):
+            expected, _ = crud_trips.get_all_trips(db, limit=100, sort_by=sort_by, sort_order=sort_order)
+
+            seen, cursor = [], None
+            while True:
+                page, cursor = crud_trips.get_all_trips(
+                    db, limit=3, sort_by=sort_by, sort_order=sort_order, cursor=cursor
+                )
+                seen.extend(page)
+                if cursor is None:
+                    break
+
+            assert [t.id for t in seen] == [t.id for t in expected], (sort_by, sort_order)
+
+
+def test_budget_cursor_binds_typed_key(db):
+    from decimal import Decimal
+    from sqlalchemy import event
+    from src.crud import trips as crud_trips
+
+    _seed_trips(db)
+    first, cursor = crud_trips.get_all_trips(db, limit=3, sort_by="budget_total", sort_order="asc")
+    assert [t.budget_total for t in first] == [50, 75, 100]
+
+    # Ключ в курсоре — число, а не строка: иначе Postgres сравнивал бы numeric с varchar
+    key, _ = crud_trips._decode_cursor(cursor, "budget_total", "asc", crud_trips.Trip.budget_total, "postgresql")
+    assert key == Decimal("100.00")
+
+    params = []
+    engine = db.get_bind()
+    capture = lambda conn, cur, statement, parameters, context, many: params.extend(parameters)
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        second, _ = crud_trips.get_all_trips(db, limit=3, sort_by="budget_total", sort_order="asc", cursor=cursor)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    assert [t.budget_total for t in second] == [100, 200, 200]
+    assert 100 in params and "100.00" not in params
+
+
+def test_trip_search_uses_full_text_index(db):
+    from src.crud import trips as crud_trips
+    from src.models import User, Trip
+
+    user = User(email="fts@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    db.add_all([
+        Trip(title="Белые ночи", destination="Санкт-Петербург", creator_id=user.id),
+        Trip(title="Weekend", destination="Paris", description="Louvre and croissants", creator_id=user.id),
+        Trip(title="Paris again", destination="Lyon", creator_id=user.id),
+    ])
+    db.commit()
+
+    found, _ = crud_trips.get_all_trips(db, search="санкт")
+    assert [t.destination for t in found] == ["Санкт-Петербург"]
+
+    found, _ = crud_trips.get_all_trips(db, search="CROISS")
+    assert [t.title for t in found] == ["Weekend"]
+
+    found, _ = crud_trips.get_all_trips(db, search="paris", sort_by="relevance")
+    assert {t.title for t in found} == {"Weekend", "Paris again"}
+
+    trip = found[0]
+    trip.destination = "Tokyo"
+    db.commit()
+    assert crud_trips.search_trips(db, "tokyo") == [trip]
+
+    db.delete(trip)
+    db.commit()
+    assert crud_trips.search_trips(db, "tokyo") == []
+
+
+def test_trip_list_etag_returns_304_when_unchanged(client):
+    first = client.get("/trips/")
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "public, no-cache"
+
+    cached = client.get("/trips/", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["ETag"] == etag
+
+    assert client.get("/trips/", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_trip_version_bumps_on_trip_and_chat_changes(db):
+    from src.models import Message, Trip, User
+
+    user = User(email="etag@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    trip = Trip(title="Etag", destination="Oslo", creator_id=user.id)
+    db.add(trip)
+    db.commit()
+    version = lambda: db.query(Trip.version).filter(Trip.id == trip.id).scalar()
+    assert version() == 0
+
+    trip.title = "Etag 2"
+    db.commit()
+    assert version() == 1
+
+    message = Message(content="hi", user_id=user.id, trip_id=trip.id)
+    db.add(message)
+    db.commit()
+    assert version() == 2
+
+    db.delete(message)
+    db.commit()
+    assert version() == 3
+
+
+def test_catalogue_cache_serves_repeats_and_drops_on_trip_change(client, monkeypatch):
+    from src.service import catalogue_cache, trips as trip_service
+
+    catalogue_cache.invalidate()
+    calls = []
+    original = trip_service.get_all_trips
+    monkeypatch.setattr(
+        trip_service, "get_all_trips",
+        lambda *args, **kwargs: calls.append(kwargs) or original(*args, **kwargs),
+    )
+
+    first = client.get("/trips/", params={"search": " Rome ", "sort_order": "DESC"})
+    second = client.get("/trips/", params={"search": "rome"})
+    assert first.json() == second.json()
+    assert first.headers["ETag"] == second.headers["ETag"]
+    assert len(calls) == 1
+
+    catalogue_cache.invalidate()
+    client.get("/trips/", params={"search": "rome"})
+    assert len(calls) == 2
+    assert catalogue_cache.get_stats()["hits"] >= 1
+
+
+def test_catalogue_cache_skips_pages_built_before_invalidation():
+    from src.service import catalogue_cache
+
+    key = catalogue_cache.cache_key(0, 10, None, None, None, None, None, "created_at", "desc", None)
+    seen = catalogue_cache.generation()
+    catalogue_cache.invalidate()
+    catalogue_cache.store(key, seen, catalogue_cache.CachedCatalogue([], None, '"x"'))
+    assert catalogue_cache.get(key) is None
+
+
+def test_catalogue_cache_is_bounded_by_page_size(client, monkeypatch):
+    from src.service import catalogue_cache
+
+    assert client.get("/trips/", params={"limit": 10_000}).status_code == 422
+
+    monkeypatch.setattr(catalogue_cache.settings, "TRIPS_CACHE_MAX_PAGE_ROWS", 1)
+    key = catalogue_cache.cache_key(0, 2, None, None, None, None, None, "created_at", "desc", None)
+    page = catalogue_cache.CachedCatalogue([{"id": 1}, {"id": 2}], None, '"x"')
+    catalogue_cache.store(key, catalogue_cache.generation(), page)
+    assert catalogue_cache.get(key) is None
+
+
+def test_fast_json_lists_match_standard_responses(client, monkeypatch):
+    import uuid
+    from src.core.settings import settings
+    from src.service import catalogue_cache
+
+    email = f"fast-{uuid.uuid4().hex[:8]}@example.com"
+    token = client.post("/auth/register", json={"email": email, "password": "secret123"}).json()
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+    user_id = client.get("/users/me", headers=headers).json()["id"]
+    trip = client.post("/trips/", headers=headers, json={
+        "title": "Fast", "destination": "Nowhere-fast", "budget_total": "1500.50",
+        "start_date": "2031-05-01",
+    }).json()
+    client.post(f"/trips/{trip['id']}/messages", params={"user_id": user_id},
+                json={"content": "привет", "trip_id": trip["id"]})
+    client.post(f"/trips/{trip['id']}/comments", params={"user_id": user_id},
+                json={"content": "ok", "trip_id": trip["id"]})
+
+    urls = [
+        ("/trips/", {"search": "Fast", "limit": 5}),
+        (f"/trips/{trip['id']}/messages", {"user_id": user_id}),
+        (f"/trips/{trip['id']}/comments", {"user_id": user_id}),
+        (f"/trips/{trip['id']}/members", {"user_id": user_id}),
+    ]
+    for url, params in urls:
+        catalogue_cache.invalidate()
+        monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", False)
+        standard = client.get(url, params=params)
+        catalogue_cache.invalidate()
+        monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", True)
+        fast = client.get(url, params=params)
+
+        assert fast.status_code == standard.status_code == 200
+        assert fast.json() == standard.json() and fast.json()
+        assert fast.headers.get("ETag") == standard.headers.get("ETag")
+
+
+def test_export_streams_filtered_catalogue(client):
+    import csv
+    import io
+    import json
+    import uuid
+
+    marker = uuid.uuid4().hex[:10]
+    token = client.post("/auth/register", json={
+        "email": f"export-{marker}@example.com", "password": "secret123",
+    }).json()
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+    for i in range(3):
+        client.post("/trips/", headers=headers, json={
+            "title": f"Export {marker} {i}", "destination": "Nowhere-export", "budget_total": 100 + i,
+        })
+
+    ndjson = client.get("/trips/export", params={"search": marker, "sort_by": "budget_total", "sort_order": "asc"})
+    assert ndjson.status_code == 200
+    assert ndjson.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert [row["title"] for row in rows] == [f"Export {marker} {i}" for i in range(3)]
+    assert rows[0]["budget_total"] == "100.00"
+
+    exported = client.get("/trips/export", params={"search": marker, "format": "csv", "min_budget": 101})
+    table = list(csv.DictReader(io.StringIO(exported.text)))
+    assert sorted(row["title"] for row in table) == [f"Export {marker} 1", f"Export {marker} 2"]
+
+    assert client.get("/trips/export", params={"format": "xml"}).status_code == 400
+
+
+def test_export_stops_when_client_disconnects(client, monkeypatch):
+    import asyncio
+    import uuid
+    from src.core.db import async_engine
+    from src.service import trip_export
+
+    marker = uuid.uuid4().hex[:10]
+    token = client.post("/auth/register", json={
+        "email": f"abort-{marker}@example.com", "password": "secret123",
+    }).json()
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+    for i in range(5):
+        client.post("/trips/", headers=headers, json={"title": f"Abort {marker} {i}", "destination": "X"})
+
+    monkeypatch.setattr(trip_export.settings, "EXPORT_BATCH_SIZE", 2)
+    checks = []
+
+    async def disconnected_after_first_batch():
+        checks.append(True)
+        return len(checks) > 1
+
+    async def scenario():
+        chunks = [chunk async for chunk in trip_export.stream_trips(
+            "ndjson", disconnected_after_first_batch, search=marker,
+        )]
+        await async_engine.dispose()
+        return chunks
+
+    chunks = asyncio.run(scenario())
+    assert len(chunks) == 1 and chunks[0].count(b"\n") == 2
+
+
+
+def test_trip_counters_follow_writes_and_repair(db):
+    from sqlalchemy import update
+    from src.models import Comment, Message, Trip, TripMember, User
+    from src.service import trips as trip_service
+
+    user = User(email="counters@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    trip = Trip(title="Counters", destination="Bergen", creator_id=user.id)
+    db.add(trip)
+    db.commit()
+    counters = lambda: db.query(
+        Trip.member_count, Trip.message_count, Trip.comment_count, Trip.last_activity_at
+    ).filter(Trip.id == trip.id).one()
+    assert counters() == (0, 0, 0, None)
+
+    member = TripMember(trip_id=trip.id, user_id=user.id, role="organizer")
+    messages = [Message(content=str(i), user_id=user.id, trip_id=trip.id) for i in range(3)]
+    db.add_all([member, *messages, Comment(content="nice", user_id=user.id, trip_id=trip.id)])
+    db.commit()
+    members, message_count, comments, last_activity = counters()
+    assert (members, message_count, comments) == (1, 3, 1)
+    assert last_activity is not None
+
+    db.delete(messages[0])
+    db.commit()
+    assert counters()[:3] == (1, 2, 1)
+
+    stats = trip_service.get_trip_statistics(db, trip.id, user.id)
+    assert (stats["member_count"], stats["message_count"], stats["comment_count"]) == (1, 2, 1)
+
+    # Запись в обход ORM ломает счётчики — repair пересчитывает их по таблицам
+    db.execute(update(Trip).values(member_count=7, message_count=0, last_activity_at=None))
+    db.commit()
+    assert trip_service.repair_trip_counters(db) == 1
+    assert counters()[:3] == (1, 2, 1)
+    assert counters()[3] is not None
+
+
+def test_trip_statistics_endpoint_reads_counters(client):
+    import uuid
+
+    marker = uuid.uuid4().hex[:8]
+    token = client.post("/auth/register", json={
+        "email": f"stats-{marker}@example.com", "password": "secret123",
+    }).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    user_id = client.get("/users/me", headers=headers).json()["id"]
+    trip = client.post("/trips/", headers=headers, json={"title": "Stats", "destination": "X"}).json()
+    client.post(f"/trips/{trip['id']}/messages", params={"user_id": user_id},
+                json={"content": "hello", "trip_id": trip["id"]})
+
+    stats = client.get(f"/trips/{trip['id']}/statistics", headers=headers).json()
+    assert (stats["member_count"], stats["message_count"], stats["comment_count"]) == (1, 1, 0)
+    assert stats["last_activity_at"] is not None
+    assert client.get(f"/trips/{trip['id']}/statistics").status_code == 401
+
+
+def test_catalogue_cache_drops_when_chat_changes_counters(client):
+    import uuid
+
+    marker = uuid.uuid4().hex[:8]
+    token = client.post("/auth/register", json={
+        "email": f"catalogue-{marker}@example.com", "password": "secret123",
+    }).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    user_id = client.get("/users/me", headers=headers).json()["id"]
+    trip = client.post("/trips/", headers=headers, json={"title": "Counters", "destination": f"Town{marker}"}).json()
+
+    params = {"search": f"Town{marker}"}
+    before = client.get("/trips/", params=params)
+    assert [t["message_count"] for t in before.json()] == [0]
+
+    client.post(f"/trips/{trip['id']}/messages", params={"user_id": user_id},
+                json={"content": "hello", "trip_id": trip["id"]})
+
+    # Кешированная страница со старым счётчиком не отдаётся, и старый ETag больше не даёт 304
+    after = client.get("/trips/", params=params, headers={"If-None-Match": before.headers["ETag"]})
+    assert after.status_code == 200
+    assert [t["message_count"] for t in after.json()] == [1]
+    assert after.headers["ETag"] != before.headers["ETag"]
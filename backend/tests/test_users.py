@@ -0,0 +1,61 @@
+import uuid
+
+from sqlalchemy import event
+
+
+def _register(client, prefix):
+    token = client.post("/auth/register", json={
+        "email": f"{prefix}-{uuid.uuid4().hex[:8]}@example.com", "password": "secret123",
+    }).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    return headers, client.get("/users/me", headers=headers).json()["id"]
+
+
+def test_current_user_is_served_from_identity_cache(client):
+    from src.core import identity
+    from src.core.db import async_engine
+
+    headers, user_id = _register(client, "identity")
+    trip = client.post("/trips/", headers=headers, json={"title": "Who", "destination": "X"}).json()
+
+    user_selects = []
+
+    def before_execute(conn, cursor, statement, *args):
+        if "FROM users" in statement:
+            user_selects.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_execute)
+    try:
+        identity.clear()
+        for _ in range(3):
+            assert client.get(f"/trips/{trip['id']}/statistics", headers=headers).status_code == 200
+        assert len(user_selects) == 1
+        assert identity.get(user_id) == (user_id, "user", identity.get(user_id).email)
+
+        # Обновление профиля через crud сбрасывает снимок
+        client.put(f"/users/{user_id}", json={"name": "Renamed"})
+        assert identity.get(user_id) is None
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_execute)
+
+
+def test_identity_skips_stale_snapshots_after_delete(db):
+    from src.core import identity
+    from src.core.identity import CurrentUser
+    from src.crud import users as crud_users
+    from src.models import User
+
+    user = User(email="identity-crud@example.com", password_hash="x", role="user")
+    db.add(user)
+    db.commit()
+
+    seen = identity.generation()
+    crud_users.delete_user(db, user.id)
+    # Снимок, прочитанный до удаления, не попадает в кеш
+    identity.store(seen, CurrentUser(user.id, "user", "identity-crud@example.com"))
+    assert identity.get(user.id) is None
+
+    identity.store(identity.generation(), CurrentUser(user.id, "user", "identity-crud@example.com"))
+    assert identity.get(user.id) is not None
+    identity.invalidate(user.id)
+    assert identity.get(user.id) is None
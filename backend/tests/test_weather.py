@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+
+from src.service import weather
+
+
+@pytest.fixture(autouse=True)
+def closed_circuit(monkeypatch):
+    """Свежий breaker: запросы приложения в других тестах (без сети) могли открыть общий"""
+    monkeypatch.setattr(weather, "_circuit", weather.CircuitBreaker("test", failure_threshold=5, recovery_timeout=60))
+
+
+def test_weather_for_cities_deduplicates(monkeypatch):
+    calls = []
+
+    async def fake_weather(city):
+        calls.append(city)
+        return {"temp": 20, "description": "sunny", "icon": "01d"}
+
+    monkeypatch.setattr(weather, "get_weather_by_city", fake_weather)
+
+    result = asyncio.run(weather.get_weather_for_cities(["Paris", "Rome", "Paris", ""]))
+
+    assert sorted(calls) == ["Paris", "Rome"]
+    assert set(result) == {"Paris", "Rome"}
+
+
+def test_weather_for_cities_deduplicates_normalized_names(monkeypatch):
+    calls = []
+
+    async def fake_weather(city):
+        calls.append(city)
+        return {"temp": 18, "description": "cloudy", "icon": "03d"}
+
+    monkeypatch.setattr(weather, "get_weather_by_city", fake_weather)
+
+    result = asyncio.run(weather.get_weather_for_cities(["Paris", "paris ", " PARIS"]))
+
+    assert calls == ["Paris"]
+    assert set(result) == {"Paris", "paris ", " PARIS"}
+    assert result["paris "]["temp"] == 18
+
+
+def test_weather_for_cities_respects_budget(monkeypatch):
+    async def fake_weather(city):
+        if city == "Slow":
+            await asyncio.sleep(5)
+        return {"temp": 1, "description": "cold", "icon": "13d"}
+
+    monkeypatch.setattr(weather, "get_weather_by_city", fake_weather)
+
+    result = asyncio.run(weather.get_weather_for_cities(["Fast", "Slow"], timeout=0.1))
+
+    assert result["Fast"]["temp"] == 1
+    assert result["Slow"] is None
+
+
+def test_weather_cache_serves_repeats_without_network(monkeypatch):
+    calls = []
+
+    async def fake_provider(city):
+        calls.append(city)
+        if city == "Atlantis":
+            return False, None
+        return True, {"temp": 25, "description": "clear", "icon": "01d"}
+
+    monkeypatch.setattr(weather, "_fetch_from_provider", fake_provider)
+    monkeypatch.setattr(weather.settings, "WEATHER_CACHE_PERSISTENT", False)
+    weather.clear_cache()
+
+    async def scenario():
+        first = await weather.get_weather_by_city("Lisbon")
+        second = await weather.get_weather_by_city("  lisbon ")
+        unknown = await weather.get_weather_by_city("Atlantis")
+        unknown_again = await weather.get_weather_by_city("ATLANTIS")
+        return first, second, unknown, unknown_again
+
+    first, second, unknown, unknown_again = asyncio.run(scenario())
+
+    assert first == second
+    assert unknown is None and unknown_again is None
+    assert calls == ["Lisbon", "Atlantis"]
+    weather.clear_cache()
+
+
+def test_weather_circuit_opens_after_failures(monkeypatch):
+    calls = []
+
+    async def broken_provider(city):
+        calls.append(city)
+        raise RuntimeError("upstream down")
+
+    breaker = weather.CircuitBreaker("test", failure_threshold=2, recovery_timeout=60)
+    monkeypatch.setattr(weather, "_fetch_from_provider", broken_provider)
+    monkeypatch.setattr(weather, "_circuit", breaker)
+    monkeypatch.setattr(weather.settings, "WEATHER_CACHE_PERSISTENT", False)
+    weather.clear_cache()
+
+    async def scenario():
+        return [await weather.get_weather_by_city(city) for city in ["A", "B", "C", "D"]]
+
+    assert asyncio.run(scenario()) == [None, None, None, None]
+    assert calls == ["A", "B"]
+    assert breaker.state == breaker.OPEN
+
+
+def test_prefetch_refreshes_only_expiring_cities(monkeypatch):
+    from src.service import weather_prefetch
+
+    calls = []
+
+    async def fake_provider(city):
+        calls.append(city)
+        return True, {"temp": 10, "description": "rain", "icon": "10d"}
+
+    async def fake_destinations():
+        return ["Berlin", "Madrid"]
+
+    monkeypatch.setattr(weather, "_fetch_from_provider", fake_provider)
+    monkeypatch.setattr(weather.settings, "WEATHER_CACHE_PERSISTENT", False)
+    monkeypatch.setattr(weather.settings, "WEATHER_PREFETCH_RATE", 1000.0)
+    monkeypatch.setattr(weather.settings, "WEATHER_PREFETCH_INTERVAL", 60.0)
+    monkeypatch.setattr(weather_prefetch, "collect_destinations", fake_destinations)
+    weather.clear_cache()
+
+    async def scenario():
+        first = await weather_prefetch.run_prefetch_cycle()
+        second = await weather_prefetch.run_prefetch_cycle()
+        cached = await weather.get_weather_by_city("Berlin")
+        return first, second, cached
+
+    first, second, cached = asyncio.run(scenario())
+
+    assert (first, second) == (2, 0)
+    assert calls == ["Berlin", "Madrid"]
+    assert cached["temp"] == 10
+    weather.clear_cache()